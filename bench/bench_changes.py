@@ -0,0 +1,88 @@
+# bench/bench_changes.py
+"""
+盘中变化监控基准：python -m bench.bench_changes --locations 300
+
+stub server 充当和风，虚拟时钟固定在 stub 的“今天”上午：
+- 早间：每个地点取完整 DTO 并记为基线（与 main 发送后相同）
+- 刷新一轮（预报未变）：只刷新 3d/24h，应当 0 条通知
+- 刷新一轮（换 stub seed 模拟预报更新）：统计超过阈值的地点数
+输出每轮耗时、每地点请求数（完整 DTO vs 只取预报）、指纹比较单次耗时
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from datetime import datetime, time as dtime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench.stub_server import StubConfig, StubQWeatherServer
+from jobs.change_watcher import BaselineStore, ChangeOptions, ChangeWatcher, diff_fingerprints, fingerprint
+from weather.http_client import QWeatherHttpClient
+from weather.qweather_provider import QWeatherProvider
+
+
+def _sweep(w: ChangeWatcher, t: List[float], n: int) -> Dict[str, Any]:
+    # 所有地点到期后逐个处理
+    t[0] += w.interval_sec
+    t0 = time.perf_counter()
+    sent = sum(w.poll_once() for _ in range(n))
+    return {"sec": round(time.perf_counter() - t0, 3), "notified": sent}
+
+
+def run(n: int, latency_ms: float) -> Dict[str, Any]:
+    cfg = StubConfig(latency_ms=latency_ms)
+    with StubQWeatherServer(cfg) as srv, tempfile.TemporaryDirectory(prefix="wx_changes_") as tmp:
+        provider = QWeatherProvider(
+            client=QWeatherHttpClient(api_host=srv.url, api_key="bench"), cache_file=str(Path(tmp) / "geo.json")
+        )
+        locs = [provider.lookup_location(f"城市{i}") for i in range(n)]
+        locs = list({loc.id: loc for loc in locs}.values())
+
+        before = srv.stats.requests
+        morning = {loc.id: provider.get_weather_for_location(loc, query_city=loc.name) for loc in locs}
+        full_per_loc = (srv.stats.requests - before) / len(locs)
+        store = BaselineStore(str(Path(tmp) / "change_state.json"))
+        store.record(morning)
+
+        t = [datetime.combine(cfg.today, dtime(9)).timestamp()]
+        opt = ChangeOptions(interval_sec=1800, refresh_budget_per_hour=10**6, max_updates_per_day=10)
+        w = ChangeWatcher(provider, locs, lambda loc, dto, changes: None, opt, store=store, clock=lambda: t[0])
+
+        before = srv.stats.requests
+        same = _sweep(w, t, len(locs))
+        forecast_per_loc = (srv.stats.requests - before) / len(locs)
+        cfg.seed = 1  # 预报更新
+        updated = _sweep(w, t, len(locs))
+
+        fps = [(fingerprint(d), fingerprint(d)) for d in morning.values()]
+        reps = 200
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            for a, b in fps:
+                diff_fingerprints(a, b, opt)
+        compare_us = (time.perf_counter() - t0) / (reps * len(fps)) * 1e6
+
+    return {
+        "bench": "changes",
+        "locations": len(locs),
+        "latency_ms": latency_ms,
+        "requests_per_location": {"full_dto": full_per_loc, "forecast_only": forecast_per_loc},
+        "sweep_unchanged": same,
+        "sweep_updated": updated,
+        "compare_us_per_location": round(compare_us, 3),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--locations", type=int, default=300)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.locations, args.latency_ms), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# bench/bench_confirm.py
+"""
+送达确认开销基准：python -m bench.bench_confirm --sends 200 --history 500
+
+假微信 + 虚拟时钟：消息延迟 echo_delay 才出现在记录里，每 drop_every 条丢一条。
+对比“不确认”与“高水位确认”两种情况下每条发送的 GetAllMessage 次数、
+虚拟等待时间、真实 CPU 开销，以及丢失消息是否都被判为未确认。
+
+另跑一轮 main.main（stub server + 开启 [confirm] 的配置 + 假微信），走真实发送路径
+（_run -> _send_all -> send_text -> tracker_for），确认端到端每个接收人都发到、丢失的判为未确认。
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from bench.fake_wx import FakeWeChat
+from bench.run import FAST_SEND, _provider
+from bench.stub_server import StubConfig, StubQWeatherServer
+from wechat.confirm import ConfirmOptions, DeliveryTracker
+from wechat.messenger import SendOptions, send_text
+
+
+class _VirtualClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, sec: float) -> None:
+        self.t += max(0.0, sec)
+
+
+def run(sends: int, chats: int, history: int, echo_delay: float, drop_every: int, window: int) -> Dict[str, Any]:
+    rows = []
+    for confirm in (False, True):
+        vc = _VirtualClock()
+        wx = FakeWeChat(drop_every=drop_every, echo_delay_sec=echo_delay, history_window=window, clock=vc.now)
+        for c in range(chats):
+            for i in range(history):
+                wx.receive(f"chat{c}", f"历史消息 {i}")
+        tracker = DeliveryTracker(clock=vc.now, sleep=vc.sleep)
+        opt = SendOptions(
+            pre_delay_sec_min=0.0,
+            pre_delay_sec_max=0.0,
+            retries=0,
+            press_esc_before_send=False,
+            confirm=ConfirmOptions() if confirm else None,
+        )
+
+        confirmed = unconfirmed = 0
+        t0 = time.perf_counter()
+        for i in range(sends):
+            chat = f"chat{i % chats}"
+            if i % 7 == 3:
+                wx.receive(chat, f"对方插话 {i}")
+            d = send_text(wx, chat, f"今天天气 #{i}\n气温 20~28°C", opt, tracker=tracker if confirm else None)
+            confirmed += d.confirmed is True
+            unconfirmed += d.confirmed is False
+        cpu = time.perf_counter() - t0
+
+        rows.append(
+            {
+                "confirm": confirm,
+                "reads_per_send": round(wx.calls.get("GetAllMessage", 0) / sends, 3),
+                "virtual_wait_ms_per_send": round(vc.t / sends * 1000, 1),
+                "cpu_us_per_send": round(cpu / sends * 1e6, 1),
+                "confirmed": confirmed,
+                "unconfirmed": unconfirmed,
+                "dropped": sends // drop_every if drop_every else 0,
+            }
+        )
+    return {"bench": "confirm", "sends": sends, "chats": chats, "history": history, "results": rows}
+
+
+def run_main(recipients: int, drop_every: int, timeout_sec: float) -> Dict[str, Any]:
+    import main as app
+
+    with StubQWeatherServer(StubConfig(latency_ms=5)) as srv, tempfile.TemporaryDirectory(prefix="wx_confirm_") as tmp:
+        cfg = Path(tmp) / "bench_config.ini"
+        lines = ["[wechat]", "wechat_path = fake.exe", "", "[confirm]", "enabled = true", f"timeout_sec = {timeout_sec}", ""]
+        for i in range(recipients):
+            lines += [f"[recipient:r{i}]", f"city = 城市{i % 10}", ""]
+        cfg.write_text("\n".join(lines), encoding="utf-8")
+
+        wx = FakeWeChat(drop_every=drop_every)
+        out = io.StringIO()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(out):
+            app.main(str(cfg), wx_factory=lambda job: wx, provider_factory=lambda: _provider(srv, Path(tmp)), send_opt=FAST_SEND)
+        sec = time.perf_counter() - t0
+    log = out.getvalue()
+    return {
+        "recipients": recipients,
+        "sent": len(wx.sent),
+        "send_failed": log.count("[WARN] 未发送"),
+        "unconfirmed": log.count("[WARN] 未在会话中看到消息"),
+        "dropped": len(wx.sent) // drop_every if drop_every else 0,
+        "reads_per_send": round(wx.calls.get("GetAllMessage", 0) / max(1, len(wx.sent)), 3),
+        "sec": round(sec, 3),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sends", type=int, default=200)
+    ap.add_argument("--chats", type=int, default=20)
+    ap.add_argument("--history", type=int, default=500)
+    ap.add_argument("--echo-delay", type=float, default=0.3)
+    ap.add_argument("--drop-every", type=int, default=25)
+    ap.add_argument("--window", type=int, default=0, help="GetAllMessage 只返回最近 N 条")
+    ap.add_argument("--main-recipients", type=int, default=50, help="main.main 端到端一轮的接收人数；0 跳过")
+    args = ap.parse_args()
+    result = run(args.sends, args.chats, args.history, args.echo_delay, args.drop_every, args.window)
+    if args.main_recipients > 0:
+        # 真实时钟：丢失的消息各等满 timeout，取小一点
+        result["main"] = run_main(args.main_recipients, args.drop_every, timeout_sec=0.2)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# bench/bench_input.py
+"""
+输入方式吞吐基准：python -m bench.bench_input --chars 300
+
+用 FakeInputBackend（虚拟时钟）比较 sendmsg / paste / paste_chunks / burst
+输入一条典型天气消息的耗时与 UI 操作次数，结果以 JSON 输出。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from wechat.input_strategy import INPUT_MODES, InputOptions, measure_throughput
+
+SAMPLE = (
+    "早上好～🌅\n今日天气简报如下——📝\n今天广州气温：22°C ~ 29°C\n天气：多云转小雨\n"
+    "降雨概率：60%\n今天可能会有阵雨🌧️，出门记得带把伞☂️\n风力：东南风 3级（4.2 m/s）\n"
+    "紫外线：6（较高）\n祝你今天顺利～🍀\n"
+)
+
+
+def run(chars: int, seed: int) -> dict:
+    msg = (SAMPLE * (chars // len(SAMPLE) + 1))[:chars]
+    rows = []
+    for mode in INPUT_MODES:
+        sec, ops = measure_throughput(msg, InputOptions(mode=mode), seed=seed)
+        rows.append(
+            {
+                "mode": mode,
+                "virtual_sec": round(sec, 3),
+                "chars_per_sec": round(len(msg) / sec, 1) if sec > 0 else None,
+                "ui_ops": sum(ops.values()),
+                "ops": ops,
+            }
+        )
+    return {"bench": "input", "chars": len(msg), "results": rows}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chars", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.chars, args.seed), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
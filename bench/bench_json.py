@@ -0,0 +1,135 @@
+# bench/bench_json.py
+"""
+JSON 编解码基准：python -m bench.bench_json --cities 500
+
+- decode：每个城市 6 个接口响应的解码耗时（requests 的 resp.json() 路径 / 标准库直接解 bytes / orjson）
+- wire：每个城市响应体积（原始 JSON / gzip）
+- geo_cache：N 个城市的地理缓存文件（旧：indent=2 + raw；新：紧凑 + 不存 raw）的体积与一次保存耗时，
+  以及冷启动批量时“每解析一个城市保存一次”累计写盘字节
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List
+
+from bench.stub_server import StubConfig, location_id_for, render_payload
+from utils import jsoncodec
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+_ENDPOINTS = (
+    ("/geo/v2/city/lookup", {}),
+    ("/v7/weather/now", {}),
+    ("/v7/weather/3d", {}),
+    ("/v7/weather/24h", {}),
+    ("/v7/air/now", {}),
+    ("/v7/indices/1d", {"type": "3,5"}),
+)
+
+
+def _payloads(cities: int) -> List[bytes]:
+    cfg = StubConfig()
+    out = []
+    for i in range(cities):
+        name = f"城市{i}"
+        for path, extra in _ENDPOINTS:
+            loc = name if path.startswith("/geo") else location_id_for(name)
+            out.append(json.dumps(render_payload(path, {"location": loc, **extra}, cfg), ensure_ascii=False).encode("utf-8"))
+    return out
+
+
+def _requests_style(b: bytes) -> Any:
+    # requests.Response.json()：bytes -> 探测编码 -> str -> json.loads
+    from requests.utils import guess_json_utf
+
+    return json.loads(b.decode(guess_json_utf(b) or "utf-8"))
+
+
+def _time(fn: Callable[[bytes], Any], data: List[bytes], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for b in data:
+            fn(b)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_decode(cities: int, rounds: int) -> Dict[str, Any]:
+    data = _payloads(cities)
+    per_city = lambda sec: round(sec / cities * 1e6, 2)  # noqa: E731
+    out: Dict[str, Any] = {
+        "cities": cities,
+        "requests_json_us_per_city": per_city(_time(_requests_style, data, rounds)),
+        "stdlib_bytes_us_per_city": per_city(_time(lambda b: json.loads(b.decode("utf-8")), data, rounds)),
+    }
+    if orjson is not None:
+        out["orjson_us_per_city"] = per_city(_time(orjson.loads, data, rounds))
+    out["active_backend"] = jsoncodec.BACKEND
+    raw = sum(len(b) for b in data)
+    gz = sum(len(gzip.compress(b, compresslevel=6)) for b in data)
+    out["wire"] = {
+        "raw_bytes_per_city": raw // cities,
+        "gzip_bytes_per_city": gz // cities,
+        "ratio": round(gz / raw, 3),
+    }
+    return out
+
+
+def bench_geo_cache(cities: int) -> Dict[str, Any]:
+    from weather.models import Location
+
+    cfg = StubConfig()
+    old: Dict[str, Any] = {}
+    new: Dict[str, Any] = {}
+    old_total = new_total = 0
+    for i in range(cities):
+        name = f"城市{i}"
+        raw = render_payload("/geo/v2/city/lookup", {"location": name}, cfg)["location"][0]
+        loc = Location(id=raw["id"], name=raw["name"], lat=float(raw["lat"]), lon=float(raw["lon"]),
+                       adm1=raw.get("adm1"), adm2=raw.get("adm2"), adm3=None, tz=raw.get("tz"))
+        key = f"cn|{name}"
+        old[key] = {**asdict(loc), "raw": raw}
+        new[key] = {k: v for k, v in asdict(loc).items() if v is not None}
+        # 冷启动：每解析一个城市整体重写一次
+        old_total += len(json.dumps(old, ensure_ascii=False, indent=2).encode("utf-8"))
+        new_total += len(jsoncodec.dumps(new))
+
+    def save_sec(fn: Callable[[], bytes]) -> float:
+        t0 = time.perf_counter()
+        for _ in range(20):
+            fn()
+        return (time.perf_counter() - t0) / 20
+
+    return {
+        "cities": cities,
+        "old_file_bytes": len(json.dumps(old, ensure_ascii=False, indent=2).encode("utf-8")),
+        "new_file_bytes": len(jsoncodec.dumps(new)),
+        "old_save_ms": round(save_sec(lambda: json.dumps(old, ensure_ascii=False, indent=2).encode("utf-8")) * 1000, 3),
+        "new_save_ms": round(save_sec(lambda: jsoncodec.dumps(new)) * 1000, 3),
+        "cold_batch_bytes_written_old": old_total,
+        "cold_batch_bytes_written_new": new_total,
+    }
+
+
+def run(cities: int = 500, rounds: int = 3) -> Dict[str, Any]:
+    return {"decode": bench_decode(cities, rounds), "geo_cache": bench_geo_cache(cities)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cities", type=int, default=500)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+    print(json.dumps({"bench": "json", **run(args.cities, args.rounds)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
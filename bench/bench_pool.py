@@ -0,0 +1,83 @@
+# bench/bench_pool.py
+"""
+多账号发送池基准：python -m bench.bench_pool --recipients 300 --accounts 3
+
+假微信 + 虚拟时钟（限速等待不真睡），比较 1..N 个账号时发完所有接收人的虚拟耗时；
+再跑一次“第一个账号中途掉线”，看转移条数与失败条数。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Any, Dict, List
+
+from bench.fake_wx import FakeWeChat
+from jobs.config import AccountConfig, RecipientConfig
+from jobs.runner import Outgoing
+from jobs.sender_pool import SenderPool
+from wechat.messenger import SendOptions, send_text
+
+FAST = SendOptions(pre_delay_sec_min=0.0, pre_delay_sec_max=0.0, retries=0, press_esc_before_send=False)
+
+
+class _VirtualClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, sec: float) -> None:
+        self.t += max(0.0, sec)
+
+
+def _outgoing(n: int, pinned_every: int) -> List[Outgoing]:
+    out = []
+    for i in range(n):
+        # 每 pinned_every 个接收人固定只能用 a0 发（只有 a0 加了对方好友）
+        accounts = ("a0",) if pinned_every and i % pinned_every == 0 else ()
+        r = RecipientConfig(friend_name=f"r{i}", city="广州", accounts=accounts)
+        out.append(Outgoing(recipient=r, text=f"今日天气 #{i}"))
+    return out
+
+
+def run_once(recipients: int, accounts: int, rate: float, logout_after: int, pinned_every: int) -> Dict[str, Any]:
+    vc = _VirtualClock()
+
+    def factory(a: AccountConfig) -> Any:
+        return FakeWeChat(logout_after=logout_after if a.name == "a0" else 0)
+
+    accs = [AccountConfig(name=f"a{i}", wechat_path="fake.exe", rate_per_min=rate, burst=3) for i in range(accounts)]
+    pool = SenderPool(accs, factory, clock=vc.now, sleep=vc.sleep)
+    report = pool.run(
+        _outgoing(recipients, pinned_every),
+        lambda wx, out: send_text(wx, out.recipient.friend_name, out.text, FAST),
+    )
+    delivered = sum(report.sent.values())
+    return {
+        "accounts": accounts,
+        "virtual_min": round(report.elapsed_sec / 60, 2),
+        "msgs_per_min": round(delivered / (report.elapsed_sec / 60), 1) if report.elapsed_sec else None,
+        "sent": report.sent,
+        "moved": report.moved,
+        "failed": len(report.failed),
+        "down": list(report.down),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--recipients", type=int, default=300)
+    ap.add_argument("--accounts", type=int, default=3)
+    ap.add_argument("--rate", type=float, default=20.0, help="每账号每分钟条数")
+    ap.add_argument("--logout-after", type=int, default=40)
+    ap.add_argument("--pinned-every", type=int, default=10)
+    args = ap.parse_args()
+
+    scaling = [run_once(args.recipients, n, args.rate, 0, 0) for n in range(1, args.accounts + 1)]
+    failover = run_once(args.recipients, args.accounts, args.rate, args.logout_after, args.pinned_every)
+    print(json.dumps({"bench": "pool", "recipients": args.recipients, "scaling": scaling, "failover": failover}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
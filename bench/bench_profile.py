@@ -0,0 +1,69 @@
+# bench/bench_profile.py
+"""
+剖析开销基准：python -m bench.bench_profile --iterations 10
+
+用 bench.run 的 e2e（stub server + 假微信，main.main 完整一轮）对比：
+- off：不剖析
+- cpu：只开采样（--profile --no-profile-memory）
+- cpu+memory：采样 + tracemalloc 阶段快照（--profile）
+输出各模式 p50 与相对 off 的额外开销，以及最后一份产物的摘要（热点、阶段内存增长）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from bench.run import bench_e2e
+from bench.stub_server import StubConfig, StubQWeatherServer
+from utils import jsoncodec
+from utils.profiling import ProfileOptions, ProfileSession
+
+MODES = {"off": None, "cpu": False, "cpu+memory": True}
+
+
+def run(iterations: int, recipients: int, latency_ms: float) -> Dict[str, Any]:
+    rows = []
+    last: Optional[Path] = None
+    with StubQWeatherServer(StubConfig(latency_ms=latency_ms, jitter_ms=latency_ms / 4)) as srv, tempfile.TemporaryDirectory(
+        prefix="wx_prof_"
+    ) as tmp:
+        # 预热：geo 缓存与模块导入不计入
+        (Path(tmp) / "warm").mkdir()
+        bench_e2e(srv, Path(tmp) / "warm", recipients, 1)
+        for mode, memory in MODES.items():
+            session = None
+            if memory is not None:
+                session = ProfileSession(ProfileOptions(memory=memory, out_dir=Path(tmp) / "profiles"), label=mode.replace("+", "_")).start()
+            r = bench_e2e(srv, Path(tmp) / "warm", recipients, iterations)
+            if session is not None:
+                last = session.stop()
+            rows.append({"mode": mode, "p50_ms": r["p50_ms"], "p95_ms": r["p95_ms"]})
+        summary = jsoncodec.read_file(last / "summary.json") if last else {}
+    base = rows[0]["p50_ms"] or 1.0
+    for r in rows:
+        r["overhead_pct"] = round(100.0 * (r["p50_ms"] - base) / base, 1)
+    return {
+        "bench": "profile",
+        "iterations": iterations,
+        "recipients": recipients,
+        "results": rows,
+        "sampler": {k: summary.get("cpu", {}).get(k) for k in ("samples", "final_interval_ms", "overhead_pct", "distinct_stacks")},
+        "hot_self": summary.get("cpu", {}).get("top", {}).get("self", [])[:5],
+        "stages": [{k: s.get(k) for k in ("stage", "sec", "traced_kb")} for s in summary.get("stages", [])][:8],
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--iterations", type=int, default=10)
+    ap.add_argument("--recipients", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.iterations, args.recipients, args.latency_ms), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
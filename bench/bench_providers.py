@@ -0,0 +1,94 @@
+# bench/bench_providers.py
+"""
+多数据源组合基准：python -m bench.bench_providers --requests 60
+
+两个 stub server 分别充当和风与 Open-Meteo，对比几种情况下单源 / failover / race / hedge 的
+逐次延迟（p50/p95）、失败数与各源胜出次数：
+- healthy：两源都正常（和风 5 个接口串行，Open-Meteo 一次请求）
+- outage：和风全部 500（配额耗尽/故障）
+- slow：和风每次请求 +400ms（超过 deadline）
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench.stub_server import StubConfig, StubQWeatherServer
+from weather.composite_provider import CompositeOptions, CompositeProvider
+from weather.http_client import QWeatherHttpClient
+from weather.models import Location
+from weather.openmeteo_provider import OpenMeteoProvider
+from weather.qweather_provider import QWeatherProvider
+
+SCENARIOS = {
+    "healthy": {},
+    "outage": {"error_rate": 1.0},
+    "slow": {"latency_ms": 400.0},
+}
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return round(xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))] * 1000, 1) if xs else 0.0
+
+
+def _run(provider: Any, loc: Location, n: int) -> Dict[str, Any]:
+    xs: List[float] = []
+    failed = 0
+    for _ in range(n):
+        t0 = time.perf_counter()
+        try:
+            provider.get_weather_for_location(loc, query_city=loc.name)
+            xs.append(time.perf_counter() - t0)
+        except Exception:
+            failed += 1
+    out: Dict[str, Any] = {"p50_ms": _pct(xs, 0.5), "p95_ms": _pct(xs, 0.95), "failed": failed}
+    if isinstance(provider, CompositeProvider):
+        out["wins"] = {h["provider"]: h["wins"] for h in provider.health_report()}
+        out["calls"] = {h["provider"]: h["calls"] for h in provider.health_report()}
+    return out
+
+
+def run(n: int, latency_ms: float, deadline_sec: float) -> Dict[str, Any]:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scenario, overrides in SCENARIOS.items():
+            qcfg = StubConfig(latency_ms=latency_ms, jitter_ms=latency_ms / 4)
+            ocfg = StubConfig(latency_ms=latency_ms * 2, jitter_ms=latency_ms / 2)
+            with StubQWeatherServer(qcfg) as qs, StubQWeatherServer(ocfg) as om:
+                q = QWeatherProvider(client=QWeatherHttpClient(api_host=qs.url, api_key="bench"),
+                                     cache_file=str(Path(tmp) / f"geo_{scenario}.json"))
+                o = OpenMeteoProvider(client=QWeatherHttpClient(api_host=om.url, api_key=""))
+                loc = q.lookup_location("广州市")
+                for k, v in overrides.items():
+                    setattr(qcfg, k, v if k != "latency_ms" else latency_ms + v)
+                modes = {
+                    "qweather_only": q,
+                    "failover": CompositeProvider([q, o], CompositeOptions(deadline_sec=deadline_sec)),
+                    "race": CompositeProvider([q, o], CompositeOptions(mode="race", deadline_sec=deadline_sec)),
+                    "hedge": CompositeProvider(
+                        [q, o], CompositeOptions(mode="race", deadline_sec=deadline_sec, hedge_after_sec=latency_ms * 6 / 1000)
+                    ),
+                }
+                for mode, provider in modes.items():
+                    rows.append({"scenario": scenario, "mode": mode, **_run(provider, loc, n)})
+                    if isinstance(provider, CompositeProvider):
+                        provider.close()
+    return {"bench": "providers", "requests": n, "latency_ms": latency_ms, "deadline_sec": deadline_sec, "results": rows}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=60)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="和风每个接口的延迟；Open-Meteo 取其 2 倍")
+    ap.add_argument("--deadline-sec", type=float, default=0.5)
+    args = ap.parse_args()
+    print(json.dumps(run(args.requests, args.latency_ms, args.deadline_sec), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
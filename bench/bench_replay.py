@@ -0,0 +1,117 @@
+# bench/bench_replay.py
+"""
+录制 / 回放基准：python -m bench.bench_replay --cities 200 --latency-ms 80
+
+1. 对 stub server 冷缓存跑一遍流水线并录制（geo + 天气接口全部进档案）
+2. 用同一份档案按 1x / 10x / 不等待 三种速度回放，跑同样的流水线（不联网）
+3. 对比每次的耗时、城市/秒、与录制时 DTO 是否一致，以及档案体积 vs 原始响应体积
+
+--archive DIR 直接回放已有档案（例如线上录到的早高峰），城市取档案里的 geo 查询。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+from bench.stub_server import StubConfig, StubQWeatherServer
+from jobs.pipeline import PipelineItem, PipelineOptions, run_pipeline
+from weather.http_client import QWeatherHttpClient
+from weather.qweather_provider import QWeatherProvider
+from weather.replay import RecordingTransport, ReplayTransport, read_index
+
+
+def _run(client: QWeatherHttpClient, cities: List[str], geo_file: Path, workers: int) -> Dict[str, Any]:
+    provider = QWeatherProvider(client=client, cache_file=str(geo_file))
+    dtos: Dict[str, Any] = {}
+    stats = run_pipeline(
+        [PipelineItem(friend_name=c, city=c) for c in cities],
+        fetch=provider.get_today_weather,
+        build=lambda dto, it: dto,
+        send=lambda it, dto: dtos.__setitem__(it.city, dto),
+        opt=PipelineOptions(fetch_workers=workers),
+    )
+    return {
+        "elapsed_sec": round(stats.elapsed_sec, 3),
+        "cities_per_sec": round(len(cities) / stats.elapsed_sec, 1) if stats.elapsed_sec else None,
+        "failed": stats.failed,
+        "_dtos": dtos,
+    }
+
+
+def _archive_size(d: Path) -> Dict[str, int]:
+    entries = list(read_index(d))
+    return {
+        "requests": len(entries),
+        "archive_bytes": sum(p.stat().st_size for p in d.iterdir()),
+        "unique_bodies": len({e.digest for e in entries if e.digest}),
+    }
+
+
+def _geo_cities(d: Path) -> List[str]:
+    out = []
+    for e in read_index(d):
+        path, _, q = e.key.partition("?")
+        if path == "/geo/v2/city/lookup":
+            city = dict(parse_qsl(q)).get("location")
+            if city and city not in out:
+                out.append(city)
+    return out
+
+
+def run(cities: int, latency_ms: float, workers: int, speeds: List[float], archive: Optional[str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"bench": "replay"}
+    with tempfile.TemporaryDirectory() as tmp:
+        t = Path(tmp)
+        baseline: Dict[str, Any] = {}
+        if archive:
+            arc = Path(archive)
+            names = _geo_cities(arc)
+        else:
+            arc = t / "archive"
+            names = [f"城市{i}" for i in range(cities)]
+            with StubQWeatherServer(StubConfig(latency_ms=latency_ms, jitter_ms=latency_ms / 4)) as srv:
+                rec = RecordingTransport(arc)
+                row = _run(QWeatherHttpClient(api_host=srv.url, api_key="bench", transport=rec), names, t / "geo_rec.json", workers)
+                baseline = row.pop("_dtos")
+                raw = srv.stats.bytes_raw
+            out["record"] = {**row, **_archive_size(arc), "raw_response_bytes": raw}
+        out["cities"] = len(names)
+
+        rows = []
+        for speed in speeds:
+            rp = ReplayTransport(arc, speed=speed)
+            client: Any = QWeatherHttpClient(api_host="replay://", api_key="", transport=rp)
+            t0 = time.perf_counter()
+            row = _run(client, names, t / f"geo_{speed:g}.json", workers)
+            dtos = row.pop("_dtos")
+            rows.append({
+                "speed": speed,
+                **row,
+                "misses": rp.misses,
+                "identical": (dtos == baseline) if baseline else None,
+                "wall_sec": round(time.perf_counter() - t0, 3),
+            })
+            rp.close()
+        out["replay"] = rows
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cities", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=80.0)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--speeds", default="1,10,0", help="回放倍速列表，0=不等待")
+    ap.add_argument("--archive", default="", help="回放已有档案目录（不录制）")
+    args = ap.parse_args()
+    speeds = [float(x) for x in args.speeds.split(",") if x.strip()]
+    print(json.dumps(run(args.cities, args.latency_ms, args.workers, speeds, args.archive or None), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench/bench_scheduler.py
+"""
+调度器开销基准：python -m bench.bench_scheduler --recipients 5000
+
+模拟一整天：用虚拟时钟把所有接收人按本地时间触发一遍，
+统计 add_many / 每次唤醒 pop_due 的耗时，结果以 JSON 输出到 stdout。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from datetime import time as dtime
+
+from jobs.scheduler import LocalTimeDispatcher, ScheduleEntry
+
+TZS = [
+    "Asia/Shanghai",
+    "Asia/Tokyo",
+    "Europe/London",
+    "Europe/Berlin",
+    "America/New_York",
+    "America/Los_Angeles",
+    "Australia/Sydney",
+]
+
+
+def run(recipients: int, cities: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    entries = [
+        ScheduleEntry(
+            key=f"r{i}",
+            city=f"city{rnd.randrange(cities)}",
+            send_time=dtime(rnd.randrange(6, 10), rnd.choice([0, 15, 30, 45])),
+            tz=rnd.choice(TZS),
+        )
+        for i in range(recipients)
+    ]
+
+    now = 1_700_000_000.0
+    d = LocalTimeDispatcher(coalesce_sec=30.0, clock=lambda: now)
+
+    t0 = time.perf_counter()
+    d.add_many(entries, now=now)
+    add_sec = time.perf_counter() - t0
+
+    wakes = 0
+    fired = 0
+    pop_sec = 0.0
+    end = now + 86400.0
+    while True:
+        due = d.next_due()
+        if due is None or due > end:
+            break
+        now = due
+        t0 = time.perf_counter()
+        batch = d.pop_due(now)
+        pop_sec += time.perf_counter() - t0
+        if batch:
+            wakes += 1
+            fired += len(batch.entries)
+
+    return {
+        "bench": "scheduler",
+        "recipients": recipients,
+        "cities": cities,
+        "add_many_ms": round(add_sec * 1000, 3),
+        "wakeups": wakes,
+        "fired": fired,
+        "pop_total_ms": round(pop_sec * 1000, 3),
+        "pop_per_wake_us": round(pop_sec / max(1, wakes) * 1e6, 2),
+        "pop_per_entry_us": round(pop_sec / max(1, fired) * 1e6, 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--recipients", type=int, default=5000)
+    ap.add_argument("--cities", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    print(json.dumps(run(args.recipients, args.cities, args.seed), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
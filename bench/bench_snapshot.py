@@ -0,0 +1,102 @@
+# bench/bench_snapshot.py
+"""
+启动快照基准：python -m bench.bench_snapshot --sizes 1000,10000,50000
+
+- startup：GeoCache 初始化 + 查一个城市（冷启动时的 geo 开销），JSON 整体解析 vs 快照 mmap 二分查找
+- cold_batch：冷启动批量解析 N 个城市时缓存文件的写盘次数与耗时，每次 set 都落盘（save_interval_sec=0，原行为）vs 合并落盘
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from utils import snapshot
+from weather.geo_cache import GeoCache
+from weather.models import Location
+
+
+def _entries(n: int) -> Dict[str, Dict[str, Any]]:
+    return {
+        f"城市{i}": {"id": str(101000000 + i), "name": f"城市{i}", "lat": 23.0 + i * 1e-4, "lon": 113.0, "adm1": "广东省", "adm2": "广州", "tz": "Asia/Shanghai"}
+        for i in range(n)
+    }
+
+
+def _startup(geo: Path, snap: Path, key: str, repeat: int) -> float:
+    xs: List[float] = []
+    for _ in range(repeat):
+        # 每轮都重新打开（模拟新进程）
+        snapshot._close_default(snap)
+        t0 = time.perf_counter()
+        c = GeoCache(str(geo), snapshot_path=str(snap))
+        assert c.get(key) is not None
+        xs.append(time.perf_counter() - t0)
+    return round(statistics.median(xs) * 1000, 3)
+
+
+def bench_startup(tmp: Path, n: int, repeat: int) -> Dict[str, Any]:
+    geo = tmp / f"geo_{n}.json"
+    geo.write_text(json.dumps(_entries(n), ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    key = f"城市{n // 2}"
+    json_ms = _startup(geo, tmp / "absent.snap", key, repeat)
+    snap = tmp / f"startup_{n}.snap"
+    stats = snapshot.build_snapshot(snap, geo_file=geo)
+    snap_ms = _startup(geo, snap, key, repeat)
+    snapshot._close_default(snap)
+    return {
+        "entries": n,
+        "json_bytes": geo.stat().st_size,
+        "snapshot_bytes": stats["bytes"],
+        "json_ms": json_ms,
+        "snapshot_ms": snap_ms,
+        "speedup": round(json_ms / snap_ms, 1) if snap_ms else None,
+    }
+
+
+def bench_cold_batch(tmp: Path, existing: int, cities: int) -> List[Dict[str, Any]]:
+    rows = []
+    for label, interval in (("per_set", 0.0), ("coalesced", 2.0)):
+        geo = tmp / f"batch_{label}.json"
+        geo.write_text(json.dumps(_entries(existing), ensure_ascii=False), encoding="utf-8")
+        c = GeoCache(str(geo), snapshot_path=str(tmp / "absent.snap"), save_interval_sec=interval)
+        saves = 0
+        orig = c.save
+
+        def counted() -> None:
+            nonlocal saves
+            saves += 1
+            orig()
+
+        c.save = counted  # type: ignore[method-assign]
+        t0 = time.perf_counter()
+        for i in range(cities):
+            c.set(f"新城市{i}", Location(id=str(i), name=f"新城市{i}", lat=0.0, lon=0.0))
+        c.flush()
+        rows.append({"mode": label, "existing": existing, "new_cities": cities, "saves": saves, "ms": round((time.perf_counter() - t0) * 1000, 1)})
+    return rows
+
+
+def run(sizes: List[int], repeat: int, batch_cities: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="wx_snap_") as tmp:
+        startup = [bench_startup(Path(tmp), n, repeat) for n in sizes]
+        batch = bench_cold_batch(Path(tmp), max(sizes), batch_cities)
+    return {"bench": "snapshot", "repeat": repeat, "startup": startup, "cold_batch": batch}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,50000", help="geo 缓存条数，逗号分隔")
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--batch-cities", type=int, default=50)
+    args = ap.parse_args()
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    print(json.dumps(run(sizes, args.repeat, args.batch_cities), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench/fake_wx.py
+"""
+假的 wxauto.WeChat：只记录调用，不碰 UI。
+
+支持 send_text / send_file 用到的 ChatWith / SendMsg / SendFiles，以及登录检测用的 GetSessionList、
+读取聊天记录的 GetAllMessage。每次操作可配置固定耗时以模拟 UI 自动化开销。
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class FakeWeChat:
+    op_latency_sec: float = 0.0
+    # drop_every=N：每 N 条 SendMsg 丢一条（模拟“无异常但没发出去”）
+    drop_every: int = 0
+    # 发出的消息延迟多久才出现在聊天记录里（模拟 UI 刷新）
+    echo_delay_sec: float = 0.0
+    # GetAllMessage 只返回最近 N 条（模拟聊天窗口只加载了一屏）；0 不限
+    history_window: int = 0
+    # logout_after=N：第 N 条之后掉线（SendMsg 抛异常、会话列表为空），模拟账号被踢下线
+    logout_after: int = 0
+    logged_in: bool = True
+    clock: Callable[[], float] = time.monotonic
+
+    current_chat: Optional[str] = None
+    sent: List[Tuple[str, str]] = field(default_factory=list)
+    files: List[Tuple[str, str]] = field(default_factory=list)
+    # 会话 -> [(可见时间, 发送者, 内容)]
+    chats: Dict[str, List[Tuple[float, str, str]]] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    def _op(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.op_latency_sec > 0:
+            time.sleep(self.op_latency_sec)
+
+    def GetSessionList(self) -> Dict[str, int]:
+        self._op("GetSessionList")
+        return {"文件传输助手": 0} if self.logged_in else {}
+
+    def ChatWith(self, who: str) -> None:
+        self._op("ChatWith")
+        self.current_chat = who
+
+    def SendMsg(self, msg: str, who: Optional[str] = None) -> None:
+        self._op("SendMsg")
+        if self.logout_after and len(self.sent) >= self.logout_after:
+            self.logged_in = False
+        if not self.logged_in:
+            raise RuntimeError("wechat window not available")
+        chat = who or self.current_chat
+        if chat is None:
+            raise RuntimeError("no active chat")
+        self.sent.append((chat, msg))
+        if self.drop_every and len(self.sent) % self.drop_every == 0:
+            return
+        self.chats.setdefault(chat, []).append((self.clock() + self.echo_delay_sec, "Self", msg))
+
+    def receive(self, chat: str, msg: str, sender: str = "friend") -> None:
+        """模拟对方发来消息"""
+        self.chats.setdefault(chat, []).append((self.clock(), sender, msg))
+
+    def SendFiles(self, filepath: str, who: Optional[str] = None) -> None:
+        self._op("SendFiles")
+        chat = who or self.current_chat
+        if chat is None:
+            raise RuntimeError("no active chat")
+        self.files.append((chat, filepath))
+
+    def GetAllMessage(self) -> List[List[str]]:
+        self._op("GetAllMessage")
+        # wxauto 3.9 的消息格式：[发送者, 内容]
+        now = self.clock()
+        msgs = [[who, m] for at, who, m in self.chats.get(self.current_chat or "", []) if at <= now]
+        return msgs[-self.history_window:] if self.history_window else msgs
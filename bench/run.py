@@ -0,0 +1,280 @@
+# bench/run.py
+"""
+离线基准套件（无需 API Key / Windows / 微信）
+
+    python -m bench.run                       # 全部
+    python -m bench.run --only build,batch    # 指定项
+    python -m bench.run --out bench.jsonl     # 结果追加为一行 JSON，便于跨版本对比
+
+基准项：
+- single：单城市 get_today_weather 延迟（geo 已缓存）
+- batch：N 个城市流水线吞吐（run_pipeline）
+- build：MessageBuilder.build 吞吐
+- e2e：main.main 端到端延迟（stub server + 假微信）
+- fanout：M 个城市 N 个接收人按人生成消息（正文缓存 + 按人种子随机），折算成“完整构建次数”
+- json：JSON 解码/缓存文件编码开销与 gzip 体积（见 bench/bench_json.py）
+- card：N 个地点的天气卡片渲染（冷缓存单进程 / 冷缓存进程池 / 全部命中）
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from bench import bench_json
+from bench.fake_wx import FakeWeChat
+from bench.stub_server import StubConfig, StubQWeatherServer
+from jobs.pipeline import PipelineItem, PipelineOptions, run_pipeline
+from message.builder import BodyCache, MessageBuilder, recipient_seed
+from message.config import MessageConfig
+from weather.http_client import QWeatherHttpClient
+from weather.qweather_provider import QWeatherProvider
+from wechat.messenger import SendOptions
+
+BENCHES = ("single", "batch", "build", "fanout", "json", "e2e", "card")
+
+FAST_SEND = SendOptions(pre_delay_sec_min=0.0, pre_delay_sec_max=0.0, retries=0, press_esc_before_send=False)
+
+
+def _percentiles(xs: List[float]) -> Dict[str, float]:
+    xs = sorted(xs)
+    if not xs:
+        return {}
+
+    def pct(p: float) -> float:
+        return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))]
+
+    return {
+        "min_ms": round(xs[0] * 1000, 3),
+        "p50_ms": round(pct(0.5) * 1000, 3),
+        "p95_ms": round(pct(0.95) * 1000, 3),
+        "max_ms": round(xs[-1] * 1000, 3),
+        "mean_ms": round(statistics.fmean(xs) * 1000, 3),
+    }
+
+
+def _provider(srv: StubQWeatherServer, cache_dir: Path) -> QWeatherProvider:
+    return QWeatherProvider(
+        client=QWeatherHttpClient(api_host=srv.url, api_key="bench"),
+        cache_file=str(cache_dir / "geo.json"),
+    )
+
+
+def bench_single(srv: StubQWeatherServer, cache_dir: Path, iterations: int) -> Dict[str, Any]:
+    provider = _provider(srv, cache_dir)
+    provider.get_today_weather("广州市")  # 预热：geo 缓存 + 连接
+    xs = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        provider.get_today_weather("广州市")
+        xs.append(time.perf_counter() - t0)
+    return {"iterations": iterations, **_percentiles(xs)}
+
+
+def bench_batch(srv: StubQWeatherServer, cache_dir: Path, cities: int, workers: int) -> Dict[str, Any]:
+    provider = _provider(srv, cache_dir)
+    builder = MessageBuilder(MessageConfig(randomize=False))
+    items = [PipelineItem(friend_name=f"f{i}", city=f"城市{i}") for i in range(cities)]
+    sent: List[str] = []
+    stats = run_pipeline(
+        items,
+        fetch=provider.get_today_weather,
+        build=lambda dto, it: builder.build(dto),
+        send=lambda it, text: sent.append(text),
+        opt=PipelineOptions(fetch_workers=workers),
+    )
+    return {
+        "cities": cities,
+        "workers": workers,
+        "elapsed_sec": round(stats.elapsed_sec, 3),
+        "cities_per_sec": round(cities / stats.elapsed_sec, 2),
+        "first_send_ms": round((stats.first_send_sec or 0.0) * 1000, 3),
+        "failed": stats.failed,
+    }
+
+
+def bench_build(srv: StubQWeatherServer, cache_dir: Path, iterations: int) -> Dict[str, Any]:
+    dto = _provider(srv, cache_dir).get_today_weather("广州市")
+    builder = MessageBuilder(MessageConfig(randomize=True))
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        builder.build(dto)
+    sec = time.perf_counter() - t0
+    return {"iterations": iterations, "us_per_build": round(sec / iterations * 1e6, 3), "builds_per_sec": round(iterations / sec, 1)}
+
+
+def bench_fanout(srv: StubQWeatherServer, cache_dir: Path, recipients: int, cities: int) -> Dict[str, Any]:
+    dto = _provider(srv, cache_dir).get_today_weather("广州市")
+    dtos = [dataclasses.replace(dto, location_id=f"f{i}", temp_max_c=20 + i % 15) for i in range(cities)]
+    cfg = MessageConfig(randomize=True, templates_path=str(Path(__file__).resolve().parents[1] / "message" / "templates.json"))
+
+    def run_all(builder: MessageBuilder, per_recipient: Callable[[MessageBuilder, Any, int], str]) -> float:
+        t0 = time.perf_counter()
+        for i in range(recipients):
+            per_recipient(builder, dtos[i % cities], i)
+        return time.perf_counter() - t0
+
+    # 基线：每个接收人完整构建一次（正文缓存容量 0，永远不命中）
+    naive = run_all(MessageBuilder(cfg, body_cache=BodyCache(max_entries=0)), lambda b, w, i: b.build(w))
+
+    builder = MessageBuilder(cfg, body_cache=BodyCache())
+    texts = set()
+    sec = run_all(builder, lambda b, w, i: texts.add(b.build_for(w, recipient_seed(f"r{i}", w.target_date))) or "")
+    full_build = naive / recipients
+    return {
+        "recipients": recipients,
+        "cities": cities,
+        "naive_ms": round(naive * 1000, 2),
+        "memoized_ms": round(sec * 1000, 2),
+        "speedup": round(naive / sec, 2),
+        "full_build_us": round(full_build * 1e6, 2),
+        "per_recipient_us": round(sec / recipients * 1e6, 2),
+        "body_builds": builder.body_cache.misses,
+        "distinct_messages": len(texts),
+    }
+
+
+def bench_e2e(srv: StubQWeatherServer, cache_dir: Path, recipients: int, iterations: int) -> Dict[str, Any]:
+    import main as app
+
+    cfg = cache_dir / "bench_config.ini"
+    lines = ["[wechat]", "wechat_path = fake.exe", ""]
+    for i in range(recipients):
+        lines += [f"[recipient:r{i}]", f"city = 城市{i % 10}", ""]
+    cfg.write_text("\n".join(lines), encoding="utf-8")
+
+    xs = []
+    wx = FakeWeChat()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        app.main(
+            str(cfg),
+            wx_factory=lambda job: wx,
+            provider_factory=lambda: _provider(srv, cache_dir),
+            send_opt=FAST_SEND,
+        )
+        xs.append(time.perf_counter() - t0)
+    return {"recipients": recipients, "iterations": iterations, "sent": len(wx.sent), **_percentiles(xs)}
+
+
+def bench_card(srv: StubQWeatherServer, cache_dir: Path, cities: int, processes: int) -> Dict[str, Any]:
+    from message.card import CardCache, render_cards
+
+    dto = _provider(srv, cache_dir).get_today_weather("广州市")
+    descs = ("晴", "多云", "小雨", "雷阵雨", "小雪", "雾")
+    dtos = [
+        dataclasses.replace(dto, location_id=f"b{i}", weather_desc=descs[i % len(descs)], temp_max_c=20 + i % 15)
+        for i in range(cities)
+    ]
+
+    def once(sub: str, procs: int) -> Dict[str, Any]:
+        cache = CardCache(str(cache_dir / sub), max_bytes=1 << 30)
+        t0 = time.perf_counter()
+        render_cards(dtos, cache, processes=procs)
+        cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        render_cards(dtos, cache, processes=procs)
+        warm = time.perf_counter() - t0
+        return {
+            "cold_sec": round(cold, 3),
+            "ms_per_card": round(cold / cities * 1000, 3),
+            "warm_sec": round(warm, 4),
+            "avg_kb": round(cache.total_bytes / max(1, cache.renders) / 1024, 1),
+        }
+
+    out: Dict[str, Any] = {"cities": cities, "single": once("single", 0)}
+    if processes > 1:
+        out["pool"] = {"processes": processes, **once("pool", processes)}
+    return out
+
+
+def _version() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=Path(__file__).resolve().parents[1],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    only = [x.strip() for x in args.only.split(",") if x.strip()] if args.only else list(BENCHES)
+    stub_cfg = StubConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+
+    results: Dict[str, Any] = {}
+    with StubQWeatherServer(stub_cfg) as srv, tempfile.TemporaryDirectory(prefix="wx_bench_") as tmp:
+        runners: Dict[str, Callable[[], Dict[str, Any]]] = {
+            "single": lambda: bench_single(srv, Path(tmp) / "single", args.iterations),
+            "batch": lambda: bench_batch(srv, Path(tmp) / "batch", args.cities, args.workers),
+            "build": lambda: bench_build(srv, Path(tmp) / "build", args.build_iterations),
+            "fanout": lambda: bench_fanout(srv, Path(tmp) / "fanout", args.fanout_recipients, args.fanout_cities),
+            "json": lambda: bench_json.run(args.cities),
+            "e2e": lambda: bench_e2e(srv, Path(tmp) / "e2e", args.recipients, args.e2e_iterations),
+            "card": lambda: bench_card(srv, Path(tmp) / "card", args.card_cities, args.card_processes),
+        }
+        for name in only:
+            if name not in runners:
+                raise SystemExit(f"未知基准项：{name}（可选 {', '.join(BENCHES)}）")
+            (Path(tmp) / name).mkdir(parents=True, exist_ok=True)
+            results[name] = runners[name]()
+        results["stub"] = {
+            "requests": srv.stats.requests,
+            "errors": srv.stats.errors,
+            "bytes_out": srv.stats.bytes_out,
+            "bytes_raw": srv.stats.bytes_raw,
+        }
+
+    return {
+        "suite": "weather_sender",
+        "version": _version(),
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", default="")
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--jitter-ms", type=float, default=5.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--iterations", type=int, default=30)
+    ap.add_argument("--cities", type=int, default=100)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--build-iterations", type=int, default=20000)
+    ap.add_argument("--recipients", type=int, default=20)
+    ap.add_argument("--e2e-iterations", type=int, default=5)
+    ap.add_argument("--fanout-recipients", type=int, default=10000)
+    ap.add_argument("--fanout-cities", type=int, default=50)
+    ap.add_argument("--card-cities", type=int, default=500)
+    ap.add_argument("--card-processes", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--out", default="", help="结果追加写入的 JSONL 文件")
+    args = ap.parse_args()
+
+    report = run(args)
+    line = json.dumps(report, ensure_ascii=False)
+    print(line)
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
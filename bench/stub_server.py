@@ -0,0 +1,408 @@
+# bench/stub_server.py
+"""
+本地 QWeather stub server（仅用于基准/联调，不需要 API Key）
+
+覆盖：/geo/v2/city/lookup、/v7/weather/now|3d|24h、/v7/air/now、/v7/indices/1d、/v7/warning/now，
+以及 Open-Meteo 的 /v1/forecast（按 latitude/longitude 生成；起两个实例即可模拟两个数据源）
+- 返回结构与字段名按和风天气 v7 文档构造，数据按 location 确定性生成
+- latency_ms / jitter_ms：每个请求的人为延迟
+- error_rate：按比例返回 HTTP 500（air / indices 出错时 provider 会降级为空）
+- gzip：请求带 Accept-Encoding: gzip 时压缩响应（与线上一致）
+
+单独运行：python -m bench.stub_server --port 8765 --latency-ms 30
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+_TEXTS = ["晴", "多云", "阴", "小雨", "中雨", "雷阵雨", "阵雨", "雾"]
+_WIND_DIRS = ["北风", "东北风", "东风", "东南风", "南风", "西南风", "西风", "西北风"]
+
+
+def _seed(s: str) -> int:
+    return int(hashlib.md5(s.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def location_id_for(name: str) -> str:
+    return str(101000000 + _seed(name) % 999999)
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    # 固定“今天”，保证可复现
+    today: date = field(default_factory=lambda: date(2026, 10, 19))
+    seed: int = 0
+    gzip: bool = True
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    errors: int = 0
+    bytes_out: int = 0        # 实际发出（压缩后）
+    bytes_raw: int = 0        # 压缩前 JSON
+    by_path: Dict[str, int] = field(default_factory=dict)
+
+
+def _geo(q: str) -> Dict[str, Any]:
+    name = q.strip() or "未知"
+    simple = name
+    for suffix in ("市", "区", "县"):
+        simple = simple.replace(suffix, "")
+    locs = []
+    for i in range(10):
+        nm = simple if i == 0 else f"{simple}{i}"
+        locs.append(
+            {
+                "name": nm,
+                "id": location_id_for(nm),
+                "lat": f"{20 + _seed(nm) % 2000 / 100:.5f}",
+                "lon": f"{100 + _seed(nm + 'x') % 2500 / 100:.5f}",
+                "adm2": simple,
+                "adm1": "广东省",
+                "country": "中国",
+                "tz": "Asia/Shanghai",
+                "utcOffset": "+08:00",
+                "isDst": "0",
+                "type": "city",
+                "rank": str(10 + i),
+                "fxLink": f"https://www.qweather.com/weather/{nm}.html",
+            }
+        )
+    return {"code": "200", "location": locs, "refer": {"sources": ["QWeather"], "license": ["QWeather Developers License"]}}
+
+
+def _update_time(cfg: StubConfig) -> str:
+    return f"{cfg.today.isoformat()}T07:35+08:00"
+
+
+def _now(loc: str, cfg: StubConfig) -> Dict[str, Any]:
+    r = random.Random(_seed(loc) + cfg.seed)
+    temp = r.randint(5, 32)
+    return {
+        "code": "200",
+        "updateTime": _update_time(cfg),
+        "fxLink": "https://www.qweather.com/weather/x.html",
+        "now": {
+            "obsTime": f"{cfg.today.isoformat()}T07:30+08:00",
+            "temp": str(temp),
+            "feelsLike": str(temp - r.randint(0, 3)),
+            "icon": "101",
+            "text": r.choice(_TEXTS),
+            "wind360": str(r.randint(0, 359)),
+            "windDir": r.choice(_WIND_DIRS),
+            "windScale": str(r.randint(1, 6)),
+            "windSpeed": str(r.randint(2, 30)),
+            "humidity": str(r.randint(30, 95)),
+            "precip": "0.0",
+            "pressure": str(r.randint(990, 1030)),
+            "vis": str(r.randint(5, 30)),
+            "cloud": str(r.randint(0, 100)),
+            "dew": str(temp - 5),
+        },
+        "refer": {"sources": ["QWeather"], "license": ["QWeather Developers License"]},
+    }
+
+
+def _daily3d(loc: str, cfg: StubConfig) -> Dict[str, Any]:
+    r = random.Random(_seed(loc) + cfg.seed + 1)
+    daily = []
+    for i in range(3):
+        d = cfg.today + timedelta(days=i)
+        tmin = r.randint(0, 25)
+        daily.append(
+            {
+                "fxDate": d.isoformat(),
+                "sunrise": "06:30",
+                "sunset": "18:05",
+                "moonrise": "14:10",
+                "moonset": "23:40",
+                "moonPhase": "盈凸月",
+                "moonPhaseIcon": "803",
+                "tempMax": str(tmin + r.randint(3, 10)),
+                "tempMin": str(tmin),
+                "iconDay": "101",
+                "textDay": r.choice(_TEXTS),
+                "iconNight": "151",
+                "textNight": r.choice(_TEXTS),
+                "wind360Day": str(r.randint(0, 359)),
+                "windDirDay": r.choice(_WIND_DIRS),
+                "windScaleDay": f"{r.randint(1, 3)}-{r.randint(4, 6)}",
+                "windSpeedDay": str(r.randint(3, 24)),
+                "wind360Night": str(r.randint(0, 359)),
+                "windDirNight": r.choice(_WIND_DIRS),
+                "windScaleNight": "1-3",
+                "windSpeedNight": str(r.randint(3, 15)),
+                "humidity": str(r.randint(30, 95)),
+                "precip": f"{r.random() * 5:.1f}",
+                "pressure": str(r.randint(990, 1030)),
+                "vis": "25",
+                "cloud": str(r.randint(0, 100)),
+                "uvIndex": str(r.randint(1, 11)),
+            }
+        )
+    return {"code": "200", "updateTime": _update_time(cfg), "fxLink": "https://www.qweather.com/weather/x.html", "daily": daily,
+            "refer": {"sources": ["QWeather"], "license": ["QWeather Developers License"]}}
+
+
+def _hourly24h(loc: str, cfg: StubConfig) -> Dict[str, Any]:
+    r = random.Random(_seed(loc) + cfg.seed + 2)
+    start = datetime(cfg.today.year, cfg.today.month, cfg.today.day, 8)
+    hourly = []
+    for i in range(24):
+        t = start + timedelta(hours=i)
+        hourly.append(
+            {
+                "fxTime": t.strftime("%Y-%m-%dT%H:00+08:00"),
+                "temp": str(r.randint(5, 30)),
+                "icon": "101",
+                "text": r.choice(_TEXTS),
+                "wind360": str(r.randint(0, 359)),
+                "windDir": r.choice(_WIND_DIRS),
+                "windScale": "1-3",
+                "windSpeed": str(r.randint(2, 20)),
+                "humidity": str(r.randint(30, 95)),
+                "pop": str(r.choice([0, 0, 5, 10, 20, 40, 60, 80])),
+                "precip": "0.0",
+                "pressure": "1012",
+                "cloud": str(r.randint(0, 100)),
+                "dew": "12",
+            }
+        )
+    return {"code": "200", "updateTime": _update_time(cfg), "fxLink": "https://www.qweather.com/weather/x.html", "hourly": hourly,
+            "refer": {"sources": ["QWeather"], "license": ["QWeather Developers License"]}}
+
+
+def _air(loc: str, cfg: StubConfig) -> Dict[str, Any]:
+    r = random.Random(_seed(loc) + cfg.seed + 3)
+    aqi = r.randint(15, 220)
+    return {
+        "code": "200",
+        "updateTime": _update_time(cfg),
+        "fxLink": "https://air.qweather.com/x.html",
+        "now": {
+            "pubTime": _update_time(cfg),
+            "aqi": str(aqi),
+            "level": "2",
+            "category": "良",
+            "primary": "PM2.5",
+            "pm10": str(r.randint(10, 150)),
+            "pm2p5": str(r.randint(5, 120)),
+            "no2": str(r.randint(5, 60)),
+            "so2": str(r.randint(1, 20)),
+            "co": f"{r.random():.1f}",
+            "o3": str(r.randint(10, 160)),
+        },
+        "station": [],
+        "refer": {"sources": ["QWeather", "CNEMC"], "license": ["QWeather Developers License"]},
+    }
+
+
+def _indices(loc: str, types: str, cfg: StubConfig) -> Dict[str, Any]:
+    names = {"3": ("穿衣指数", "较舒适", "建议着薄外套、开衫牛仔衫裤等服装。"), "5": ("紫外线指数", "中等", "涂擦SPF大于15、PA+防晒护肤品。")}
+    daily = []
+    for t in [x for x in types.split(",") if x]:
+        nm, cat, text = names.get(t, (f"指数{t}", "适宜", "—"))
+        daily.append({"date": cfg.today.isoformat(), "type": t, "name": nm, "level": "3", "category": cat, "text": text})
+    return {"code": "200", "updateTime": _update_time(cfg), "fxLink": "https://www.qweather.com/indices/x.html", "daily": daily,
+            "refer": {"sources": ["QWeather"], "license": ["QWeather Developers License"]}}
+
+
+def _warnings(loc: str, cfg: StubConfig) -> Dict[str, Any]:
+    # 约 1/5 的地点有一条生效预警
+    items = []
+    if _seed(loc) % 5 == 0:
+        items.append(
+            {
+                "id": f"{loc}{cfg.today.strftime('%Y%m%d')}0800",
+                "sender": "气象台",
+                "pubTime": f"{cfg.today.isoformat()}T08:00+08:00",
+                "title": "发布暴雨黄色预警信号",
+                "startTime": f"{cfg.today.isoformat()}T08:00+08:00",
+                "endTime": f"{cfg.today.isoformat()}T20:00+08:00",
+                "status": "active",
+                "severity": "Moderate",
+                "severityColor": "Yellow",
+                "type": "11B03",
+                "typeName": "暴雨",
+                "urgency": "",
+                "certainty": "",
+                "text": "预计未来6小时内可能出现50毫米以上降雨，请注意防范。",
+                "related": "",
+            }
+        )
+    return {"code": "200", "updateTime": _update_time(cfg), "fxLink": "https://www.qweather.com/severe-weather/x.html",
+            "warning": items, "refer": {"sources": ["12379"], "license": ["QWeather Developers License"]}}
+
+
+def _openmeteo(q: Dict[str, str], cfg: StubConfig) -> Dict[str, Any]:
+    key = f"{q.get('latitude', '')},{q.get('longitude', '')}"
+    r = random.Random(_seed(key) + cfg.seed + 4)
+    days = 3
+    tmin = [round(r.uniform(0, 25), 1) for _ in range(days)]
+    return {
+        "latitude": float(q.get("latitude") or 0),
+        "longitude": float(q.get("longitude") or 0),
+        "timezone": q.get("timezone") or "Asia/Shanghai",
+        "current": {
+            "time": f"{cfg.today.isoformat()}T07:30",
+            "weather_code": r.choice([0, 1, 2, 3, 45, 61, 63, 80, 95]),
+            "wind_speed_10m": round(r.uniform(0.5, 12), 1),
+            "wind_direction_10m": r.randint(0, 359),
+        },
+        "daily": {
+            "time": [(cfg.today + timedelta(days=i)).isoformat() for i in range(days)],
+            "weather_code": [r.choice([0, 1, 2, 3, 45, 61, 63, 80, 95]) for _ in range(days)],
+            "temperature_2m_max": [round(t + r.uniform(3, 10), 1) for t in tmin],
+            "temperature_2m_min": tmin,
+            "precipitation_probability_max": [r.choice([0, 5, 10, 20, 40, 60, 80]) for _ in range(days)],
+            "uv_index_max": [round(r.uniform(1, 11), 2) for _ in range(days)],
+            "wind_speed_10m_max": [round(r.uniform(2, 15), 1) for _ in range(days)],
+            "wind_direction_10m_dominant": [r.randint(0, 359) for _ in range(days)],
+        },
+    }
+
+
+def render_payload(path: str, q: Dict[str, str], cfg: StubConfig) -> Optional[Dict[str, Any]]:
+    loc = q.get("location", "")
+    if path == "/geo/v2/city/lookup":
+        return _geo(loc)
+    if path == "/v7/weather/now":
+        return _now(loc, cfg)
+    if path == "/v7/weather/3d":
+        return _daily3d(loc, cfg)
+    if path == "/v7/weather/24h":
+        return _hourly24h(loc, cfg)
+    if path == "/v7/air/now":
+        return _air(loc, cfg)
+    if path == "/v7/warning/now":
+        return _warnings(loc, cfg)
+    if path == "/v7/indices/1d":
+        return _indices(loc, q.get("type", ""), cfg)
+    if path == "/v1/forecast":
+        return _openmeteo(q, cfg)
+    return None
+
+
+class StubQWeatherServer:
+    """
+    with StubQWeatherServer(StubConfig(latency_ms=30)) as srv:
+        client = QWeatherHttpClient(api_host=srv.url, api_key="bench")
+    """
+
+    def __init__(self, cfg: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.cfg = cfg or StubConfig()
+        self.stats = StubStats()
+        self._lock = threading.Lock()
+        self._rnd = random.Random(self.cfg.seed)
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                # 头和 body 分两次写，不关 Nagle 会被延迟 ACK 卡 40ms
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args: Any) -> None:
+                return
+
+            def do_GET(self) -> None:
+                u = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(u.query).items()}
+                status, body = outer._handle(u.path, q)
+                raw_len = len(body)
+                gz = outer.cfg.gzip and "gzip" in (self.headers.get("Accept-Encoding") or "")
+                if gz:
+                    body = gzip.compress(body, compresslevel=6)
+                with outer._lock:
+                    outer.stats.bytes_out += len(body)
+                    outer.stats.bytes_raw += raw_len
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if gz:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handle(self, path: str, q: Dict[str, str]) -> Tuple[int, bytes]:
+        cfg = self.cfg
+        with self._lock:
+            delay = cfg.latency_ms + (self._rnd.uniform(-cfg.jitter_ms, cfg.jitter_ms) if cfg.jitter_ms else 0.0)
+            fail = cfg.error_rate > 0 and self._rnd.random() < cfg.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        payload = render_payload(path, q, cfg)
+        if payload is None:
+            status, body = 404, b'{"code":"404"}'
+        elif fail:
+            status, body = 500, b'{"code":"500"}'
+        else:
+            status, body = 200, json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.errors += status != 200
+            self.stats.by_path[path] = self.stats.by_path.get(path, 0) + 1
+        return status, body
+
+    def start(self) -> "StubQWeatherServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="qweather-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubQWeatherServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    srv = StubQWeatherServer(StubConfig(args.latency_ms, args.jitter_ms, args.error_rate), port=args.port)
+    print(f"[INFO] QWeather stub: {srv.url}")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
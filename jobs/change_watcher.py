@@ -0,0 +1,338 @@
+# jobs/change_watcher.py
+"""
+盘中预报变化监控：早上的消息发出后，预报明显变了（降水概率 10% -> 70%、最高气温降 6°C）才补发一条
+
+- 每次发送后记录各地点 DTO 的紧凑指纹（5 个整数 + 当天逐小时降水概率）作为基线，存 .cache/change_state.json；
+  发送进程写、监控进程读（文件变了才重新加载）
+- 降水概率只比较两次预报都覆盖的小时（即刷新时刻之后）：24h 预报从“现在”开始，
+  早上的“剩余小时最大值”包含上午，直接和下午的比会把“雨已经下过”误报成“概率下降”
+- 监控按间隔只刷新 3d/24h（get_forecast_for_location），新指纹与基线逐字段比较，O(1)；
+  超过阈值才通知，通知后基线更新为新指纹（之后和最新发出的比）
+- 当天还没发过早间消息的地点、不在当地 active_hours 内的地点不请求；每个地点每天最多补发 max_updates_per_day 条
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, tzinfo
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from utils import jsoncodec
+from utils.ratelimit import TokenBucket
+from utils.runtime import app_path
+from weather.models import Location, WeatherDTO
+from weather.provider import WeatherProvider
+
+NA = -32768  # 指纹里的“没有数据”
+
+SKY_UNKNOWN, SKY_DRY, SKY_RAIN, SKY_THUNDER, SKY_SNOW = range(5)
+_WET = (SKY_RAIN, SKY_THUNDER, SKY_SNOW)
+# 按优先级匹配天气描述（“多云转雷阵雨”算雷雨）
+_SKY_WORDS: Tuple[Tuple[int, Tuple[str, ...]], ...] = (
+    (SKY_THUNDER, ("雷",)),
+    (SKY_SNOW, ("雪",)),
+    (SKY_RAIN, ("雨",)),
+    (SKY_DRY, ("晴", "云", "阴", "雾", "霾", "沙", "尘")),
+)
+
+CHANGE_POP = "pop"
+CHANGE_TMAX = "tmax"
+CHANGE_TMIN = "tmin"
+CHANGE_SKY = "sky"
+
+
+class Fingerprint(NamedTuple):
+    day: int    # target_date.toordinal()
+    pop: int    # 降水概率（%）
+    tmax: int   # 0.1°C
+    tmin: int   # 0.1°C
+    sky: int    # SKY_*
+    hourly: Tuple[int, ...] = ()   # 按当地小时的降水概率（%），-1 为缺；空表示数据源不提供
+
+
+def _sky(desc: Optional[str]) -> int:
+    for code, words in _SKY_WORDS:
+        if desc and any(w in desc for w in words):
+            return code
+    return SKY_UNKNOWN
+
+
+def _tenths(v: Optional[float]) -> int:
+    return NA if v is None else int(round(v * 10))
+
+
+def fingerprint(dto: WeatherDTO) -> Fingerprint:
+    pop = dto.precipitation_prob
+    return Fingerprint(
+        day=dto.target_date.toordinal(),
+        pop=NA if pop is None else int(round(pop * 100)),
+        tmax=_tenths(dto.temp_max_c),
+        tmin=_tenths(dto.temp_min_c),
+        sky=_sky(dto.weather_desc),
+        hourly=tuple(dto.hourly_pop),
+    )
+
+
+def _pop_pair(old: Fingerprint, new: Fingerprint) -> Tuple[int, int]:
+    """两次的降水概率，按同一时段取最大值；都有逐小时数据时只看两边都有的小时"""
+    if not (old.hourly and new.hourly):
+        # 数据源只给全天值（如 Open-Meteo 的日最大值），本身就是同一时段
+        return old.pop, new.pop
+    a_max = b_max = -1
+    for a, b in zip(old.hourly, new.hourly):
+        if a >= 0 and b >= 0:
+            a_max = a if a > a_max else a_max
+            b_max = b if b > b_max else b_max
+    return (a_max, b_max) if a_max >= 0 else (NA, NA)
+
+
+@dataclass(frozen=True)
+class ChangeOptions:
+    interval_sec: float = 1800.0          # 每个地点的刷新间隔
+    pop_delta_pct: int = 30               # 降水概率变化（百分点）
+    temp_delta_c: float = 5.0             # 最高/最低气温变化（°C）
+    sky_change: bool = True               # 晴雨类别变化（不下雨 <-> 下雨/雷雨/下雪）
+    max_updates_per_day: int = 2          # 每个地点每天最多补发几条
+    active_hours: Tuple[int, int] = (7, 22)   # 只在当地时间 [start, end) 内刷新和通知
+    # 每小时刷新预算（所有地点合计）；需求超出时按比例拉长间隔
+    refresh_budget_per_hour: int = 300
+    state_file: str = ".cache/change_state.json"  # 相对路径按程序目录解析
+
+
+@dataclass(frozen=True)
+class Change:
+    field: str   # CHANGE_*
+    old: int
+    new: int
+
+
+def diff_fingerprints(old: Fingerprint, new: Fingerprint, opt: ChangeOptions) -> List[Change]:
+    """逐字段比较（固定 4 项，降水概率按同一时段）；不同日期的指纹不比"""
+    if old.day != new.day:
+        return []
+    out: List[Change] = []
+    pop_old, pop_new = _pop_pair(old, new)
+    if NA not in (pop_old, pop_new) and abs(pop_new - pop_old) >= opt.pop_delta_pct:
+        out.append(Change(CHANGE_POP, pop_old, pop_new))
+    limit = int(round(opt.temp_delta_c * 10))
+    for name, a, b in ((CHANGE_TMAX, old.tmax, new.tmax), (CHANGE_TMIN, old.tmin, new.tmin)):
+        if NA not in (a, b) and abs(b - a) >= limit:
+            out.append(Change(name, a, b))
+    if (
+        opt.sky_change
+        and old.sky != new.sky
+        and SKY_UNKNOWN not in (old.sky, new.sky)
+        and (old.sky in _WET or new.sky in _WET)
+    ):
+        out.append(Change(CHANGE_SKY, old.sky, new.sky))
+    return out
+
+
+@dataclass
+class Baseline:
+    fp: Fingerprint
+    updates: int = 0   # 当天已补发条数
+
+
+class BaselineStore:
+    """location_id -> 最近一次发出的指纹；JSON 文件，多个进程共享"""
+
+    def __init__(self, state_file: str = ChangeOptions.state_file) -> None:
+        self.path = app_path(state_file)
+        self._items: Dict[str, Baseline] = {}
+        self._stamp: Tuple[int, int] = (-1, -1)
+        self._lock = threading.Lock()
+        self.reload_if_changed()
+
+    def _file_stamp(self) -> Tuple[int, int]:
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return -1, -1
+
+    def reload_if_changed(self) -> bool:
+        """文件被别的进程改过才重新读（每次轮询只 stat 一次）"""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        try:
+            data = jsoncodec.read_file(self.path) if stamp[0] >= 0 else {}
+        except Exception:
+            return False
+        items = {}
+        for loc_id, it in data.items():
+            try:
+                fp = Fingerprint(*(int(x) for x in it["fp"][:5]), hourly=tuple(int(x) for x in it.get("hourly") or ()))
+                items[str(loc_id)] = Baseline(fp, int(it.get("updates", 0)))
+            except Exception:
+                continue
+        with self._lock:
+            self._items = items
+            self._stamp = stamp
+        return True
+
+    def get(self, location_id: str) -> Optional[Baseline]:
+        with self._lock:
+            return self._items.get(location_id)
+
+    def record(self, dtos: Mapping[str, WeatherDTO]) -> None:
+        """发送后调用：更新这些地点的基线（同一天重复发送不清零补发计数）"""
+        if not dtos:
+            return
+        self.reload_if_changed()
+        with self._lock:
+            for loc_id, dto in dtos.items():
+                fp = fingerprint(dto)
+                prev = self._items.get(loc_id)
+                updates = prev.updates if prev is not None and prev.fp.day == fp.day else 0
+                self._items[loc_id] = Baseline(fp, updates)
+        self._save()
+
+    def mark_sent(self, location_id: str, fp: Fingerprint) -> None:
+        with self._lock:
+            prev = self._items.get(location_id)
+            updates = prev.updates + 1 if prev is not None and prev.fp.day == fp.day else 1
+            self._items[location_id] = Baseline(fp, updates)
+        self._save()
+
+    def _save(self) -> None:
+        try:
+            with self._lock:
+                data = {
+                    k: {"fp": list(b.fp[:5]), "hourly": list(b.fp.hourly), "updates": b.updates}
+                    for k, b in self._items.items()
+                }
+            jsoncodec.write_file(self.path, data)
+            self._stamp = self._file_stamp()
+        except Exception as e:
+            # 基线写失败最坏是少发/重复一次更新，不影响主流程
+            print(f"[WARN] 保存变化监控基线失败：{e}")
+
+
+class ChangeWatcher:
+    """
+    盘中刷新：所有地点放在一个最小堆里按间隔轮询（令牌桶限流，与预警监控相同）；
+    每次只比较一个 5 元组，几百个地点的开销主要是接口请求本身。
+    """
+
+    def __init__(
+        self,
+        provider: WeatherProvider,
+        locations: Sequence[Location],
+        notify: Callable[[Location, WeatherDTO, List[Change]], None],
+        opt: Optional[ChangeOptions] = None,
+        store: Optional[BaselineStore] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.provider = provider
+        self.notify = notify
+        self.opt = opt or ChangeOptions()
+        self.store = store or BaselineStore(self.opt.state_file)
+        self.clock = clock
+        self.bucket = TokenBucket(self.opt.refresh_budget_per_hour, clock)
+        self._locs: Dict[str, Location] = {loc.id: loc for loc in locations}
+        self._zones: Dict[str, Optional[tzinfo]] = {loc.id: _zone(loc.tz) for loc in locations}
+
+        demand = len(self._locs) * 3600.0 / self.opt.interval_sec
+        self.interval_sec = self.opt.interval_sec * max(1.0, demand / max(1, self.opt.refresh_budget_per_hour))
+        now = clock()
+        step = self.interval_sec / max(1, len(self._locs))
+        # 首轮在一个间隔内错开
+        self._heap: List[Tuple[float, str]] = [(now + i * step, loc_id) for i, loc_id in enumerate(self._locs)]
+        heapq.heapify(self._heap)
+        self._stop = threading.Event()
+
+    def next_poll_in(self) -> float:
+        if not self._heap:
+            return self.interval_sec
+        return max(0.0, self._heap[0][0] - self.clock(), self.bucket.wait_sec())
+
+    def _local(self, loc_id: str, now: float) -> datetime:
+        return datetime.fromtimestamp(now, self._zones.get(loc_id))
+
+    def check(self, loc: Location, base: Baseline) -> Tuple[Optional[WeatherDTO], List[Change]]:
+        dto = self.provider.get_forecast_for_location(loc, query_city=loc.name)
+        return dto, diff_fingerprints(base.fp, fingerprint(dto), self.opt)
+
+    def poll_once(self) -> int:
+        """处理一个到期地点；返回发出的通知数。预算不足时不做任何事。"""
+        if not self._heap or self._heap[0][0] > self.clock():
+            return 0
+        now = self.clock()
+        loc_id = self._heap[0][1]
+        loc = self._locs[loc_id]
+        local = self._local(loc_id, now)
+        self.store.reload_if_changed()
+        base = self.store.get(loc_id)
+
+        start, end = self.opt.active_hours
+        due = (
+            start <= local.hour < end
+            and base is not None
+            and base.fp.day == local.date().toordinal()       # 今天的早间消息已发
+            and base.updates < self.opt.max_updates_per_day
+        )
+        if due and not self.bucket.take():
+            return 0
+        heapq.heapreplace(self._heap, (now + self.interval_sec, loc_id))
+        if not due:
+            return 0
+
+        try:
+            dto, changes = self.check(loc, base)
+        except Exception as e:
+            print(f"[WARN] 预报刷新失败（{loc.name}）：{e}")
+            return 0
+        if not changes:
+            return 0
+        try:
+            self.notify(loc, dto, changes)
+        except Exception as e:
+            print(f"[WARN] 天气变化通知失败（{loc.name}）：{e}")
+            return 0
+        self.store.mark_sent(loc_id, fingerprint(dto))
+        return 1
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_forever(self) -> None:
+        print(f"[INFO] 天气变化监控：{len(self._locs)} 个地点，每 {self.interval_sec / 60:.0f} 分钟刷新一次")
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.next_poll_in())
+
+
+def _zone(tz: Optional[str]) -> Optional[tzinfo]:
+    # 没有 / 无效的 tz 按本机时区
+    if not tz:
+        return None
+    try:
+        return ZoneInfo(tz)
+    except Exception:
+        return None
+
+
+_SKY_TEXT = {SKY_DRY: "不下雨", SKY_RAIN: "有雨", SKY_THUNDER: "有雷雨", SKY_SNOW: "有雪"}
+
+
+def format_changes(dto: WeatherDTO, changes: Sequence[Change]) -> str:
+    lines = [f"🔄【天气有变】{dto.location_name}今天"]
+    for c in changes:
+        if c.field == CHANGE_POP:
+            lines.append(f"降水概率 {c.old}% → {c.new}%")
+        elif c.field in (CHANGE_TMAX, CHANGE_TMIN):
+            label = "最高气温" if c.field == CHANGE_TMAX else "最低气温"
+            lines.append(f"{label} {c.old / 10:g}° → {c.new / 10:g}°")
+        elif c.field == CHANGE_SKY:
+            lines.append(f"天气转为{dto.weather_desc or _SKY_TEXT.get(c.new, '')}")
+    sky = _sky(dto.weather_desc)
+    pop = dto.precipitation_prob
+    if sky in _WET or (pop is not None and pop >= 0.5):
+        lines.append("出门记得带伞☂️")
+    return "\n".join(lines)
@@ -0,0 +1,308 @@
+# jobs/config.py
+from __future__ import annotations
+
+import configparser
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from message.config import default_templates_path
+from utils import jsoncodec
+from utils.runtime import app_dir
+from weather.composite_provider import MODES as PROVIDER_MODES
+from wechat.input_strategy import INPUT_MODES
+
+# 与 main.py 原先写死的字段一致
+DEFAULT_ENABLED_FIELDS: Tuple[str, ...] = (
+    "temperature",
+    "weather",
+    "precipitation",
+    "wind",
+    "uv",
+)
+
+# 天气数据源；第一个为主源（城市检索 / 预警只有和风支持）
+PROVIDER_BACKENDS = ("qweather", "openmeteo")
+
+RECIPIENT_PREFIX = "recipient:"
+ACCOUNT_PREFIX = "account:"
+DEFAULT_ACCOUNT = "default"
+
+# 消息形式：纯文本 / 天气卡片图片 / 两者都发（先图后文）
+FORMAT_TEXT = "text"
+FORMAT_CARD = "card"
+FORMAT_BOTH = "both"
+FORMATS = (FORMAT_TEXT, FORMAT_CARD, FORMAT_BOTH)
+
+
+@dataclass(frozen=True)
+class RecipientConfig:
+    friend_name: str
+    city: str
+    enabled: bool = True
+    enabled_fields: Tuple[str, ...] = DEFAULT_ENABLED_FIELDS
+    templates_path: str = default_templates_path()
+    randomize: bool = True
+    send_time: Optional[str] = None   # "07:30"，接收人本地时间；None 表示立即发送
+    tz: Optional[str] = None          # None 时按城市解析
+    input_mode: Optional[str] = None  # sendmsg / paste / paste_chunks / burst；None 用全局默认
+    format: str = FORMAT_TEXT         # text / card / both
+    # 可用哪些微信账号发送（第一个优先）；空表示任意账号。对方必须是这些账号的好友
+    accounts: Tuple[str, ...] = ()
+
+    @property
+    def wants_card(self) -> bool:
+        return self.format in (FORMAT_CARD, FORMAT_BOTH)
+
+    def variant(self) -> Tuple[Tuple[str, ...], str, bool]:
+        """文案变体：同一地点 + 同一变体只生成一次。"""
+        return self.enabled_fields, self.templates_path, self.randomize
+
+
+@dataclass(frozen=True)
+class AccountConfig:
+    """[account:<名字>] 一节一个微信账号/实例"""
+
+    name: str
+    wechat_path: str
+    nickname: Optional[str] = None    # 登录昵称：多开时按它找到该账号的主窗口（多个账号时必填）
+    rate_per_min: float = 20.0        # 风控：每分钟最多发送条数
+    burst: int = 3                    # 允许连续发送的条数
+
+
+@dataclass(frozen=True)
+class JobConfig:
+    wechat_path: str
+    recipients: Tuple[RecipientConfig, ...]
+    # [metrics] enabled / dir；环境变量 WEATHER_SENDER_METRICS=1 也可开启
+    metrics_enabled: bool = False
+    metrics_dir: str = ""
+    # [card] 天气卡片：缓存目录（空为 .cache/cards）/ 缓存上限 / render 预览的渲染进程数（<=1 不开进程池）/ 字体
+    card_cache_dir: str = ""
+    card_cache_mb: int = 64
+    card_processes: int = 0
+    card_font_path: str = ""
+    # [confirm] 发送后确认消息出现在会话里（多一次读聊天记录的开销）
+    confirm_enabled: bool = False
+    confirm_timeout_sec: float = 3.0
+    # 多账号；没有 [account:*] 时只有一个 default（取 [wechat] wechat_path）
+    accounts: Tuple[AccountConfig, ...] = ()
+    # [provider] 天气数据源：backends 多于一个时组合使用（mode = failover / race，单源超时 deadline_sec）
+    providers: Tuple[str, ...] = ("qweather",)
+    provider_mode: str = "failover"
+    provider_deadline_sec: float = 4.0
+    provider_hedge_sec: float = 0.0
+    openmeteo_host: str = ""
+    # [changes] 盘中预报变化监控（python main.py changes）：开启后 send/serve 才记录基线（state_file，相对程序目录）/
+    # 刷新间隔 / 降水概率与气温变化阈值 / 每地点每天最多补发
+    change_enabled: bool = False
+    change_state_file: str = ".cache/change_state.json"
+    change_interval_min: float = 30.0
+    change_pop_delta_pct: int = 30
+    change_temp_delta_c: float = 5.0
+    change_max_per_day: int = 2
+
+    def active_recipients(self) -> List[RecipientConfig]:
+        return [r for r in self.recipients if r.enabled]
+
+
+def _split_fields(v: Any) -> Tuple[str, ...]:
+    if v is None:
+        return DEFAULT_ENABLED_FIELDS
+    if isinstance(v, str):
+        items = [x.strip() for x in v.replace("，", ",").split(",")]
+    else:
+        items = [str(x).strip() for x in v]
+    return tuple(x for x in items if x)
+
+
+def _as_bool(v: Any, default: bool = True) -> bool:
+    if v is None or v == "":
+        return default
+    if isinstance(v, bool):
+        return v
+    return str(v).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _resolve_templates(v: Optional[str]) -> str:
+    # 相对路径按程序目录解析（与 templates.json 默认位置一致）
+    if not v:
+        return default_templates_path()
+    p = Path(v)
+    return str(p if p.is_absolute() else app_dir() / p)
+
+
+def _recipient_from_mapping(name: str, m: Dict[str, Any], defaults: Dict[str, Any]) -> RecipientConfig:
+    def get(key: str) -> Any:
+        v = m.get(key)
+        return defaults.get(key) if v is None or v == "" else v
+
+    friend = str(get("friend_name") or name).strip()
+    city = str(get("city") or "").strip()
+    if not friend or not city:
+        raise RuntimeError(f"接收人配置不完整（friend_name / city）：{name}")
+
+    send_time = get("send_time")
+    tz = get("tz")
+    input_mode = get("input_mode")
+    if input_mode and str(input_mode).strip().lower() not in INPUT_MODES:
+        raise RuntimeError(f"接收人 {name} 的 input_mode 无效：{input_mode}（可选 {', '.join(INPUT_MODES)}）")
+    fmt = str(get("format") or FORMAT_TEXT).strip().lower()
+    if fmt not in FORMATS:
+        raise RuntimeError(f"接收人 {name} 的 format 无效：{fmt}（可选 {', '.join(FORMATS)}）")
+    return RecipientConfig(
+        friend_name=friend,
+        city=city,
+        enabled=_as_bool(get("enabled")),
+        enabled_fields=_split_fields(get("enabled_fields")),
+        templates_path=_resolve_templates(get("templates")),
+        randomize=_as_bool(get("randomize")),
+        send_time=str(send_time).strip() if send_time else None,
+        tz=str(tz).strip() if tz else None,
+        input_mode=str(input_mode).strip().lower() if input_mode else None,
+        format=fmt,
+        accounts=_split_fields(get("account") or ()),
+    )
+
+
+def _account_from_mapping(name: str, m: Dict[str, Any]) -> AccountConfig:
+    path = str(m.get("wechat_path") or "").strip()
+    if not name or not path:
+        raise RuntimeError(f"账号配置不完整（名字 / wechat_path）：{name or '?'}")
+    nickname = str(m.get("nickname") or "").strip()
+    return AccountConfig(
+        name=name,
+        wechat_path=path,
+        nickname=nickname or None,
+        rate_per_min=float(m.get("rate_per_min") or 20.0),
+        burst=int(m.get("burst") or 3),
+    )
+
+
+def _with_default_account(accounts: List[AccountConfig], wechat_path: str) -> Tuple[AccountConfig, ...]:
+    if len(accounts) > 1:
+        # 多开时只能按登录昵称区分窗口：没有昵称的账号都会连到同一个窗口
+        nicknames = [a.nickname for a in accounts]
+        missing = [a.name for a in accounts if not a.nickname]
+        if missing:
+            raise RuntimeError(f"多个微信账号时每个账号都要配置 nickname（登录昵称）：{', '.join(missing)}")
+        if len(set(nicknames)) != len(nicknames):
+            raise RuntimeError("多个微信账号的 nickname 不能重复")
+    if accounts:
+        return tuple(accounts)
+    return (AccountConfig(name=DEFAULT_ACCOUNT, wechat_path=wechat_path),)
+
+
+def _load_ini(path: Path) -> JobConfig:
+    cfg = configparser.ConfigParser()
+    cfg.read(path, encoding="utf-8")
+
+    wechat_path = cfg.get("wechat", "wechat_path", fallback="").strip()
+    defaults = dict(cfg.items("defaults")) if cfg.has_section("defaults") else {}
+
+    recipients: List[RecipientConfig] = []
+    accounts: List[AccountConfig] = []
+    for section in cfg.sections():
+        if section.startswith(ACCOUNT_PREFIX):
+            accounts.append(_account_from_mapping(section[len(ACCOUNT_PREFIX):].strip(), dict(cfg.items(section))))
+        elif section.startswith(RECIPIENT_PREFIX):
+            name = section[len(RECIPIENT_PREFIX):].strip()
+            recipients.append(_recipient_from_mapping(name, dict(cfg.items(section)), defaults))
+
+    # 兼容旧格式：[wechat] friend_name + [weather] city
+    if not recipients:
+        friend = cfg.get("wechat", "friend_name", fallback="").strip()
+        city = cfg.get("weather", "city", fallback="").strip()
+        if friend and city:
+            recipients.append(_recipient_from_mapping(friend, {"friend_name": friend, "city": city}, defaults))
+
+    return JobConfig(
+        wechat_path=wechat_path,
+        recipients=tuple(recipients),
+        accounts=_with_default_account(accounts, wechat_path),
+        metrics_enabled=cfg.getboolean("metrics", "enabled", fallback=False),
+        metrics_dir=cfg.get("metrics", "dir", fallback="").strip(),
+        card_cache_dir=cfg.get("card", "cache_dir", fallback="").strip(),
+        card_cache_mb=cfg.getint("card", "cache_mb", fallback=64),
+        card_processes=cfg.getint("card", "processes", fallback=0),
+        card_font_path=cfg.get("card", "font_path", fallback="").strip(),
+        confirm_enabled=cfg.getboolean("confirm", "enabled", fallback=False),
+        confirm_timeout_sec=cfg.getfloat("confirm", "timeout_sec", fallback=3.0),
+        providers=_split_fields(cfg.get("provider", "backends", fallback="qweather")),
+        provider_mode=cfg.get("provider", "mode", fallback="failover").strip().lower(),
+        provider_deadline_sec=cfg.getfloat("provider", "deadline_sec", fallback=4.0),
+        provider_hedge_sec=cfg.getfloat("provider", "hedge_sec", fallback=0.0),
+        openmeteo_host=cfg.get("provider", "openmeteo_host", fallback="").strip(),
+        change_enabled=cfg.getboolean("changes", "enabled", fallback=False),
+        change_state_file=cfg.get("changes", "state_file", fallback="").strip() or ".cache/change_state.json",
+        change_interval_min=cfg.getfloat("changes", "interval_min", fallback=30.0),
+        change_pop_delta_pct=cfg.getint("changes", "pop_delta", fallback=30),
+        change_temp_delta_c=cfg.getfloat("changes", "temp_delta", fallback=5.0),
+        change_max_per_day=cfg.getint("changes", "max_per_day", fallback=2),
+    )
+
+
+def _load_json(path: Path) -> JobConfig:
+    data = jsoncodec.read_file(path)
+    defaults = data.get("defaults") or {}
+    recipients = [
+        _recipient_from_mapping(str(it.get("friend_name", "")), it, defaults)
+        for it in (data.get("recipients") or [])
+    ]
+    metrics = data.get("metrics") or {}
+    card = data.get("card") or {}
+    confirm = data.get("confirm") or {}
+    provider = data.get("provider") or {}
+    changes = data.get("changes") or {}
+    wechat_path = str((data.get("wechat") or {}).get("wechat_path", "")).strip()
+    accounts = [_account_from_mapping(str(it.get("name", "")), it) for it in (data.get("accounts") or [])]
+    return JobConfig(
+        wechat_path=wechat_path,
+        recipients=tuple(recipients),
+        accounts=_with_default_account(accounts, wechat_path),
+        metrics_enabled=_as_bool(metrics.get("enabled"), default=False),
+        metrics_dir=str(metrics.get("dir", "") or "").strip(),
+        card_cache_dir=str(card.get("cache_dir", "") or "").strip(),
+        card_cache_mb=int(card.get("cache_mb", 64)),
+        card_processes=int(card.get("processes", 0)),
+        card_font_path=str(card.get("font_path", "") or "").strip(),
+        confirm_enabled=_as_bool(confirm.get("enabled"), default=False),
+        confirm_timeout_sec=float(confirm.get("timeout_sec", 3.0)),
+        providers=_split_fields(provider.get("backends") or "qweather"),
+        provider_mode=str(provider.get("mode") or "failover").strip().lower(),
+        provider_deadline_sec=float(provider.get("deadline_sec", 4.0)),
+        provider_hedge_sec=float(provider.get("hedge_sec", 0.0)),
+        openmeteo_host=str(provider.get("openmeteo_host", "") or "").strip(),
+        change_enabled=_as_bool(changes.get("enabled"), default=False),
+        change_state_file=str(changes.get("state_file", "") or "").strip() or ".cache/change_state.json",
+        change_interval_min=float(changes.get("interval_min", 30.0)),
+        change_pop_delta_pct=int(changes.get("pop_delta", 30)),
+        change_temp_delta_c=float(changes.get("temp_delta", 5.0)),
+        change_max_per_day=int(changes.get("max_per_day", 2)),
+    )
+
+
+def load_job_config(path: str = "config.ini") -> JobConfig:
+    """
+    一次性解析任务配置（INI 或 JSON，按扩展名区分）。
+
+    INI：[recipient:<名字>] 一节一个接收人，[defaults] 提供公共默认值；
+    没有 recipient 节时回退到旧的 [wechat] friend_name + [weather] city。
+    """
+    p = Path(path)
+    job = _load_json(p) if p.suffix.lower() == ".json" else _load_ini(p)
+    if not job.recipients:
+        raise RuntimeError(f"{path} 中没有配置任何接收人。")
+    unknown_backends = [b for b in job.providers if b not in PROVIDER_BACKENDS]
+    if unknown_backends or not job.providers:
+        raise RuntimeError(f"[provider] backends 无效：{', '.join(unknown_backends)}（可选 {', '.join(PROVIDER_BACKENDS)}）")
+    if job.provider_mode not in PROVIDER_MODES:
+        raise RuntimeError(f"[provider] mode 无效：{job.provider_mode}（可选 {', '.join(PROVIDER_MODES)}）")
+    if job.change_interval_min <= 0:
+        raise RuntimeError("[changes] interval_min 必须大于 0")
+    names = {a.name for a in job.accounts}
+    for r in job.recipients:
+        unknown = [a for a in r.accounts if a not in names]
+        if unknown:
+            raise RuntimeError(f"接收人 {r.friend_name} 引用了未配置的账号：{', '.join(unknown)}")
+    return job
@@ -0,0 +1,247 @@
+# jobs/pipeline.py
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from weather.models import WeatherDTO
+
+# 队列结束标记
+_DONE = object()
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class PipelineItem:
+    friend_name: str
+    city: str
+    payload: Any = None
+
+
+@dataclass(frozen=True)
+class PipelineOptions:
+    # 并发取天气的线程数（HTTP 为主，线程足够）
+    fetch_workers: int = 4
+    # 各级队列容量：下游慢时上游阻塞（背压），内存占用与接收人总数无关
+    queue_size: int = 32
+    # 最近城市的 DTO 复用（有界 LRU），同城接收人相邻时不重复请求
+    dto_cache_size: int = 64
+
+
+@dataclass
+class PipelineStats:
+    fetched: int = 0
+    built: int = 0
+    sent: int = 0
+    failed: int = 0
+    first_send_sec: Optional[float] = None
+    elapsed_sec: float = 0.0
+    # 各级实际耗时（多个取数线程的合计，不含排队/背压等待）与第一条结果产出的时刻
+    fetch_sec: float = 0.0
+    build_sec: float = 0.0
+    first_out_sec: Optional[float] = None
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+class DtoCache:
+    """有界 LRU；同一 key（城市 / 地点）并发请求只发一次（其余线程等待同一个 Future）。"""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._d: "OrderedDict[str, WeatherDTO]" = OrderedDict()
+        self._inflight: Dict[str, "Future[WeatherDTO]"] = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: str, loader: Callable[[str], WeatherDTO]) -> Tuple[WeatherDTO, bool]:
+        """返回 (dto, 是否真正发起了请求)"""
+        with self._lock:
+            v = self._d.get(key)
+            if v is not None:
+                self._d.move_to_end(key)
+                return v, False
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+
+        if not owner:
+            return fut.result(), False
+
+        try:
+            v = loader(key)
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(v)
+            with self._lock:
+                if self.size > 0:
+                    self._d[key] = v
+                    while len(self._d) > self.size:
+                        self._d.popitem(last=False)
+            return v, True
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+def iter_pipeline(
+    items: Iterable[PipelineItem],
+    fetch: Callable[[str], WeatherDTO],
+    build: Callable[[WeatherDTO, PipelineItem], T],
+    opt: Optional[PipelineOptions] = None,
+    stats: Optional[PipelineStats] = None,
+    on_fail: Optional[Callable[[PipelineItem, str, Exception], None]] = None,
+    expand: bool = False,
+) -> Iterator[Tuple[PipelineItem, Any]]:
+    """
+    流式执行 fetch -> build，调用方迭代结果自己发送：
+
+    items ──feeder──> in_q ──fetch×N──> build_q ──build──> out_q ──调用方
+
+    - 调用时后台线程立即开始取天气（不等第一次迭代），调用方可同时准备微信
+    - 每个城市取完就进入下游，第一条消息不必等所有城市取完
+    - expand=True 时 build 返回可迭代对象（如生成器），逐条放进 out_q：一项展开成很多条时也按条背压
+    - 单条失败交给 on_fail（没有时打印），不中断整体
+    """
+    opt = opt or PipelineOptions()
+    stats = stats if stats is not None else PipelineStats()
+    stats_lock = threading.Lock()
+    t_start = time.perf_counter()
+    cache = DtoCache(opt.dto_cache_size)
+
+    in_q: "queue.Queue[Any]" = queue.Queue(maxsize=opt.queue_size)
+    build_q: "queue.Queue[Any]" = queue.Queue(maxsize=opt.queue_size)
+    out_q: "queue.Queue[Any]" = queue.Queue(maxsize=opt.queue_size)
+    workers = max(1, opt.fetch_workers)
+
+    def fail(item: PipelineItem, stage: str, e: Exception) -> None:
+        with stats_lock:
+            stats.failed += 1
+            if len(stats.errors) < 100:
+                stats.errors.append((item.friend_name, f"{stage}: {e}"))
+        if on_fail is not None:
+            on_fail(item, stage, e)
+        else:
+            print(f"[WARN] {stage} 失败（{item.friend_name} / {item.city}）：{e}")
+
+    def feeder() -> None:
+        try:
+            for it in items:
+                in_q.put(it)
+        finally:
+            for _ in range(workers):
+                in_q.put(_DONE)
+
+    def fetcher() -> None:
+        while True:
+            it = in_q.get()
+            if it is _DONE:
+                build_q.put(_DONE)
+                return
+            key = it.city.strip()
+            t0 = time.perf_counter()
+            try:
+                dto, loaded = cache.get_or_load(key, fetch)
+            except Exception as e:
+                fail(it, "fetch", e)
+                continue
+            finally:
+                with stats_lock:
+                    stats.fetch_sec += time.perf_counter() - t0
+            if loaded:
+                with stats_lock:
+                    stats.fetched += 1
+            build_q.put((it, dto))
+
+    def emit(it: PipelineItem, out: Any) -> None:
+        if stats.first_out_sec is None:
+            stats.first_out_sec = time.perf_counter() - t_start
+        stats.built += 1
+        out_q.put((it, out))
+
+    def build_one(it: PipelineItem, dto: WeatherDTO) -> None:
+        # 只计 build 本身（及生成器每一步）的耗时，不含 out_q 满时的等待
+        t0 = time.perf_counter()
+        built = build(dto, it)
+        if not expand:
+            stats.build_sec += time.perf_counter() - t0
+            emit(it, built)
+            return
+        source = iter(built)
+        while True:
+            try:
+                out = next(source)
+            except StopIteration:
+                stats.build_sec += time.perf_counter() - t0
+                return
+            stats.build_sec += time.perf_counter() - t0
+            emit(it, out)
+            t0 = time.perf_counter()
+
+    def builder() -> None:
+        remaining = workers
+        while remaining:
+            got = build_q.get()
+            if got is _DONE:
+                remaining -= 1
+                continue
+            it, dto = got
+            try:
+                build_one(it, dto)
+            except Exception as e:
+                fail(it, "build", e)
+        out_q.put(_DONE)
+
+    threads = [threading.Thread(target=feeder, name="pipeline-feed", daemon=True)]
+    threads += [threading.Thread(target=fetcher, name=f"pipeline-fetch-{i}", daemon=True) for i in range(workers)]
+    threads.append(threading.Thread(target=builder, name="pipeline-build", daemon=True))
+    for t in threads:
+        t.start()
+
+    def drain() -> Iterator[Tuple[PipelineItem, Any]]:
+        while True:
+            got = out_q.get()
+            if got is _DONE:
+                break
+            yield got
+        for t in threads:
+            t.join()
+
+    return drain()
+
+
+def run_pipeline(
+    items: Iterable[PipelineItem],
+    fetch: Callable[[str], WeatherDTO],
+    build: Callable[[WeatherDTO, PipelineItem], T],
+    send: Callable[[PipelineItem, T], None],
+    opt: Optional[PipelineOptions] = None,
+) -> PipelineStats:
+    """
+    iter_pipeline + 在当前线程逐条 send（wxauto 句柄不宜跨线程）；
+    队列有界：发送慢时上游阻塞（背压），内存占用与接收人总数无关。
+    """
+    stats = PipelineStats()
+    t_start = time.perf_counter()
+    for it, built in iter_pipeline(items, fetch, build, opt, stats):
+        try:
+            send(it, built)
+        except Exception as e:
+            stats.failed += 1
+            if len(stats.errors) < 100:
+                stats.errors.append((it.friend_name, f"send: {e}"))
+            print(f"[WARN] send 失败（{it.friend_name} / {it.city}）：{e}")
+            continue
+        stats.sent += 1
+        if stats.first_send_sec is None:
+            stats.first_send_sec = time.perf_counter() - t_start
+    stats.elapsed_sec = time.perf_counter() - t_start
+    return stats
@@ -0,0 +1,228 @@
+# jobs/runner.py
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+from message.builder import BodyCache, MessageBuilder, recipient_seed
+from message.config import MessageConfig
+from weather.models import Location, WeatherDTO
+from weather.provider import WeatherProvider
+
+from .config import FORMAT_CARD, JobConfig, RecipientConfig
+from .pipeline import DtoCache, PipelineItem, PipelineOptions, PipelineStats, iter_pipeline
+from .scheduler import ScheduleEntry, parse_send_time
+
+if TYPE_CHECKING:
+    from message.card import CardCache
+
+
+@dataclass(frozen=True)
+class Outgoing:
+    recipient: RecipientConfig
+    text: str
+    location_id: str = ""
+    card: Optional[str] = None  # 卡片图片路径（接收人 format 为 card/both 且渲染成功时）
+
+
+@dataclass
+class RunPlan:
+    outgoing: List[Outgoing] = field(default_factory=list)
+    failed: List[Tuple[RecipientConfig, str]] = field(default_factory=list)
+    # location_id -> 本次用到的 DTO（发送后记为盘中变化监控的基线）
+    dtos: Dict[str, WeatherDTO] = field(default_factory=dict)
+    # 城市名 -> location_id（把发送失败的接收人对应回地点；按城市计，与接收人数无关）
+    city_locations: Dict[str, str] = field(default_factory=dict)
+    # 统计：实际请求的地点数 / 实际生成正文次数（正文缓存未命中）
+    locations_fetched: int = 0
+    renders: int = 0
+    cards_rendered: int = 0
+    # 流水线各级耗时：取天气 / 生成文案（实际工作时间合计），第一条消息就绪的时刻（自开始取数起）
+    fetch_sec: float = 0.0
+    build_sec: float = 0.0
+    first_ready_sec: Optional[float] = None
+
+
+class BuilderCache:
+    """每个文案变体只构造一次 MessageBuilder（模板文件只读一次）；所有变体共享正文缓存。"""
+
+    def __init__(self, body_cache: Optional[BodyCache] = None) -> None:
+        self._builders: Dict[Tuple, MessageBuilder] = {}
+        self.body_cache = body_cache or BodyCache()
+
+    def get(self, r: RecipientConfig) -> MessageBuilder:
+        key = r.variant()
+        b = self._builders.get(key)
+        if b is None:
+            b = MessageBuilder(
+                MessageConfig(
+                    randomize=r.randomize,
+                    enabled_fields=list(r.enabled_fields),
+                    templates_path=r.templates_path,
+                ),
+                body_cache=self.body_cache,
+            )
+            self._builders[key] = b
+        return b
+
+
+def stream_messages(
+    recipients: List[RecipientConfig],
+    provider: WeatherProvider,
+    builders: Optional[BuilderCache] = None,
+    cards: Optional["CardCache"] = None,
+    opt: Optional[PipelineOptions] = None,
+    report: Optional[RunPlan] = None,
+) -> Iterator[Outgoing]:
+    """
+    按城市 -> 地点 -> 文案变体分组，经 iter_pipeline 流式产出 Outgoing：
+    - 每个城市名只解析一次 Location；每个 location_id 只请求一次天气（N 个线程并发）
+    - 正文每个 (DTO, 启用字段) 只生成一次；问候/结尾按接收人 + 日期取种子随机，可复现
+    - randomize = false 的变体整条消息相同，每个 (location_id, 变体) 只拼一次
+    - 需要卡片的地点在取数线程里出图，每个 location_id 只出一张（cards 为 None 时不出图）
+
+    调用即开始后台取数；失败和统计写进 report（outgoing 不填），迭代结束后计数才完整。
+    每条消息单独进有界队列：同城接收人再多，内存里也只有队列容量那么多条。
+    """
+    builders = builders or BuilderCache()
+    report = report if report is not None else RunPlan()
+    misses_before = builders.body_cache.misses
+    cards_before = cards.renders if cards is not None else 0
+    lock = threading.Lock()
+
+    by_city: Dict[str, List[RecipientConfig]] = {}
+    for r in recipients:
+        by_city.setdefault(r.city.strip(), []).append(r)
+    # 不同城市名可能解析到同一地点：按 location_id 再去重一次
+    by_loc = DtoCache(len(by_city))
+    locs: Dict[str, Location] = {}
+
+    def fetch(city: str) -> WeatherDTO:
+        loc = provider.lookup_location(city)
+        with lock:
+            locs[city] = loc
+            report.city_locations[city] = loc.id
+        dto, loaded = by_loc.get_or_load(loc.id, lambda _: provider.get_weather_for_location(loc, query_city=city))
+        if loaded:
+            with lock:
+                report.locations_fetched += 1
+                report.dtos[loc.id] = dto
+            if cards is not None and any(r.wants_card for r in by_city[city]):
+                # 在取数线程里出图（多个地点并行）；失败时 build 阶段再试一次并告警
+                try:
+                    cards.get_or_render(dto)
+                except Exception:
+                    pass
+        return dto
+
+    def build(dto: WeatherDTO, it: PipelineItem) -> Iterator[Outgoing]:
+        loc_id = locs[it.city].id
+        fixed: Dict[Tuple, str] = {}
+        card = None
+        if cards is not None and any(r.wants_card for r in it.payload):
+            try:
+                card = str(cards.get_or_render(dto))
+            except Exception as e:
+                print(f"[WARN] 天气卡片渲染失败（{it.city}），改发文字：{e}")
+        for r in it.payload:
+            try:
+                if r.randomize:
+                    text = builders.get(r).build_for(dto, recipient_seed(r.friend_name, dto.target_date))
+                else:
+                    key = r.variant()
+                    text = fixed.get(key)
+                    if text is None:
+                        text = fixed[key] = builders.get(r).build(dto)
+            except Exception as e:
+                with lock:
+                    report.failed.append((r, f"render: {e}"))
+                continue
+            yield Outgoing(recipient=r, text=text, location_id=loc_id, card=card if r.wants_card else None)
+
+    def on_fail(it: PipelineItem, stage: str, e: Exception) -> None:
+        with lock:
+            report.failed.extend((r, f"{stage}: {e}") for r in it.payload)
+
+    # 一个城市一项：同城接收人共享一次取数，失败也只记一次
+    items = [PipelineItem(friend_name=rs[0].friend_name, city=city, payload=rs) for city, rs in by_city.items()]
+    stats = PipelineStats()
+    results = iter_pipeline(items, fetch, build, opt, stats, on_fail=on_fail, expand=True)
+
+    def drain() -> Iterator[Outgoing]:
+        for _, out in results:
+            yield out
+        report.fetch_sec = stats.fetch_sec
+        report.build_sec = stats.build_sec
+        report.first_ready_sec = stats.first_out_sec
+        report.renders = builders.body_cache.misses - misses_before
+        if cards is not None:
+            report.cards_rendered = cards.renders - cards_before
+
+    return drain()
+
+
+def plan_messages(
+    recipients: List[RecipientConfig],
+    provider: WeatherProvider,
+    builders: Optional[BuilderCache] = None,
+    cards: Optional["CardCache"] = None,
+    card_processes: int = 0,
+) -> RunPlan:
+    """
+    一次性规划（render 预览等不发送的场景）：stream_messages 收齐后按接收人原顺序排列；
+    卡片最后批量渲染（card_processes > 1 时用进程池）。
+    """
+    plan = RunPlan()
+    order = {id(r): i for i, r in enumerate(recipients)}
+    plan.outgoing = sorted(
+        stream_messages(recipients, provider, builders, report=plan), key=lambda o: order[id(o.recipient)]
+    )
+
+    # 卡片：批量渲染（命中磁盘缓存的不再渲染），失败时这些接收人退回纯文本
+    card_ids = {o.location_id for o in plan.outgoing if o.recipient.wants_card}
+    if cards is not None and card_ids:
+        from message.card import render_cards
+
+        before = cards.renders
+        try:
+            paths = render_cards([plan.dtos[k] for k in card_ids], cards, processes=card_processes)
+        except Exception as e:
+            print(f"[WARN] 天气卡片渲染失败，改发文字：{e}")
+            paths = {}
+        plan.cards_rendered = cards.renders - before
+        plan.outgoing = [
+            replace(o, card=str(paths[o.location_id])) if o.recipient.wants_card and o.location_id in paths else o
+            for o in plan.outgoing
+        ]
+
+    return plan
+
+
+def deliver(
+    out: Outgoing,
+    send: Callable[[RecipientConfig, str], None],
+    send_card: Optional[Callable[[RecipientConfig, str], None]] = None,
+) -> None:
+    """发给一个接收人：有卡片先发图；format=card 只在图发出去时省掉文字，没有图就退回文字。"""
+    card_sent = False
+    if out.card and send_card is not None:
+        send_card(out.recipient, out.card)
+        card_sent = True
+    if not (card_sent and out.recipient.format == FORMAT_CARD):
+        send(out.recipient, out.text)
+
+
+def schedule_entries(job: JobConfig) -> List[ScheduleEntry]:
+    """配置了 send_time 的接收人 -> 调度条目（给 LocalTimeDispatcher 用）"""
+    return [
+        ScheduleEntry(
+            key=r.friend_name,
+            city=r.city,
+            send_time=parse_send_time(r.send_time),
+            tz=r.tz,
+            payload=r,
+        )
+        for r in job.active_recipients()
+        if r.send_time
+    ]
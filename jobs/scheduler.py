@@ -0,0 +1,206 @@
+# jobs/scheduler.py
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+DEFAULT_TZ = "Asia/Shanghai"
+
+
+def parse_send_time(s: str) -> dtime:
+    """'07:30' / '7:30:15' -> datetime.time"""
+    parts = [int(p) for p in str(s).strip().split(":")]
+    if not 2 <= len(parts) <= 3:
+        raise ValueError(f"send_time 格式应为 HH:MM，实际为 '{s}'")
+    return dtime(*parts)
+
+
+def next_fire_ts(send_time: dtime, tz: str, after_ts: float) -> float:
+    """
+    返回 tz 时区下、严格晚于 after_ts 的下一个 send_time 时刻（UTC 时间戳）。
+    夏令时跳变日按 zoneinfo 的 fold=0 语义处理。
+    """
+    zone = ZoneInfo(tz)
+    local_now = datetime.fromtimestamp(after_ts, zone)
+    day = local_now.date()
+    for _ in range(3):
+        cand = datetime.combine(day, send_time, tzinfo=zone).timestamp()
+        if cand > after_ts:
+            return cand
+        day += timedelta(days=1)
+    # 理论上不会走到这里
+    return after_ts + 86400.0
+
+
+@dataclass(frozen=True)
+class ScheduleEntry:
+    key: str            # 唯一标识（一般为接收人）
+    city: str
+    send_time: dtime    # 接收人本地时间
+    tz: Optional[str] = None  # IANA 时区；None 时由 tz_resolver 解析
+    payload: Any = None
+
+
+@dataclass
+class DueBatch:
+    due_at: float
+    entries: List[ScheduleEntry] = field(default_factory=list)
+
+
+class LocalTimeDispatcher:
+    """
+    按接收人本地时间触发的调度器（最小堆 + 惰性删除）
+
+    - add/remove 为 O(log n)，数千接收人也只占一个堆
+    - run_forever 只在下一个任务到期时醒来（带 max_sleep_sec 上限，防止系统时钟跳变）
+    - 到期时间相差不超过 coalesce_sec 的任务合并为一个 DueBatch
+    """
+
+    def __init__(
+        self,
+        *,
+        coalesce_sec: float = 30.0,
+        max_sleep_sec: float = 300.0,
+        tz_resolver: Optional[Callable[[str], Optional[str]]] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.coalesce_sec = coalesce_sec
+        self.max_sleep_sec = max_sleep_sec
+        self.tz_resolver = tz_resolver
+        self.clock = clock
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, ScheduleEntry] = {}
+        self._due: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._tz_cache: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    # ---------- entries ----------
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _resolve_tz(self, e: ScheduleEntry) -> str:
+        if e.tz:
+            return e.tz
+        city = e.city.strip()
+        tz = self._tz_cache.get(city)
+        if tz is None:
+            try:
+                tz = (self.tz_resolver(city) if self.tz_resolver else None) or DEFAULT_TZ
+            except Exception as exc:
+                # 查不到城市（网络 / 配置错误）不能拖垮整个调度：按默认时区发送
+                print(f"[WARN] 解析时区失败（{city}），改用 {DEFAULT_TZ}：{exc}")
+                tz = DEFAULT_TZ
+            try:
+                ZoneInfo(tz)
+            except Exception:
+                print(f"[WARN] 无法识别时区 '{tz}'（{city}），改用 {DEFAULT_TZ}")
+                tz = DEFAULT_TZ
+            self._tz_cache[city] = tz
+        return tz
+
+    def _push(self, key: str, due: float) -> None:
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, next(self._seq), key))
+
+    def add(self, entry: ScheduleEntry, now: Optional[float] = None) -> float:
+        now = self.clock() if now is None else now
+        due = next_fire_ts(entry.send_time, self._resolve_tz(entry), now)
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._push(entry.key, due)
+        self._wakeup.set()
+        return due
+
+    def add_many(self, entries: Iterable[ScheduleEntry], now: Optional[float] = None) -> None:
+        now = self.clock() if now is None else now
+        # 时区解析可能要联网查城市，放在锁外
+        resolved = [(e, next_fire_ts(e.send_time, self._resolve_tz(e), now)) for e in entries]
+        with self._lock:
+            for e, due in resolved:
+                self._entries[e.key] = e
+                self._due[e.key] = due
+            # 批量加载直接 heapify，O(n)
+            self._heap = [(due, next(self._seq), key) for key, due in self._due.items()]
+            heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def remove(self, key: str) -> None:
+        # 惰性删除：堆里的旧记录在弹出时丢弃
+        with self._lock:
+            self._entries.pop(key, None)
+            self._due.pop(key, None)
+
+    # ---------- due ----------
+    def _peek(self) -> Optional[float]:
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            return self._peek()
+
+    def pop_due(self, now: Optional[float] = None) -> Optional[DueBatch]:
+        """
+        弹出所有 due <= now + coalesce_sec 的任务（需至少一个已真正到期），
+        并把它们重新排到各自的下一次发送时间。
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            first = self._peek()
+            if first is None or first > now:
+                return None
+
+            batch = DueBatch(due_at=first)
+            horizon = now + self.coalesce_sec
+            fired: List[Tuple[str, float]] = []
+            while True:
+                due = self._peek()
+                if due is None or due > horizon:
+                    break
+                _, _, key = heapq.heappop(self._heap)
+                batch.entries.append(self._entries[key])
+                fired.append((key, due))
+
+            for key, due in fired:
+                e = self._entries[key]
+                self._push(key, next_fire_ts(e.send_time, self._resolve_tz(e), max(due, now)))
+            return batch
+
+    # ---------- loop ----------
+    def stop(self) -> None:
+        self._stopped = True
+        self._wakeup.set()
+
+    def run_forever(self, handler: Callable[[DueBatch], None]) -> None:
+        """阻塞运行；handler 异常会打印但不中断调度。"""
+        self._stopped = False
+        while not self._stopped:
+            # 先 clear 再检查，避免 add() 的唤醒信号丢失
+            self._wakeup.clear()
+            batch = self.pop_due()
+            if batch is not None:
+                try:
+                    handler(batch)
+                except Exception as e:
+                    print(f"[WARN] 定时批次执行失败：{e}")
+                continue
+
+            due = self.next_due()
+            timeout = self.max_sleep_sec if due is None else max(0.0, min(self.max_sleep_sec, due - self.clock()))
+            self._wakeup.wait(timeout)
+
@@ -0,0 +1,218 @@
+# jobs/sender_pool.py
+"""
+多微信账号发送池
+
+- 每个账号一个分片：自己的 wx 句柄（经 ensure_wechat_ready 按 [account:<名字>] 创建）、自己的限速
+- 接收人按账号亲和分配：配置了 account 的按顺序取第一个可用账号；
+  没配置的用 HRW 哈希在可用账号间稳定分配（某账号掉线时只有它的接收人会换账号）
+- UI 自动化同一时刻只能操作一个窗口，所以发送仍在调用线程串行进行；
+  调度时总是挑“最早拿到令牌”的分片，各账号的限速等待互相重叠，总吞吐约为各账号速率之和
+- run 边生成边发：从上游迭代器按需预取（最多 lookahead 条），当前分片在等令牌时先去取下一条
+- 发送失败后检查该账号登录态（GetSessionList），掉线则标记下线，队列转给其它可用账号
+"""
+from __future__ import annotations
+
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import AccountConfig, RecipientConfig
+from .runner import Outgoing
+
+
+class _RateLimiter:
+    """令牌桶：rate_per_min 条/分钟，最多连续 burst 条"""
+
+    def __init__(self, rate_per_min: float, burst: int, clock: Callable[[], float]) -> None:
+        self.rate = max(0.01, rate_per_min) / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.at = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.at) * self.rate)
+        self.at = now
+
+    def wait_sec(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1.0
+
+
+@dataclass
+class _Shard:
+    account: AccountConfig
+    limiter: _RateLimiter
+    wx: Any = None
+    healthy: bool = True
+    down_at: float = 0.0
+    down_reason: str = ""
+    queue: Deque[Outgoing] = field(default_factory=deque)
+    sent: int = 0
+
+    @property
+    def name(self) -> str:
+        return self.account.name
+
+
+@dataclass(frozen=True)
+class PoolOptions:
+    # 掉线账号多久之后（下一次 run 时）重新尝试登录
+    revive_after_sec: float = 600.0
+    # 从上游（流水线）预取的最多条数：够各分片挑“最早拿到令牌”的，又不必等全部生成完
+    lookahead: int = 64
+
+
+@dataclass
+class PoolReport:
+    sent: Dict[str, int] = field(default_factory=dict)         # 账号 -> 发送条数
+    failed: List[Tuple[RecipientConfig, str]] = field(default_factory=list)
+    moved: int = 0                                              # 因掉线转到其它账号的条数
+    down: Dict[str, str] = field(default_factory=dict)          # 账号 -> 下线原因
+    elapsed_sec: float = 0.0
+
+
+def _hrw(friend: str, account: str) -> int:
+    return zlib.crc32(f"{account}|{friend}".encode("utf-8"))
+
+
+class SenderPool:
+    def __init__(
+        self,
+        accounts: Sequence[AccountConfig],
+        factory: Callable[[AccountConfig], Any],
+        opt: Optional[PoolOptions] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if not accounts:
+            raise ValueError("至少需要一个微信账号")
+        self.factory = factory
+        self.opt = opt or PoolOptions()
+        self.clock = clock
+        self.sleep = sleep
+        self.shards: Dict[str, _Shard] = {
+            a.name: _Shard(account=a, limiter=_RateLimiter(a.rate_per_min, a.burst, clock)) for a in accounts
+        }
+
+    # ---------- health ----------
+    def _mark_down(self, sh: _Shard, reason: str) -> None:
+        if sh.healthy:
+            print(f"[WARN] 微信账号 {sh.name} 不可用，转移其待发消息：{reason}")
+        sh.healthy = False
+        sh.wx = None
+        sh.down_at = self.clock()
+        sh.down_reason = reason
+
+    def _is_logged_in(self, sh: _Shard) -> bool:
+        try:
+            return bool(sh.wx.GetSessionList())
+        except Exception:
+            return False
+
+    def connect(self) -> None:
+        """创建各账号句柄（应在之后发送的同一线程里调用：wxauto 依赖 COM）；掉线超时的账号重试一次。"""
+        now = self.clock()
+        for sh in self.shards.values():
+            if not sh.healthy and now - sh.down_at >= self.opt.revive_after_sec:
+                sh.healthy = True
+            if sh.healthy and sh.wx is None:
+                try:
+                    sh.wx = self.factory(sh.account)
+                except Exception as e:
+                    self._mark_down(sh, f"登录失败：{e}")
+
+    # ---------- assignment ----------
+    def shard_for(self, r: RecipientConfig) -> Optional[_Shard]:
+        if r.accounts:
+            # 亲和：只能用配置的账号（对方须是这些账号的好友），按顺序取第一个可用
+            for name in r.accounts:
+                sh = self.shards.get(name)
+                if sh is not None and sh.healthy:
+                    return sh
+            return None
+        healthy = [sh for sh in self.shards.values() if sh.healthy]
+        if not healthy:
+            return None
+        return max(healthy, key=lambda sh: _hrw(r.friend_name, sh.name))
+
+    def _place(self, out: Outgoing, report: PoolReport) -> bool:
+        sh = self.shard_for(out.recipient)
+        if sh is None:
+            report.failed.append((out.recipient, "无可用微信账号"))
+            return False
+        sh.queue.append(out)
+        return True
+
+    # ---------- run ----------
+    def run(self, outgoing: Iterable[Outgoing], deliver: Callable[[Any, Outgoing], None]) -> PoolReport:
+        """
+        deliver(wx, out)：用该分片的 wx 发给 out.recipient；抛异常视为失败。
+        outgoing 可以是流水线的生成器：按需取，不必先收齐。
+        """
+        t0 = self.clock()
+        report = PoolReport()
+        self.connect()
+        for sh in self.shards.values():
+            sh.queue.clear()
+            sh.sent = 0
+        source = iter(outgoing)
+        exhausted = False
+
+        def pull() -> None:
+            nonlocal exhausted
+            out = next(source, None)
+            if out is None:
+                exhausted = True
+            else:
+                self._place(out, report)
+
+        while True:
+            ready = [sh for sh in self.shards.values() if sh.healthy and sh.queue]
+            if not ready:
+                if exhausted:
+                    break
+                pull()
+                continue
+            sh = min(ready, key=lambda s: s.limiter.wait_sec())
+            wait = sh.limiter.wait_sec()
+            if wait > 0 and not exhausted and sum(len(s.queue) for s in ready) < self.opt.lookahead:
+                # 与其干等令牌，不如先取下一条（可能落在有令牌的分片上）
+                pull()
+                continue
+            if wait > 0:
+                self.sleep(wait)
+            sh.limiter.take()
+            out = sh.queue.popleft()
+            try:
+                deliver(sh.wx, out)
+                sh.sent += 1
+            except Exception as e:
+                if self._is_logged_in(sh):
+                    print(f"[WARN] 发送失败（{out.recipient.friend_name} @ {sh.name}）：{e}")
+                    report.failed.append((out.recipient, f"send: {e}"))
+                    continue
+                # 账号掉线：连同这条一起转给其它账号
+                self._mark_down(sh, str(e))
+                pending = [out] + list(sh.queue)
+                sh.queue.clear()
+                for o in pending:
+                    report.moved += self._place(o, report)
+
+        for sh in self.shards.values():
+            # 没有任何可用账号时队列里可能还留着
+            for o in sh.queue:
+                report.failed.append((o.recipient, f"账号 {sh.name} 不可用"))
+            sh.queue.clear()
+            report.sent[sh.name] = sh.sent
+            if not sh.healthy:
+                report.down[sh.name] = sh.down_reason
+        report.elapsed_sec = self.clock() - t0
+        return report
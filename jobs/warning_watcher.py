@@ -0,0 +1,234 @@
+# jobs/warning_watcher.py
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils import jsoncodec
+from utils.ratelimit import TokenBucket
+from utils.runtime import app_path
+from weather.models import Location, WeatherWarning
+from weather.provider import WeatherProvider
+
+# 严重程度排序（QWeather severity / severityColor 两套字段都兼容）
+_SEVERITY_RANK = {
+    "cancel": 0, "none": 0, "unknown": 1, "standard": 1, "minor": 2,
+    "moderate": 3, "major": 4, "severe": 4, "extreme": 5,
+}
+_COLOR_RANK = {"white": 1, "blue": 2, "green": 2, "yellow": 3, "orange": 4, "red": 5, "black": 5}
+
+KIND_NEW = "new"
+KIND_ESCALATED = "escalated"
+
+
+def severity_rank(w: WeatherWarning) -> int:
+    return max(
+        _SEVERITY_RANK.get(w.severity.lower(), 0),
+        _COLOR_RANK.get(w.severity_color.lower(), 0),
+    )
+
+
+@dataclass(frozen=True)
+class WatchOptions:
+    # 三档轮询间隔（秒）
+    calm_interval_sec: float = 1800.0     # 无预警、预报平稳
+    storm_interval_sec: float = 600.0     # 预报有强对流/暴雨/台风等
+    active_interval_sec: float = 300.0    # 当前有生效预警
+    # 预报（判断是否“可能有风暴”）的刷新间隔，也消耗请求预算
+    forecast_refresh_sec: float = 3 * 3600.0
+    storm_keywords: Tuple[str, ...] = ("雷", "暴雨", "台风", "冰雹", "暴雪", "大风", "沙尘暴")
+
+    # 每小时请求预算（所有地点合计）；需求超出时按比例拉长所有间隔
+    request_budget_per_hour: int = 600
+
+    state_file: str = ".cache/warning_state.json"  # 相对路径按程序目录解析
+
+
+@dataclass
+class _LocState:
+    loc: Location
+    # warning id -> severity rank（已通知过的）
+    seen: Dict[str, int] = field(default_factory=dict)
+    storm: bool = False
+    forecast_at: float = 0.0
+    interval: float = 0.0
+
+
+class WarningWatcher:
+    """
+    灾害预警轮询：
+
+    - 每个地点按状态自适应间隔（有预警 > 预报有风暴 > 平稳）
+    - 所有地点放在一个最小堆里，只在最早到期时醒来
+    - 请求预算：令牌桶限流；总需求超预算时按比例拉长间隔（O(1) 维护需求总和）
+    - 与持久化状态比对预警 id，只有新增或升级才通知
+    """
+
+    def __init__(
+        self,
+        provider: WeatherProvider,
+        locations: Sequence[Location],
+        notify: Callable[[Location, WeatherWarning, str], None],
+        opt: Optional[WatchOptions] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.provider = provider
+        self.notify = notify
+        self.opt = opt or WatchOptions()
+        self.clock = clock
+        self.bucket = TokenBucket(self.opt.request_budget_per_hour, clock)
+        self.state_path = app_path(self.opt.state_file)
+
+        self._locs: Dict[str, _LocState] = {loc.id: _LocState(loc=loc) for loc in locations}
+        self._load_state()
+
+        # 需求：每小时请求数之和（只算预警接口）
+        self._demand = 0.0
+        self._heap: List[Tuple[float, str]] = []
+        now = clock()
+        for i, st in enumerate(self._locs.values()):
+            self._set_interval(st, self._desired_interval(st))
+            # 首轮错开，避免启动瞬间打满预算
+            heapq.heappush(self._heap, (now + i * 3600.0 / max(1, self.opt.request_budget_per_hour), st.loc.id))
+
+        self._stop = threading.Event()
+
+    # ---------- state ----------
+    def _load_state(self) -> None:
+        try:
+            data = jsoncodec.read_file(self.state_path)
+        except Exception:
+            return
+        for loc_id, it in data.items():
+            st = self._locs.get(loc_id)
+            if st is not None:
+                st.seen = {str(k): int(v) for k, v in (it.get("seen") or {}).items()}
+
+    def _save_state(self) -> None:
+        try:
+            data = {k: {"seen": st.seen} for k, st in self._locs.items() if st.seen}
+            jsoncodec.write_file(self.state_path, data)
+        except Exception:
+            # 状态写失败不影响轮询（最坏情况是重启后重复通知）
+            pass
+
+    # ---------- scheduling ----------
+    def _set_interval(self, st: _LocState, interval: float) -> None:
+        if st.interval > 0:
+            self._demand -= 3600.0 / st.interval
+        st.interval = interval
+        self._demand += 3600.0 / interval
+
+    def _budget_scale(self) -> float:
+        return max(1.0, self._demand / max(1, self.opt.request_budget_per_hour))
+
+    def _desired_interval(self, st: _LocState) -> float:
+        if st.seen:
+            return self.opt.active_interval_sec
+        if st.storm:
+            return self.opt.storm_interval_sec
+        return self.opt.calm_interval_sec
+
+    def next_poll_in(self) -> float:
+        if not self._heap:
+            return self.opt.calm_interval_sec
+        return max(0.0, self._heap[0][0] - self.clock(), self.bucket.wait_sec())
+
+    # ---------- polling ----------
+    def _refresh_storm(self, st: _LocState, now: float) -> None:
+        if now - st.forecast_at < self.opt.forecast_refresh_sec or not self.bucket.take():
+            return
+        st.forecast_at = now
+        try:
+            daily = self.provider.get_daily_forecast(st.loc.id)[:2]
+        except Exception as e:
+            print(f"[WARN] 预报刷新失败（{st.loc.name}）：{e}")
+            return
+        texts = "".join(str(d.get("textDay", "")) + str(d.get("textNight", "")) for d in daily)
+        st.storm = any(k in texts for k in self.opt.storm_keywords)
+
+    def diff(self, st: _LocState, warnings: List[WeatherWarning]) -> List[Tuple[WeatherWarning, str]]:
+        """返回需要通知的 (预警, new/escalated)，并更新 st.seen 为当前生效集合。"""
+        events: List[Tuple[WeatherWarning, str]] = []
+        current: Dict[str, int] = {}
+        for w in warnings:
+            if w.status == "cancel" or not w.id:
+                continue
+            rank = severity_rank(w)
+            current[w.id] = rank
+            if w.id in st.seen:
+                if rank > st.seen[w.id]:
+                    events.append((w, KIND_ESCALATED))
+                continue
+            prev = st.seen.get(w.related or "")
+            if prev is None:
+                events.append((w, KIND_NEW))
+            elif rank > prev:
+                events.append((w, KIND_ESCALATED))
+            # related 存在且未升级：只是更新原文，不重复通知
+        st.seen = current
+        return events
+
+    def poll_once(self) -> int:
+        """处理一个到期地点；返回触发的通知数。预算不足时不做任何事。"""
+        if not self._heap or self._heap[0][0] > self.clock() or not self.bucket.take():
+            return 0
+        _, loc_id = heapq.heappop(self._heap)
+        st = self._locs[loc_id]
+        now = self.clock()
+
+        sent = 0
+        failed = False
+        try:
+            warnings = self.provider.get_warnings(loc_id)
+        except Exception as e:
+            print(f"[WARN] 预警查询失败（{st.loc.name}）：{e}")
+        else:
+            before = dict(st.seen)
+            events = self.diff(st, warnings)
+            for w, kind in events:
+                try:
+                    self.notify(st.loc, w, kind)
+                    sent += 1
+                except Exception as e:
+                    print(f"[WARN] 预警通知失败（{st.loc.name}），稍后重试：{e}")
+                    # 没通知到就不算看过：恢复之前的记录，下一轮 diff 会再次产生这条事件
+                    if w.id in before:
+                        st.seen[w.id] = before[w.id]
+                    else:
+                        st.seen.pop(w.id, None)
+                    if w.related and w.related in before:
+                        # 保留被替换的旧预警，重试时仍判为升级
+                        st.seen[w.related] = before[w.related]
+                    failed = True
+            if st.seen != before:
+                self._save_state()
+
+        if not st.seen:
+            self._refresh_storm(st, now)
+
+        # 有通知失败时按“有预警”的间隔尽快重试
+        self._set_interval(st, self.opt.active_interval_sec if failed else self._desired_interval(st))
+        heapq.heappush(self._heap, (now + st.interval * self._budget_scale(), loc_id))
+        return sent
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_forever(self) -> None:
+        print(f"[INFO] 预警监控：{len(self._locs)} 个地点，预算 {self.opt.request_budget_per_hour} 次/小时")
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.next_poll_in())
+
+
+def format_warning(loc: Location, w: WeatherWarning, kind: str) -> str:
+    head = "⚠️【预警升级】" if kind == KIND_ESCALATED else "⚠️【天气预警】"
+    title = w.title or f"{loc.name}发布{w.type_name}预警"
+    lines = [f"{head}{title}"]
+    if w.text:
+        lines.append(w.text)
+    return "\n".join(lines)
@@ -1,73 +1,636 @@
 # main.py
 from __future__ import annotations
 
-import configparser
+# 尽早导入：作为 --import-report 的计时起点
+from utils import importreport
 
-from wechat.launcher import ensure_wechat_ready
-from wechat.messenger import send_text, SendOptions
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from wechat.confirm import ConfirmOptions, Delivery
+from wechat.input_strategy import InputOptions
+from wechat.messenger import send_file, send_text, SendOptions
 from wechat.process import close_wechat_soft, kill_wechat_hard
 
+# 注意：本文件顶层不导入 wechat.launcher（wxauto/pyautogui/psutil 栈），
+# fetch / render / prefetch 在没有桌面环境的机器上也能运行
+from weather.provider import WeatherProvider
 from weather.qweather_provider import QWeatherProvider
-from message.builder import MessageBuilder
-from message.config import MessageConfig
-
-
-def load_wechat_friend(config_path: str = "config.ini") -> str:
-    cfg = configparser.ConfigParser()
-    cfg.read(config_path, encoding="utf-8")
-    return cfg.get("wechat", "friend_name")
-
-
-def load_city(config_path: str = "config.ini") -> str:
-    cfg = configparser.ConfigParser()
-    cfg.read(config_path, encoding="utf-8")
-    return cfg.get("weather", "city")
-
-
-def main() -> None:
-    # 1) 第一部分：微信启动/登录/初始化
-    wx = ensure_wechat_ready()
-
-    # 2) 第二部分：取天气 DTO + 生成人性化消息
-    city = load_city()
-    provider = QWeatherProvider(city_range="cn", pop_strategy="max")
-    dto = provider.get_today_weather(city)
-
-    # ✅ 关键改动：不要再手动指定 templates_path
-    # templates.json 将从 exe 同级目录读取（MessageConfig 默认值控制）
-    msg_cfg = MessageConfig(
-        randomize=True,
-        enabled_fields=[
-            # "meta",
-            "temperature",
-            "weather",
-            "precipitation",
-            "wind",
-            "uv",
-            # "clothing",
-            # "air_quality",
-        ],
+from weather.replay import configure_transport
+from jobs.config import DEFAULT_ACCOUNT, AccountConfig, JobConfig, RecipientConfig, load_job_config
+from jobs.runner import Outgoing, RunPlan, deliver, plan_messages, schedule_entries, stream_messages
+from jobs.sender_pool import SenderPool
+from utils.metrics import configure_metrics, get_metrics, span
+from utils.profiling import ProfileOptions, ProfileSession, ScheduledProfiler, profile_stage
+
+T = TypeVar("T")
+
+
+def _timed(stage: str, fn: Callable[[], T]) -> Tuple[T, float]:
+    with span(f"stage.{stage}"), profile_stage(stage):
+        t0 = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - t0
+
+
+def default_provider(job: Optional[JobConfig] = None) -> WeatherProvider:
+    """默认只用和风；[provider] backends 配了多个数据源时组合成竞速/故障转移"""
+    primary = QWeatherProvider(city_range="cn", pop_strategy="max")
+    if job is None or job.providers == ("qweather",):
+        return primary
+    from weather.composite_provider import CompositeOptions, CompositeProvider
+    from weather.openmeteo_provider import DEFAULT_HOST, OpenMeteoProvider
+
+    backends = {
+        "qweather": lambda: primary,
+        "openmeteo": lambda: OpenMeteoProvider(api_host=job.openmeteo_host or DEFAULT_HOST),
+    }
+    providers = [backends[name]() for name in job.providers]
+    if len(providers) == 1:
+        return providers[0]
+    opt = CompositeOptions(mode=job.provider_mode, deadline_sec=job.provider_deadline_sec, hedge_after_sec=job.provider_hedge_sec)
+    return CompositeProvider(providers, opt)
+
+
+def default_account_wx(a: AccountConfig) -> Any:
+    # UI 自动化依赖（wxauto/pyautogui/psutil）只在真正需要微信时才导入
+    with importreport.timed_import("wechat.launcher"):
+        from wechat.launcher import ensure_wechat_ready
+
+    section = "wechat" if a.name == DEFAULT_ACCOUNT else f"account:{a.name}"
+    return ensure_wechat_ready(wechat_path=a.wechat_path, section=section, nickname=a.nickname)
+
+
+def default_wx(job: JobConfig) -> Any:
+    # 单账号场景（以及 watch / listen）：用第一个账号
+    return default_account_wx(job.accounts[0])
+
+
+DEFAULT_SEND_OPTIONS = SendOptions(
+    pre_delay_sec_min=0.6,
+    pre_delay_sec_max=1.6,
+    type_like_human=False,
+    retries=2,
+    retry_backoff_sec=1.5,
+    press_esc_before_send=True,
+)
+
+# 查询回复：对方在等，不加发送前随机等待和 ESC（会话本来就在前台）
+REPLY_SEND_OPTIONS = replace(DEFAULT_SEND_OPTIONS, pre_delay_sec_min=0.0, pre_delay_sec_max=0.0, press_esc_before_send=False)
+
+
+def card_cache(job: JobConfig, recipients: Optional[List[RecipientConfig]] = None) -> Any:
+    """有接收人要卡片时才创建 CardCache（Pillow 到真正渲染时才导入）"""
+    rs = job.active_recipients() if recipients is None else recipients
+    if not any(r.wants_card for r in rs):
+        return None
+    from message.card import CardCache, CardOptions
+
+    return CardCache(
+        job.card_cache_dir or None,
+        max_bytes=job.card_cache_mb * 1024 * 1024,
+        opt=CardOptions(font_path=job.card_font_path),
     )
 
-    builder = MessageBuilder(msg_cfg)
-    text = builder.build(dto)
-
-    # 3) 第三部分：发送
-    friend_name = load_wechat_friend()
-    send_opt = SendOptions(
-        pre_delay_sec_min=0.6,
-        pre_delay_sec_max=1.6,
-        type_like_human=False,
-        retries=2,
-        retry_backoff_sec=1.5,
-        press_esc_before_send=True,
+
+def build_messages(job: JobConfig, provider: WeatherProvider, report: RunPlan) -> Iterator[Outgoing]:
+    """第二部分：按城市分组取天气 DTO + 生成人性化消息（+ 天气卡片），边取边产出；调用即开始后台取数"""
+    # templates.json 默认从 exe 同级目录读取；接收人可用 templates = xxx.json 指定其它模板
+    return stream_messages(job.active_recipients(), provider, cards=card_cache(job), report=report)
+
+
+def _connect_while_fetching(outgoing: Iterator[Outgoing], sender_factory: Callable[[], Any]) -> Any:
+    """流水线已在后台取数时启动/登录微信；失败时先让流水线跑完（线程不悬挂）再抛出"""
+    try:
+        return sender_factory()
+    except BaseException:
+        for _ in outgoing:
+            pass
+        raise
+
+
+def _send_options_for(base: SendOptions, r: RecipientConfig) -> SendOptions:
+    # 接收人可单独指定输入方式（config: input_mode = paste）
+    if not r.input_mode:
+        return base
+    return replace(base, input=InputOptions(mode=r.input_mode))
+
+
+@dataclass
+class _Deliveries:
+    """送达确认汇总：只留计数和未确认的接收人，不按接收人保存每条结果"""
+
+    confirmed: int = 0
+    waited_sec: float = 0.0
+    unconfirmed: List[str] = field(default_factory=list)
+
+    def add(self, friend_name: str, d: Delivery) -> None:
+        if d.confirmed is None:
+            return
+        self.waited_sec += d.waited_sec
+        if d.confirmed:
+            self.confirmed += 1
+        else:
+            self.unconfirmed.append(friend_name)
+
+
+def _text_sender(wx: Any, base: SendOptions, deliveries: _Deliveries) -> Callable[[RecipientConfig, str], None]:
+    def send(r: RecipientConfig, text: str) -> None:
+        deliveries.add(r.friend_name, send_text(wx, r.friend_name, text, _send_options_for(base, r)))
+
+    return send
+
+
+def _send_all(
+    outgoing: Iterable[Outgoing],
+    sender: Any,
+    send_opt: SendOptions,
+    deliveries: _Deliveries,
+) -> List[Tuple[RecipientConfig, str]]:
+    """sender：单个 wx，或多账号时的 SenderPool；outgoing 可边生成边发；返回发送失败列表"""
+    if not isinstance(sender, SenderPool):
+        send = _text_sender(sender, send_opt, deliveries)
+        failed: List[Tuple[RecipientConfig, str]] = []
+        for out in outgoing:
+            try:
+                deliver(out, send, lambda r, path: send_file(sender, r.friend_name, path, send_opt))
+            except Exception as e:
+                print(f"[WARN] 发送失败（{out.recipient.friend_name}）：{e}")
+                failed.append((out.recipient, f"send: {e}"))
+        return failed
+
+    def one(wx: Any, out: Any) -> None:
+        deliver(out, _text_sender(wx, send_opt, deliveries), lambda r, path: send_file(wx, r.friend_name, path, send_opt))
+
+    report = sender.run(outgoing, one)
+    print(
+        "[INFO] 多账号发送："
+        + "，".join(f"{k} {v} 条" for k, v in report.sent.items())
+        + (f"，转移 {report.moved} 条" if report.moved else "")
     )
-    send_text(wx, friend_name, text, send_opt)
+    for name, reason in report.down.items():
+        print(f"[WARN] 账号 {name} 已下线：{reason}")
+    return report.failed
+
+
+def _tap(outgoing: Iterable[Outgoing], per_location: "Counter[str]", on_first: Callable[[], None]) -> Iterator[Outgoing]:
+    # 按地点计数交给发送端的消息（基线 / 统计用，不留消息本身），第一条到达时回调一次
+    for out in outgoing:
+        if not per_location:
+            on_first()
+        per_location[out.location_id] += 1
+        yield out
+
+
+def _make_sender(job: JobConfig, wx_factory: Callable[[JobConfig], Any], account_factory: Callable[[AccountConfig], Any]) -> Any:
+    if len(job.accounts) > 1:
+        pool = SenderPool(job.accounts, account_factory)
+        pool.connect()
+        return pool
+    return wx_factory(job)
+
+
+def _record_baseline(
+    job: JobConfig, plan: RunPlan, per_location: "Counter[str]", send_failed: List[Tuple[RecipientConfig, str]]
+) -> None:
+    """开启了 [changes] 时，至少发出一条的地点记为盘中变化监控的基线（python main.py changes 与之比较）"""
+    if not job.change_enabled:
+        return
+    from jobs.change_watcher import BaselineStore
+
+    failed = Counter(plan.city_locations.get(r.city.strip(), "") for r, _ in send_failed)
+    sent = {k for k, n in per_location.items() if n > failed[k]}
+    BaselineStore(job.change_state_file).record({k: v for k, v in plan.dtos.items() if k in sent})
+
+
+def _notifier(job: JobConfig) -> Callable[[List[Outgoing]], None]:
+    """
+    常驻通知（watch / changes）的发送函数：多账号走常驻 SenderPool（账号亲和 / HRW 分配，掉线转移），
+    单账号复用同一个句柄（发送失败后下次重新检查登录）；有接收人没发出去时抛异常，由监控稍后重试。
+    """
+    if len(job.accounts) > 1:
+        pool = SenderPool(job.accounts, default_account_wx)
+        send_to: Callable[[], Any] = lambda: pool
+    else:
+        handle: List[Any] = []
+
+        def send_to() -> Any:
+            if not handle:
+                handle.append(default_wx(job))
+            return handle[0]
+
+    def send(outs: List[Outgoing]) -> None:
+        failed = _send_all(outs, send_to(), DEFAULT_SEND_OPTIONS, _Deliveries())
+        if failed:
+            if len(job.accounts) == 1:
+                handle.clear()
+            raise RuntimeError("，".join(f"{r.friend_name}：{reason}" for r, reason in failed))
+
+    return send
+
+
+def _report_delivery(deliveries: _Deliveries) -> None:
+    checked = deliveries.confirmed + len(deliveries.unconfirmed)
+    if not checked:
+        return
+    avg = deliveries.waited_sec / checked
+    print(f"[INFO] 送达确认：已确认 {deliveries.confirmed} 个，未确认 {len(deliveries.unconfirmed)} 个，平均等待 {avg:.2f}s")
+    for k in deliveries.unconfirmed:
+        print(f"[WARN] 未在会话中看到消息（可能未发出）：{k}")
+
+
+def _pipeline_timings(report: RunPlan, timings: Dict[str, float]) -> None:
+    """
+    流水线在后台线程里跑，取天气 / 生成文案不能用 _timed 包起来：收尾时从 report 取出，
+    写进 timings 并记为 stage.* 指标。weather_message：从开始取数到第一条消息就绪（与 wechat_ready 并行）。
+    """
+    stages = {"weather_message": report.first_ready_sec, "fetch": report.fetch_sec, "build": report.build_sec}
+    metrics = get_metrics()
+    for stage, sec in stages.items():
+        if sec is None:
+            continue
+        timings[stage] = sec
+        if metrics.enabled:
+            metrics.record(f"stage.{stage}", sec, {}, {})
+
+
+def _print_timings(timings: Dict[str, float]) -> None:
+    parts = " ".join(f"{k}={v:.2f}s" for k, v in timings.items())
+    print(f"[TIMING] {parts}")
+
+
+def main(
+    config_path: str = "config.ini",
+    *,
+    wx_factory: Callable[[JobConfig], Any] = default_wx,
+    provider_factory: Optional[Callable[[], WeatherProvider]] = None,
+    send_opt: SendOptions = DEFAULT_SEND_OPTIONS,
+    account_factory: Callable[[AccountConfig], Any] = default_account_wx,
+) -> Dict[str, float]:
+    """
+    一次完整运行；返回各阶段耗时。
+    wx_factory / provider_factory 可替换为假微信、指向 stub server 的 provider（见 bench/）；
+    配置了多个 [account:*] 时改用 account_factory 为每个账号创建句柄。
+    """
+    t_start = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    # 0) 配置只解析一次
+    job, timings["config"] = _timed("config", lambda: load_job_config(config_path))
+    if job.metrics_enabled and not get_metrics().enabled:
+        configure_metrics(True, job.metrics_dir or None)
+        get_metrics().record("stage.config", timings["config"], {}, {})
+    if job.confirm_enabled and send_opt.confirm is None:
+        send_opt = replace(send_opt, confirm=ConfirmOptions(timeout_sec=job.confirm_timeout_sec))
+
+    try:
+        _run(
+            job,
+            t_start,
+            timings,
+            lambda: _make_sender(job, wx_factory, account_factory),
+            provider_factory or (lambda: default_provider(job)),
+            send_opt,
+        )
+    finally:
+        get_metrics().flush()
+    return timings
+
+
+def _run(
+    job: JobConfig,
+    t_start: float,
+    timings: Dict[str, float],
+    sender_factory: Callable[[], Any],
+    provider_factory: Callable[[], WeatherProvider],
+    send_opt: SendOptions,
+) -> None:
+    # 1) + 2) 并行：天气/文案由流水线在后台线程生成，微信启动/登录留在主线程
+    #    （wxauto 基于 UI Automation/COM，句柄最好在创建它的线程里使用）
+    report = RunPlan()
+    outgoing = build_messages(job, provider_factory(), report)
+    sender, timings["wechat_ready"] = _timed("wechat_ready", lambda: _connect_while_fetching(outgoing, sender_factory))
+
+    # 3) 第三部分：边生成边发送（开启 [confirm] 时每条发完确认一次）
+    deliveries = _Deliveries()
+    per_location: "Counter[str]" = Counter()
+
+    def first() -> None:
+        # 第一条消息交到发送端：微信就绪与天气+文案两条路径里较慢的那条走完。
+        # 一条都没发（全部取数失败 / 没有接收人）时没有关键路径，不记
+        timings["critical_path"] = time.perf_counter() - t_start
+
+    send_failed, timings["send"] = _timed(
+        "send", lambda: _send_all(_tap(outgoing, per_location, first), sender, send_opt, deliveries)
+    )
+    _pipeline_timings(report, timings)
+    timings["total"] = time.perf_counter() - t_start
+    print(
+        f"[INFO] 接收人 {sum(per_location.values())} 个，请求地点 {report.locations_fetched} 个，"
+        f"生成正文 {report.renders} 次，渲染卡片 {report.cards_rendered} 张"
+    )
+    _print_timings(timings)
+
+    failed = report.failed + send_failed
+    for r, reason in failed:
+        print(f"[WARN] 未发送：{r.friend_name}（{r.city}）{reason}")
+    _report_delivery(deliveries)
+    _record_baseline(job, report, per_location, send_failed)
 
     # 4) 可选：退出微信
     # close_wechat_soft()
     # kill_wechat_hard()
 
 
+# ---------- headless 子命令（不导入 UI 自动化栈） ----------
+def _select(job: JobConfig, city: Optional[str]) -> List[RecipientConfig]:
+    rs = job.active_recipients()
+    if city:
+        rs = [r for r in rs if r.city.strip() == city.strip()] or [RecipientConfig(friend_name="（预览）", city=city.strip())]
+    return rs
+
+
+def cmd_fetch(config_path: str, city: Optional[str]) -> None:
+    """取天气并输出 DTO（JSON，每个城市一行）"""
+    job = load_job_config(config_path)
+    provider = default_provider(job)
+    seen = set()
+    for r in _select(job, city):
+        if r.city in seen:
+            continue
+        seen.add(r.city)
+        dto = provider.get_today_weather(r.city)
+        print(json.dumps(asdict(dto), ensure_ascii=False, default=str))
+
+
+def cmd_render(config_path: str, city: Optional[str]) -> None:
+    """预览每个接收人将收到的消息，不发送"""
+    job = load_job_config(config_path)
+    rs = _select(job, city)
+    plan = plan_messages(rs, default_provider(job), cards=card_cache(job, rs), card_processes=job.card_processes)
+    for out in plan.outgoing:
+        print(f"===== {out.recipient.friend_name}（{out.recipient.city}）=====")
+        if out.card:
+            print(f"[卡片] {out.card}")
+        print(out.text)
+    for r, reason in plan.failed:
+        print(f"[WARN] {r.friend_name}（{r.city}）：{reason}")
+
+
+def cmd_prefetch(config_path: str) -> None:
+    """预热 geo 缓存：解析所有接收人城市的 Location（不取天气）"""
+    job = load_job_config(config_path)
+    provider = default_provider(job)
+    for city in sorted({r.city.strip() for r in job.active_recipients()}):
+        try:
+            loc = provider.lookup_location(city)
+            print(f"[INFO] {city} -> {loc.id} {loc.name}（{loc.tz or '-'}）")
+        except Exception as e:
+            print(f"[WARN] {city} 解析失败：{e}")
+    cmd_snapshot(config_path)
+
+
+def cmd_snapshot(config_path: str) -> None:
+    """编译启动快照（geo 缓存 + 各接收人的模板），之后启动时 mmap 读取；源文件改过自动失效"""
+    from utils.runtime import app_path
+    from utils.snapshot import DEFAULT_SNAPSHOT, build_snapshot
+
+    job = load_job_config(config_path)
+    with span("snapshot.build"):
+        # 本进程还没落盘的 geo 条目在退出时补写，并按已存在的快照自动重建
+        stats = build_snapshot(
+            DEFAULT_SNAPSHOT,
+            geo_file=QWeatherProvider.cache_file,
+            template_files=sorted({r.templates_path for r in job.recipients}),
+        )
+    geo = stats.get("geo", {})
+    n_tpl = sum(1 for k in stats if k.startswith("templates:"))
+    print(f"[INFO] 启动快照 {app_path(DEFAULT_SNAPSHOT)}：geo {geo.get('entries', 0)} 条，模板 {n_tpl} 份，共 {stats['bytes']} 字节")
+
+
+def cmd_serve(config_path: str) -> None:
+    """常驻：按各接收人 send_time（本地时间）定时发送"""
+    from jobs.scheduler import LocalTimeDispatcher
+
+    job = load_job_config(config_path)
+    entries = schedule_entries(job)
+    if not entries:
+        raise RuntimeError("没有配置 send_time 的接收人，无需常驻。")
+
+    provider = default_provider(job)
+    dispatcher = LocalTimeDispatcher(tz_resolver=lambda c: provider.lookup_location(c).tz)
+    dispatcher.add_many(entries)
+    cards = card_cache(job)
+    pool = SenderPool(job.accounts, default_account_wx) if len(job.accounts) > 1 else None
+    send_opt = DEFAULT_SEND_OPTIONS
+    if job.confirm_enabled:
+        send_opt = replace(send_opt, confirm=ConfirmOptions(timeout_sec=job.confirm_timeout_sec))
+
+    def handle(batch) -> None:
+        recipients = [e.payload for e in batch.entries]
+        print(f"[INFO] 定时批次：{len(recipients)} 个接收人")
+        report = RunPlan()
+        outgoing = stream_messages(recipients, provider, cards=cards, report=report)
+        # 多账号：池常驻，掉线账号在之后的批次里重试登录
+        sender = pool if pool is not None else _connect_while_fetching(outgoing, lambda: default_wx(job))
+        deliveries = _Deliveries()
+        per_location: "Counter[str]" = Counter()
+        send_failed, _ = _timed(
+            "send", lambda: _send_all(_tap(outgoing, per_location, lambda: None), sender, send_opt, deliveries)
+        )
+        failed = report.failed + send_failed
+        for r, reason in failed:
+            print(f"[WARN] 未发送：{r.friend_name}（{r.city}）{reason}")
+        _report_delivery(deliveries)
+        _record_baseline(job, report, per_location, send_failed)
+        _pipeline_timings(report, {})
+        get_metrics().flush()
+
+    print(f"[INFO] 已调度 {len(entries)} 个接收人，等待下一次发送...")
+    dispatcher.run_forever(handle)
+
+
+def cmd_watch(config_path: str) -> None:
+    """常驻：监控各接收人城市的灾害预警，新增/升级时推送"""
+    from jobs.warning_watcher import WarningWatcher, format_warning
+
+    job = load_job_config(config_path)
+    provider = default_provider(job)
+
+    by_loc: Dict[str, List[RecipientConfig]] = {}
+    locations = {}
+    for r in job.active_recipients():
+        try:
+            loc = provider.lookup_location(r.city)
+        except Exception as e:
+            print(f"[WARN] {r.city} 解析失败，跳过预警监控：{e}")
+            continue
+        locations[loc.id] = loc
+        by_loc.setdefault(loc.id, []).append(r)
+
+    send = _notifier(job)
+
+    def notify(loc, w, kind) -> None:
+        text = format_warning(loc, w, kind)
+        send([Outgoing(recipient=r, text=text, location_id=loc.id) for r in by_loc.get(loc.id, [])])
+
+    WarningWatcher(provider, list(locations.values()), notify).run_forever()
+
+
+def cmd_changes(config_path: str) -> None:
+    """常驻：盘中刷新各地点预报，与早上发出的相比变化超过阈值时补发一条"""
+    from jobs.change_watcher import ChangeOptions, ChangeWatcher, format_changes
+
+    job = load_job_config(config_path)
+    if not job.change_enabled:
+        raise RuntimeError("未开启 [changes] enabled：send / serve 不会记录基线，变化监控无从比较。")
+    provider = default_provider(job)
+
+    by_loc: Dict[str, List[RecipientConfig]] = {}
+    locations = {}
+    for r in job.active_recipients():
+        try:
+            loc = provider.lookup_location(r.city)
+        except Exception as e:
+            print(f"[WARN] {r.city} 解析失败，跳过变化监控：{e}")
+            continue
+        locations[loc.id] = loc
+        by_loc.setdefault(loc.id, []).append(r)
+
+    send = _notifier(job)
+
+    def notify(loc, dto, changes) -> None:
+        text = format_changes(dto, changes)
+        send([Outgoing(recipient=r, text=text, location_id=loc.id) for r in by_loc.get(loc.id, [])])
+
+    opt = ChangeOptions(
+        interval_sec=job.change_interval_min * 60,
+        pop_delta_pct=job.change_pop_delta_pct,
+        temp_delta_c=job.change_temp_delta_c,
+        max_updates_per_day=job.change_max_per_day,
+        state_file=job.change_state_file,
+    )
+    ChangeWatcher(provider, list(locations.values()), notify, opt).run_forever()
+
+
+def cmd_listen(config_path: str) -> None:
+    """常驻：监听接收人会话，回复“明天天气”“广州天气”之类的查询"""
+    from jobs.runner import BuilderCache
+    from wechat.listener import MergedMessageSource, QueryBot, WxautoMessageSource
+
+    job = load_job_config(config_path)
+    recipients = {r.friend_name: r for r in job.active_recipients()}
+    if not recipients:
+        print("[WARN] 没有启用的接收人，无需监听")
+        return
+    builders = BuilderCache()
+    # 回复不带问候/结尾，统一用第一个接收人的字段配置
+    builder = builders.get(next(iter(recipients.values())))
+
+    # 每个会话在分配给它的账号上监听和回复（与 send 相同的账号亲和 / HRW 分配）
+    route: Dict[str, Any] = {}
+    if len(job.accounts) > 1:
+        pool = SenderPool(job.accounts, default_account_wx)
+        pool.connect()
+        for name, r in recipients.items():
+            sh = pool.shard_for(r)
+            if sh is None:
+                print(f"[WARN] {name} 没有可用的微信账号，跳过监听")
+                continue
+            route[name] = sh.wx
+    else:
+        wx = default_wx(job)
+        route = dict.fromkeys(recipients, wx)
+    by_wx: Dict[int, Tuple[Any, List[str]]] = {}
+    for name, handle in route.items():
+        by_wx.setdefault(id(handle), (handle, []))[1].append(name)
+    source = MergedMessageSource([WxautoMessageSource(h, names) for h, names in by_wx.values()])
+
+    def reply(chat: str, text: str) -> None:
+        r = recipients.get(chat)
+        opt = _send_options_for(REPLY_SEND_OPTIONS, r) if r else REPLY_SEND_OPTIONS
+        send_text(route[chat], chat, text, opt)
+
+    def default_city(chat: str) -> Optional[str]:
+        r = recipients.get(chat)
+        return r.city if r else None
+
+    print(f"[INFO] 查询机器人：监听 {len(route)} 个会话（{len(by_wx)} 个账号）")
+    bot = QueryBot(source, default_provider(job), builder, reply, default_city)
+    bot.run_forever()
+
+
+def cli(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="weather_sender", description="微信天气播报")
+    ap.add_argument("-c", "--config", default="config.ini")
+    ap.add_argument("--import-report", action="store_true", help="结束时输出导入耗时 / 是否加载了 GUI 依赖")
+    ap.add_argument("--record", metavar="DIR", help="把和风接口响应录制到档案目录")
+    ap.add_argument("--replay", metavar="DIR", help="从档案目录回放和风接口响应（不联网）")
+    ap.add_argument("--replay-speed", type=float, default=1.0, help="回放倍速：1=原始延迟，10=十倍速，0=不等待")
+    ap.add_argument("--replay-day", help="只回放该天录到的响应（YYYY-MM-DD）")
+    ap.add_argument("--profile", action="store_true", help="剖析本次运行（CPU 采样 + 各阶段内存分配），结果写到 profiles/")
+    ap.add_argument("--profile-every", type=float, metavar="SEC", help="常驻命令：每隔 SEC 秒剖析一段（与 --profile-window 配合）")
+    ap.add_argument("--profile-window", type=float, default=60.0, metavar="SEC", help="定时剖析每段时长（默认 60）")
+    ap.add_argument("--profile-interval-ms", type=float, default=10.0, help="CPU 采样间隔（默认 10ms，开销过高时自动放宽）")
+    ap.add_argument("--no-profile-memory", action="store_true", help="剖析时不开 tracemalloc（只采样 CPU）")
+    sub = ap.add_subparsers(dest="cmd")
+    sub.add_parser("send", help="取天气并发送（默认）")
+    p_fetch = sub.add_parser("fetch", help="只取天气，输出 DTO JSON")
+    p_fetch.add_argument("--city")
+    p_render = sub.add_parser("render", help="预览消息，不发送")
+    p_render.add_argument("--city")
+    sub.add_parser("prefetch", help="预热城市 -> Location 缓存（并编译启动快照）")
+    sub.add_parser("snapshot", help="编译启动快照（geo 缓存 + 模板）")
+    sub.add_parser("serve", help="常驻，按接收人本地时间定时发送")
+    sub.add_parser("watch", help="常驻，监控灾害预警并推送")
+    sub.add_parser("changes", help="常驻，盘中预报明显变化时补发一条")
+    sub.add_parser("listen", help="常驻，回复会话里的天气查询")
+    args = ap.parse_args(argv)
+    if args.record or args.replay:
+        configure_transport(record=args.record, replay=args.replay, speed=args.replay_speed, day=args.replay_day)
+    if args.profile_interval_ms <= 0:
+        ap.error("--profile-interval-ms 必须大于 0")
+    profile_opt = ProfileOptions(interval_sec=args.profile_interval_ms / 1000, memory=not args.no_profile_memory)
+    profiler: Any = None
+    if args.profile_every:
+        profiler = ScheduledProfiler(args.profile_every, args.profile_window, profile_opt, label=args.cmd or "send").start()
+    elif args.profile:
+        profiler = ProfileSession(profile_opt, label=args.cmd or "send").start()
+
+    try:
+        if args.cmd == "fetch":
+            cmd_fetch(args.config, args.city)
+        elif args.cmd == "render":
+            cmd_render(args.config, args.city)
+        elif args.cmd == "prefetch":
+            cmd_prefetch(args.config)
+        elif args.cmd == "snapshot":
+            cmd_snapshot(args.config)
+        elif args.cmd == "serve":
+            cmd_serve(args.config)
+        elif args.cmd == "watch":
+            cmd_watch(args.config)
+        elif args.cmd == "changes":
+            cmd_changes(args.config)
+        elif args.cmd == "listen":
+            cmd_listen(args.config)
+        else:
+            main(args.config)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        if args.import_report:
+            importreport.print_report()
+
+
 if __name__ == "__main__":
-    main()
+    # 卡片进程池在打包后的 exe 里需要这一行（Windows spawn）
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    cli(sys.argv[1:])
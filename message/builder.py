@@ -1,18 +1,79 @@
 # message/builder.py
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional
-
+import random
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+from utils.metrics import span
 from weather.models import WeatherDTO
 from .config import MessageConfig
-from .templates import load_templates, pick_greeting, pick_opening, pick_notice, pick_tail
+from .templates import Chooser, SeededChoice, Templates, load_templates
+
+# 正文（天气各行 + 提醒）的版式版本：改了正文拼法就加一，旧缓存条目不再命中
+BODY_VERSION = 1
+
+
+def recipient_seed(key: str, d: date) -> int:
+    """接收人 + 日期 -> 稳定种子（不用内置 hash，跨进程/重启结果一致）"""
+    return zlib.crc32(f"{key}|{d.isoformat()}".encode("utf-8"))
+
+
+class BodyCache:
+    """
+    正文缓存：(location_id, 日期, 启用字段, 日期称呼, 版式版本) -> 正文文本。
+    正文只取决于天气数据和字段，与模板/随机无关，可在所有文案变体之间共享。
+
+    键里不放整个 DTO（每条都要对二十来个字段求哈希）；条目里存着生成它的 DTO，
+    命中时先比对象身份（同一次运行里同地点共用一个 DTO），不是同一个再比内容，
+    数据更新过就当未命中重新生成。
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._d: "OrderedDict[Tuple, Tuple[WeatherDTO, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, w: WeatherDTO) -> Optional[str]:
+        with self._lock:
+            v = self._d.get(key)
+            if v is None or (v[0] is not w and v[0] != w):
+                return None
+            self._d.move_to_end(key)
+            self.hits += 1
+            return v[1]
+
+    def put(self, key: Tuple, w: WeatherDTO, body: str) -> None:
+        with self._lock:
+            self.misses += 1
+            self._d[key] = (w, body)
+            self._d.move_to_end(key)
+            while len(self._d) > self.max_entries:
+                self._d.popitem(last=False)
+
+
+def _frames(t: Templates, randomize: bool) -> Tuple[Tuple[str, ...], ...]:
+    """问候 / 开场 / 提醒 / 结尾各自的候选（预先 strip）；不随机时每项只留第一条"""
+    out = []
+    for items in (t.greetings, t.openings, t.notices, t.tails):
+        opts = tuple(str(x).strip() for x in (items or []))
+        out.append(opts if randomize else opts[:1])
+    return tuple(out)
 
 
 class MessageBuilder:
-    def __init__(self, cfg: MessageConfig) -> None:
+    def __init__(self, cfg: MessageConfig, body_cache: Optional[BodyCache] = None) -> None:
         self.cfg = cfg
         self.templates = load_templates(cfg.templates_path)
+        self.body_cache = body_cache if body_cache is not None else BodyCache()
+        self._enabled = tuple(self.cfg.normalized_enabled())
+        # 模板候选在构造时处理好，按接收人生成只剩选取和拼接
+        self._frames = _frames(self.templates, cfg.randomize)
 
     @staticmethod
     def _fmt_prob(prob: Optional[float]) -> str:
@@ -22,12 +83,12 @@ class MessageBuilder:
         return f"{int(round(prob * 100))}%"
 
     @staticmethod
-    def _weather_tips(w: WeatherDTO) -> List[str]:
+    def _weather_tips(w: WeatherDTO, day_label: str = "今天") -> List[str]:
         tips: List[str] = []
 
         # 1) 低温提醒
         if w.temp_min_c is not None and w.temp_min_c <= 10:
-            tips.append("今天气温偏低，出门注意保暖，可带个暖宝宝")
+            tips.append(f"{day_label}气温偏低，出门注意保暖，可带个暖宝宝")
 
         # 2) 高温提醒
         if w.temp_max_c is not None and w.temp_max_c >= 25:
@@ -36,10 +97,10 @@ class MessageBuilder:
         # 3) 降雨提醒（优先天气现象包含“雨”，否则用 POP）
         desc = (w.weather_desc or "")
         if "雨" in desc:
-            tips.append("今天可能会有阵雨🌧️，出门记得带把伞☂️")
+            tips.append(f"{day_label}可能会有阵雨🌧️，出门记得带把伞☂️")
         else:
             if w.precipitation_prob is not None and w.precipitation_prob >= 0.3:
-                tips.append("今天可能有雨，建议备一把折叠伞")
+                tips.append(f"{day_label}可能有雨，建议备一把折叠伞")
 
         # 4) 大风提醒（文字启发式）
         wind_desc = (w.wind_desc or "")
@@ -51,13 +112,13 @@ class MessageBuilder:
             try:
                 scale = int(m.group(1))
                 if scale >= 5:
-                    tips.append("今天风力较大🌬️，出门时请注意防风")
+                    tips.append(f"{day_label}风力较大🌬️，出门时请注意防风")
             except Exception:
                 pass
 
         # 5) 紫外线提醒（优先 uv_desc，其次 uv_index）
         if w.uv_index is not None and w.uv_index >= 6:
-            tips.append("今天紫外线较强🌞，外出时请注意防晒🧴")
+            tips.append(f"{day_label}紫外线较强🌞，外出时请注意防晒🧴")
         elif (w.uv_desc or "").find("高") != -1 or (w.uv_desc or "").find("较高") != -1:
             tips.append("紫外线偏强，外出建议做好防晒")
 
@@ -67,12 +128,49 @@ class MessageBuilder:
 
         return tips
 
-    def build(self, w: WeatherDTO) -> str:
-        enabled = set(self.cfg.normalized_enabled())
-
-        header = pick_greeting(self.cfg.randomize, self.templates)
-        opening = pick_opening(self.cfg.randomize, self.templates)
-        lines: List[str] = [header, opening]
+    def build(self, w: WeatherDTO, *, day_label: str = "今天", framing: bool = True) -> str:
+        """
+        day_label：温度行/提醒里的日期称呼（“今天”“明天”）
+        framing：是否带问候/开场/结尾（聊天回复时关掉）
+        """
+        with span("message.render"):
+            return self._compose(w, day_label, framing, None)
+
+    def build_for(self, w: WeatherDTO, seed: int, *, day_label: str = "今天") -> str:
+        """
+        按接收人生成：正文走缓存，问候/开场/提醒/结尾用 seed 选取，
+        同一 seed 结果可复现（见 recipient_seed）。
+        """
+        return self._compose(w, day_label, True, SeededChoice(seed))
+
+    def body(self, w: WeatherDTO, day_label: str = "今天") -> str:
+        key = (w.location_id, w.target_date, self._enabled, day_label, BODY_VERSION)
+        text = self.body_cache.get(key, w)
+        if text is None:
+            text = self._body(w, day_label)
+            self.body_cache.put(key, w, text)
+        return text
+
+    def _compose(self, w: WeatherDTO, day_label: str, framing: bool, rnd: Optional[Chooser]) -> str:
+        body = self.body(w, day_label)
+        if not framing:
+            return body
+        choice = (rnd or random).choice
+
+        def pick(opts: Sequence[str]) -> str:
+            # 与 templates.pick_* 相同：没有候选不消耗随机数，保证同一 seed 结果不变
+            if not opts:
+                return ""
+            return choice(opts) if self.cfg.randomize else opts[0]
+
+        greetings, openings, notices, tails = self._frames
+        parts = (pick(greetings), pick(openings), body, pick(notices), pick(tails))
+        return "\n".join([x for x in parts if x])
+
+    def _body(self, w: WeatherDTO, day_label: str) -> str:
+        enabled = set(self._enabled)
+
+        lines: List[str] = []
 
         # meta：地点/日期（你可以只保留地点不显示 id）
         if "meta" in enabled:
@@ -86,10 +184,12 @@ class MessageBuilder:
 
         # 1) 温度范围
         if "temperature" in enabled:
+            # 多城市接收人：用地级市名（QWeather adm2，如“肇庆”），没有再用地点名
+            city = (w.adm2 or w.location_name or "").strip()
             if w.temp_min_c is None or w.temp_max_c is None:
-                lines.append("今天肇庆气温：暂无")
+                lines.append(f"{day_label}{city}气温：暂无")
             else:
-                lines.append(f"今天肇庆气温：{w.temp_min_c:.0f}°C ~ {w.temp_max_c:.0f}°C")
+                lines.append(f"{day_label}{city}气温：{w.temp_min_c:.0f}°C ~ {w.temp_max_c:.0f}°C")
 
         # 2) 天气现象
         if "weather" in enabled:
@@ -100,7 +200,7 @@ class MessageBuilder:
             lines.append(f"降雨概率：{self._fmt_prob(w.precipitation_prob)}")
 
         # 插入 tips（人性化提醒）
-        tips = self._weather_tips(w)
+        tips = self._weather_tips(w, day_label)
         lines.extend(tips)
 
         # 4) 风力（兼容风速 None）
@@ -136,12 +236,4 @@ class MessageBuilder:
             advice = (w.clothing_advice or "").strip()
             lines.append(f"穿衣建议：{advice if advice else '暂无'}")
 
-        notice = pick_notice(self.cfg.randomize, self.templates)
-        if notice:
-            lines.append(notice)
-
-        tail = pick_tail(self.cfg.randomize, self.templates)
-        if tail:
-            lines.append(tail)
-
         return "\n".join([x for x in lines if str(x).strip()]).strip()
@@ -0,0 +1,354 @@
+# message/card.py
+"""
+天气卡片图片（群聊里比纯文本好读）
+
+- 渲染依赖 Pillow（可选依赖，只在真正渲染时导入）
+- 同一 (location_id, 日期, 卡片版本) 只渲染一次，落盘缓存，同城所有接收人复用
+- 缓存目录按总大小淘汰（最久未使用的先删）
+- render_cards() 批量渲染，可选进程池（渲染是纯 CPU）
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.metrics import span
+from utils.runtime import app_dir, app_path
+from weather.models import WeatherDTO
+
+# 改了卡片布局/配色就把版本号加一，旧缓存自然失效
+CARD_VERSION = 2
+
+ICON_SUN = "sun"
+ICON_CLOUD = "cloud"
+ICON_RAIN = "rain"
+ICON_THUNDER = "thunder"
+ICON_SNOW = "snow"
+ICON_FOG = "fog"
+
+# 天气现象关键词 -> 图标（按优先级，“晴转雷阵雨”取雷）
+_ICON_RULES: Tuple[Tuple[str, str], ...] = (
+    ("雷", ICON_THUNDER),
+    ("雪", ICON_SNOW),
+    ("冰雹", ICON_SNOW),
+    ("雨", ICON_RAIN),
+    ("雾", ICON_FOG),
+    ("霾", ICON_FOG),
+    ("沙", ICON_FOG),
+    ("尘", ICON_FOG),
+    ("阴", ICON_CLOUD),
+    ("云", ICON_CLOUD),
+    ("晴", ICON_SUN),
+)
+
+_BG = {
+    ICON_SUN: (255, 183, 77),
+    ICON_CLOUD: (144, 164, 174),
+    ICON_RAIN: (79, 134, 198),
+    ICON_THUNDER: (84, 88, 122),
+    ICON_SNOW: (129, 190, 220),
+    ICON_FOG: (176, 168, 150),
+}
+
+# Windows 自带中文字体优先；Linux/macOS 开发机找常见 CJK 字体
+_FONT_CANDIDATES = (
+    "msyh.ttc",
+    "msyhbd.ttc",
+    "simhei.ttf",
+    "C:/Windows/Fonts/msyh.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+)
+
+
+@dataclass(frozen=True)
+class CardOptions:
+    width: int = 720
+    height: int = 420
+    font_path: str = ""          # 空：按 _FONT_CANDIDATES 查找
+    # 编码占渲染耗时大头：JPEG(q90, 4:4:4) 约 1ms，PNG 即使 compress_level=1 也要 7ms+
+    image_format: str = "jpeg"   # jpeg / png
+    jpeg_quality: int = 90
+
+    @property
+    def suffix(self) -> str:
+        return ".png" if self.image_format.lower() == "png" else ".jpg"
+
+    def fingerprint(self) -> str:
+        raw = f"{CARD_VERSION}|{self.width}x{self.height}|{self.font_path}|{self.image_format}|{self.jpeg_quality}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:8]
+
+
+def icon_for(desc: Optional[str]) -> str:
+    d = desc or ""
+    for kw, icon in _ICON_RULES:
+        if kw in d:
+            return icon
+    return ICON_CLOUD
+
+
+def card_key(w: WeatherDTO, opt: CardOptions) -> str:
+    return f"{w.location_id}_{w.target_date:%Y%m%d}_{opt.fingerprint()}"
+
+
+# ---------- 渲染（纯函数，可在子进程里跑） ----------
+_warned_font = False
+
+
+@lru_cache(maxsize=16)
+def _font(path: str, size: int) -> Any:
+    from PIL import ImageFont
+
+    for p in ([path] if path else []) + list(_FONT_CANDIDATES):
+        try:
+            return ImageFont.truetype(p, size)
+        except Exception:
+            continue
+    global _warned_font
+    if not _warned_font:
+        _warned_font = True
+        print("[WARN] 未找到中文字体，卡片文字可能显示为方框；可在 [card] font_path 指定字体文件")
+    try:
+        return ImageFont.load_default(size)  # Pillow >= 10.1
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _draw_icon(d: Any, icon: str, cx: int, cy: int, r: int) -> None:
+    white = (255, 255, 255)
+    if icon == ICON_SUN:
+        d.ellipse((cx - r // 2, cy - r // 2, cx + r // 2, cy + r // 2), fill=(255, 235, 59))
+        for dx, dy in ((0, -1), (0, 1), (-1, 0), (1, 0), (-0.7, -0.7), (0.7, 0.7), (-0.7, 0.7), (0.7, -0.7)):
+            d.line(
+                (cx + dx * r * 0.65, cy + dy * r * 0.65, cx + dx * r * 0.9, cy + dy * r * 0.9),
+                fill=(255, 235, 59),
+                width=max(2, r // 10),
+            )
+        return
+
+    # 云朵（其余图标都以云为底）
+    cloud = (236, 239, 241) if icon != ICON_THUNDER else (176, 180, 196)
+    d.ellipse((cx - r * 0.9, cy - r * 0.2, cx - r * 0.1, cy + r * 0.45), fill=cloud)
+    d.ellipse((cx - r * 0.5, cy - r * 0.6, cx + r * 0.4, cy + r * 0.3), fill=cloud)
+    d.ellipse((cx + r * 0.05, cy - r * 0.3, cx + r * 0.9, cy + r * 0.45), fill=cloud)
+    d.rectangle((cx - r * 0.5, cy + r * 0.05, cx + r * 0.5, cy + r * 0.45), fill=cloud)
+
+    below = cy + r * 0.6
+    if icon == ICON_RAIN:
+        for i in (-1, 0, 1):
+            x = cx + i * r * 0.4
+            d.line((x, below, x - r * 0.12, below + r * 0.35), fill=white, width=max(2, r // 12))
+    elif icon == ICON_THUNDER:
+        d.polygon(
+            [(cx, below - r * 0.1), (cx - r * 0.25, below + r * 0.25), (cx, below + r * 0.25), (cx - r * 0.15, below + r * 0.55),
+             (cx + r * 0.25, below + r * 0.1), (cx, below + r * 0.1)],
+            fill=(255, 235, 59),
+        )
+    elif icon == ICON_SNOW:
+        for i in (-1, 0, 1):
+            x = cx + i * r * 0.4
+            d.ellipse((x - r * 0.07, below + r * 0.1, x + r * 0.07, below + r * 0.24), fill=white)
+    elif icon == ICON_FOG:
+        for i in range(3):
+            y = below + i * r * 0.15
+            d.line((cx - r * 0.7, y, cx + r * 0.7, y), fill=white, width=max(2, r // 14))
+
+
+def _fmt_temp(v: Optional[float]) -> str:
+    return "--" if v is None else f"{int(round(v))}°"
+
+
+def render_card(w: WeatherDTO, opt: CardOptions) -> bytes:
+    """DTO -> 图片字节（不做缓存）"""
+    import io
+
+    from PIL import Image, ImageDraw
+
+    W, H = opt.width, opt.height
+    icon = icon_for(w.weather_desc)
+    img = Image.new("RGB", (W, H), _BG[icon])
+    d = ImageDraw.Draw(img)
+    white = (255, 255, 255)
+    pad = W // 24
+
+    # 标题：地点 + 日期
+    place = w.adm2 or w.location_name
+    if w.adm2 and w.location_name and w.location_name != w.adm2:
+        place = f"{w.adm2} · {w.location_name}"
+    d.text((pad, pad), place, font=_font(opt.font_path, W // 18), fill=white)
+    d.text((pad, pad + W // 14), f"{w.target_date:%m月%d日}", font=_font(opt.font_path, W // 30), fill=white)
+
+    # 图标 + 温度范围 + 天气现象
+    _draw_icon(d, icon, W - pad - W // 8, pad + W // 9, W // 9)
+    top = pad + W // 6
+    d.text((pad, top), f"{_fmt_temp(w.temp_min_c)} ~ {_fmt_temp(w.temp_max_c)}", font=_font(opt.font_path, W // 10), fill=white)
+    d.text((pad, top + W // 8), w.weather_desc or "", font=_font(opt.font_path, W // 22), fill=white)
+
+    # 降雨概率条
+    bar_y = top + W // 8 + W // 14
+    bar_w = W - 2 * pad
+    prob = max(0.0, min(1.0, w.precipitation_prob or 0.0))
+    small = _font(opt.font_path, W // 30)
+    d.text((pad, bar_y), f"降雨概率 {int(round(prob * 100))}%" if w.precipitation_prob is not None else "降雨概率 暂无",
+           font=small, fill=white)
+    bar_top = bar_y + W // 22
+    d.rounded_rectangle((pad, bar_top, pad + bar_w, bar_top + W // 40), radius=W // 80, outline=white, width=2)
+    if prob > 0:
+        d.rounded_rectangle((pad, bar_top, pad + int(bar_w * prob), bar_top + W // 40), radius=W // 80, fill=(33, 150, 243))
+
+    # 风 / 紫外线
+    row_y = bar_top + W // 40 + W // 30
+    wind = w.wind_desc or "暂无"
+    if w.wind_speed_mps is not None:
+        wind = f"{wind}（{w.wind_speed_mps:.1f} m/s）"
+    d.text((pad, row_y), f"风力  {wind}", font=small, fill=white)
+    # 与文字消息一致：和风的 uv_desc 已含指数（如“6（较高）”），有就单独用，没有再退回 uv_index
+    uv_desc = (w.uv_desc or "").strip()
+    if uv_desc and uv_desc != "暂无":
+        uv = uv_desc
+    else:
+        uv = "暂无" if w.uv_index is None else f"{w.uv_index:.0f}"
+    d.text((pad, row_y + W // 22), f"紫外线  {uv}", font=small, fill=white)
+
+    buf = io.BytesIO()
+    if opt.suffix == ".png":
+        img.save(buf, format="PNG", compress_level=1)
+    else:
+        # subsampling=0：文字边缘不发虚
+        img.save(buf, format="JPEG", quality=opt.jpeg_quality, subsampling=0)
+    return buf.getvalue()
+
+
+def _render_to_file(args: Tuple[WeatherDTO, CardOptions, str]) -> Tuple[str, int]:
+    """子进程入口：渲染并原子写入，返回 (路径, 字节数)"""
+    w, opt, path = args
+    data = render_card(w, opt)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path, len(data)
+
+
+# ---------- 磁盘缓存 ----------
+class CardCache:
+    """
+    卡片落盘缓存：文件名即 card_key，命中时刷新 mtime；
+    总大小超过 max_bytes 时按 mtime 从旧到新删除。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024, opt: Optional[CardOptions] = None) -> None:
+        self.dir = app_path(cache_dir) if cache_dir else app_dir() / ".cache" / "cards"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.opt = opt or CardOptions()
+        self._lock = threading.Lock()
+        # 文件名 -> (大小, mtime)
+        self._index: Dict[str, Tuple[int, float]] = {}
+        for p in self.dir.iterdir():
+            if p.suffix not in (".png", ".jpg"):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            self._index[p.name] = (st.st_size, st.st_mtime)
+        self._total = sum(s for s, _ in self._index.values())
+        self.hits = 0
+        self.renders = 0
+
+    def path_for(self, w: WeatherDTO) -> Path:
+        return self.dir / f"{card_key(w, self.opt)}{self.opt.suffix}"
+
+    def lookup(self, w: WeatherDTO) -> Optional[Path]:
+        p = self.path_for(w)
+        with self._lock:
+            if p.name not in self._index:
+                return None
+            try:
+                os.utime(p)
+            except OSError:
+                # 被外部删掉了
+                size, _ = self._index.pop(p.name)
+                self._total -= size
+                return None
+            self._index[p.name] = (self._index[p.name][0], os.path.getmtime(p))
+            self.hits += 1
+        return p
+
+    def _register(self, path: str, size: int) -> None:
+        name = Path(path).name
+        with self._lock:
+            old = self._index.get(name)
+            if old:
+                self._total -= old[0]
+            self._index[name] = (size, os.path.getmtime(path))
+            self._total += size
+            self.renders += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        for name, (size, _) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                (self.dir / name).unlink()
+            except OSError:
+                pass
+            del self._index[name]
+            self._total -= size
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total
+
+    def get_or_render(self, w: WeatherDTO) -> Path:
+        p = self.lookup(w)
+        if p is not None:
+            return p
+        with span("card.render", location=w.location_id):
+            path, size = _render_to_file((w, self.opt, str(self.path_for(w))))
+        self._register(path, size)
+        return Path(path)
+
+
+def render_cards(dtos: Iterable[WeatherDTO], cache: CardCache, processes: int = 0) -> Dict[str, Path]:
+    """
+    批量取卡片：location_id -> 图片路径。
+    已缓存的直接复用；缺的在本进程渲染，processes > 1 时用进程池。
+    """
+    out: Dict[str, Path] = {}
+    missing: List[WeatherDTO] = []
+    seen = set()
+    for w in dtos:
+        key = card_key(w, cache.opt)
+        if key in seen:
+            continue
+        seen.add(key)
+        p = cache.lookup(w)
+        if p is not None:
+            out[w.location_id] = p
+        else:
+            missing.append(w)
+
+    if processes > 1 and len(missing) > 1:
+        jobs = [(w, cache.opt, str(cache.path_for(w))) for w in missing]
+        chunk = max(1, len(jobs) // (processes * 4))
+        with span("card.render_batch", cards=len(jobs), processes=processes):
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                for w, (path, size) in zip(missing, pool.map(_render_to_file, jobs, chunksize=chunk)):
+                    cache._register(path, size)
+                    out[w.location_id] = Path(path)
+    else:
+        for w in missing:
+            out[w.location_id] = cache.get_or_render(w)
+    return out
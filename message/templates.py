@@ -1,11 +1,14 @@
 # message/templates.py
 from __future__ import annotations
 
-import json
 import random
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Protocol, Sequence, TypeVar
+
+from utils import jsoncodec
+from utils.metrics import span
+from utils.snapshot import get_snapshot
 
 
 @dataclass(frozen=True)
@@ -15,25 +18,33 @@ class Templates:
     notices: List[str]
     tails: List[str]
 
-from pathlib import Path
-import os
-
 
 def load_templates(path: str) -> Templates:
-    print(f"[DEBUG] cwd={Path.cwd()}")
-    print(f"[DEBUG] try_templates_path={Path(path).resolve()}")
-    print(f"[DEBUG] exists={Path(path).exists()}")
-    
-    p = Path(path)
+    with span("templates.load") as sp:
+        p = Path(path)
+        sp.set(cwd=str(Path.cwd()), path=str(p.resolve()), exists=p.exists())
+        return _load_templates(p)
+
+
+def _load_templates(p: Path) -> Templates:
+    snap = get_snapshot()
+    data = snap.templates(p) if snap is not None else None
+    if data is not None:
+        return _from_mapping(data)
     if not p.exists():
         # 没有模板文件也能跑：提供默认模板
+        print(f"[WARN] 未找到模板文件 {p.resolve()}，使用默认模板。")
         return Templates(
             greetings=["早上好"],
+            openings=[],
             notices=["祝你今天顺利！"],
             tails=["-默认模板"],
         )
 
-    data = json.loads(p.read_text(encoding="utf-8"))
+    return _from_mapping(jsoncodec.read_file(p))
+
+
+def _from_mapping(data: Dict[str, Any]) -> Templates:
     return Templates(
         greetings=list(data.get("greetings", []) or []),
         openings=data.get("openings", []),
@@ -42,22 +53,53 @@ def load_templates(path: str) -> Templates:
     )
 
 
-def _pick(randomize: bool, items: List[str]) -> str:
+T = TypeVar("T")
+
+
+class Chooser(Protocol):
+    def choice(self, seq: Sequence[T]) -> T: ...
+
+
+class SeededChoice:
+    """
+    按种子可复现的 choice（splitmix64）。
+    random.Random(seed) 每次构造要做一次完整的 MT 初始化（约 7us），按接收人逐条生成时成了大头。
+    """
+
+    __slots__ = ("_s",)
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, seed: int) -> None:
+        self._s = seed & self._MASK
+
+    def _next(self) -> int:
+        self._s = (self._s + 0x9E3779B97F4A7C15) & self._MASK
+        z = self._s
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & self._MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & self._MASK
+        return z ^ (z >> 31)
+
+    def choice(self, seq: Sequence[T]) -> T:
+        return seq[self._next() % len(seq)]
+
+
+def _pick(randomize: bool, items: List[str], rnd: Optional[Chooser] = None) -> str:
+    # rnd：带种子的随机源（按接收人可复现）；None 用全局 random
     if not items:
         return ""
     if randomize:
-        return random.choice(items).strip()
+        return (rnd or random).choice(items).strip()
     return str(items[0]).strip()
 
 
-def pick_greeting(randomize: bool, t: Templates) -> str:
-    return _pick(randomize, t.greetings)
+def pick_greeting(randomize: bool, t: Templates, rnd: Optional[Chooser] = None) -> str:
+    return _pick(randomize, t.greetings, rnd)
 
-def pick_opening(randomize: bool, t: Templates) -> str:
-    return _pick(randomize, t.openings)
+def pick_opening(randomize: bool, t: Templates, rnd: Optional[Chooser] = None) -> str:
+    return _pick(randomize, t.openings, rnd)
 
-def pick_notice(randomize: bool, t: Templates) -> str:
-    return _pick(randomize, t.notices)
+def pick_notice(randomize: bool, t: Templates, rnd: Optional[Chooser] = None) -> str:
+    return _pick(randomize, t.notices, rnd)
 
-def pick_tail(randomize: bool, t: Templates) -> str:
-    return _pick(randomize, t.tails)
+def pick_tail(randomize: bool, t: Templates, rnd: Optional[Chooser] = None) -> str:
+    return _pick(randomize, t.tails, rnd)
@@ -0,0 +1,55 @@
+# tests/test_builder.py
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+from typing import Optional
+
+from message.builder import BodyCache, MessageBuilder, recipient_seed
+from message.config import MessageConfig
+from message.templates import SeededChoice, pick_greeting, pick_notice, pick_opening, pick_tail
+from tests.test_pipeline import _dto
+
+TEMPLATES = str(Path(__file__).resolve().parents[1] / "message" / "templates.json")
+
+
+def _builder(randomize: bool = True, cache: Optional[BodyCache] = None) -> MessageBuilder:
+    return MessageBuilder(MessageConfig(randomize=randomize, templates_path=TEMPLATES), body_cache=cache)
+
+
+def test_body_rendered_once_per_location_and_date():
+    b = _builder()
+    dtos = [_dto("广州", "g"), _dto("北京", "b")]
+    texts = {b.build_for(dtos[i % 2], recipient_seed(f"r{i}", dtos[0].target_date)) for i in range(200)}
+    assert b.body_cache.misses == 2
+    assert len(texts) > 2  # 问候 / 结尾仍按接收人变化
+
+
+def test_changed_weather_for_same_location_rerenders():
+    b = _builder()
+    w = _dto("广州", "g")
+    assert "26°C" in b.body(w)
+    hotter = dataclasses.replace(w, temp_max_c=35.0)
+    assert "35°C" in b.body(hotter)
+    assert b.body_cache.misses == 2
+    # 内容相同的另一个 DTO 对象照样命中
+    b.body(dataclasses.replace(hotter))
+    assert b.body_cache.misses == 2
+
+
+def test_seeded_message_matches_template_picks():
+    b = _builder()
+    w = _dto("广州", "g")
+    seed = recipient_seed("张三", w.target_date)
+    rnd, t = SeededChoice(seed), b.templates
+    parts = [pick_greeting(True, t, rnd), pick_opening(True, t, rnd), b.body(w), pick_notice(True, t, rnd), pick_tail(True, t, rnd)]
+    assert b.build_for(w, seed) == "\n".join(x for x in parts if x)
+    assert b.build_for(w, seed) == b.build_for(w, seed)
+
+
+def test_fixed_variant_uses_first_templates():
+    b = _builder(randomize=False)
+    w = _dto("广州", "g")
+    t = b.templates
+    expected = [t.greetings[0].strip(), t.openings[0].strip(), b.body(w), t.notices[0].strip(), t.tails[0].strip()]
+    assert b.build(w) == "\n".join(x for x in expected if x)
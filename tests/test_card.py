@@ -0,0 +1,74 @@
+# tests/test_card.py
+"""天气卡片：落盘缓存的命中、按大小淘汰、批量渲染去重（需要 Pillow）。"""
+from __future__ import annotations
+
+import dataclasses
+import os
+import time
+
+import pytest
+
+from message.card import (
+    ICON_CLOUD,
+    ICON_RAIN,
+    ICON_THUNDER,
+    CardCache,
+    CardOptions,
+    card_key,
+    icon_for,
+    render_cards,
+)
+from tests.test_pipeline import _dto
+
+pytest.importorskip("PIL")
+
+SMALL = CardOptions(width=240, height=140)
+
+
+def test_icon_and_key():
+    assert icon_for("晴转雷阵雨") == ICON_THUNDER
+    assert icon_for("小雨") == ICON_RAIN
+    assert icon_for(None) == ICON_CLOUD
+    w = _dto("广州", "g")
+    assert card_key(w, SMALL).startswith("g_20261019_")
+    assert card_key(w, SMALL) != card_key(w, dataclasses.replace(SMALL, image_format="png"))
+
+
+def test_renders_once_and_reuses_from_disk(tmp_path):
+    cache = CardCache(str(tmp_path), opt=SMALL)
+    w = _dto("广州", "g")
+    p = cache.get_or_render(w)
+    assert p.read_bytes()[:2] == b"\xff\xd8"  # JPEG
+    assert cache.get_or_render(w) == p
+    assert (cache.renders, cache.hits) == (1, 1)
+
+    # 重启后从目录重建索引，直接命中
+    again = CardCache(str(tmp_path), opt=SMALL)
+    assert again.lookup(w) == p and again.renders == 0
+    # 文件被外部删掉：当作未缓存
+    p.unlink()
+    assert again.lookup(w) is None and again.total_bytes == 0
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = CardCache(str(tmp_path), opt=SMALL)
+    dtos = [_dto("广州", f"c{i}") for i in range(3)]  # 画面相同，大小也相同
+    paths = [cache.get_or_render(w) for w in dtos]
+    size = paths[0].stat().st_size
+    # 把第一张设为最久以前用过，再按两张的容量淘汰
+    old = time.time() - 3600
+    os.utime(paths[0], (old, old))
+    cache = CardCache(str(tmp_path), max_bytes=2 * size, opt=SMALL)
+    cache.get_or_render(_dto("广州", "c3"))
+    assert not paths[0].exists()
+    assert cache.total_bytes <= 2 * size
+    assert sum(1 for _ in tmp_path.glob("*.jpg")) == 2
+
+
+def test_render_cards_dedups_locations(tmp_path):
+    cache = CardCache(str(tmp_path), opt=SMALL)
+    dtos = [_dto("广州", "g"), _dto("广州市", "g"), _dto("北京", "b")]
+    out = render_cards(dtos, cache)
+    assert set(out) == {"g", "b"}
+    assert cache.renders == 2
+    assert render_cards(dtos, cache) == out and cache.renders == 2
@@ -0,0 +1,127 @@
+# tests/test_change_watcher.py
+"""盘中预报变化监控：指纹比较、基线文件、轮询（虚拟时钟）。"""
+from __future__ import annotations
+
+import dataclasses
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from jobs.change_watcher import (
+    CHANGE_POP,
+    CHANGE_SKY,
+    CHANGE_TMAX,
+    NA,
+    SKY_DRY,
+    SKY_RAIN,
+    SKY_THUNDER,
+    BaselineStore,
+    Change,
+    ChangeOptions,
+    ChangeWatcher,
+    _pop_pair,
+    diff_fingerprints,
+    fingerprint,
+)
+from tests.test_pipeline import _dto
+from weather.models import Location, WeatherDTO
+
+TZ = "Asia/Shanghai"
+LOC = Location(id="id-广州", name="广州", lat=23.1, lon=113.3, tz=TZ)
+DAY = date(2026, 10, 19)
+OPT = ChangeOptions()
+
+
+def _w(**kw) -> WeatherDTO:
+    return dataclasses.replace(_dto("广州"), **kw)
+
+
+def test_fingerprint_is_compact_and_handles_missing():
+    fp = fingerprint(_w(precipitation_prob=None, temp_max_c=26.04, weather_desc="多云转雷阵雨"))
+    assert fp.day == DAY.toordinal()
+    assert (fp.pop, fp.tmax, fp.tmin) == (NA, 260, 180)
+    assert fp.sky == SKY_THUNDER  # 雷雨优先于“云”
+
+
+def test_pop_compared_on_common_hours_only():
+    # 早上的预报含上午的雨；下午刷新时上午已过去（-1），只比两边都有的小时
+    morning = fingerprint(_w(hourly_pop=(90, 90, 10, 10)))
+    afternoon = fingerprint(_w(hourly_pop=(-1, -1, 10, 80)))
+    assert _pop_pair(morning, afternoon) == (10, 80)
+    assert _pop_pair(fingerprint(_w()), afternoon) == (20, 20)  # 一边没有逐小时数据：用全天值
+    assert _pop_pair(morning, fingerprint(_w(hourly_pop=(-1, -1, -1, -1)))) == (NA, NA)
+
+
+def test_diff_reports_only_big_changes():
+    base = fingerprint(_w())
+    assert diff_fingerprints(base, fingerprint(_w(precipitation_prob=0.4, temp_max_c=29.0)), OPT) == []
+    rainy = fingerprint(_w(precipitation_prob=0.7, temp_max_c=20.0, weather_desc="中雨"))
+    assert diff_fingerprints(base, rainy, OPT) == [
+        Change(CHANGE_POP, 20, 70),
+        Change(CHANGE_TMAX, 260, 200),
+        Change(CHANGE_SKY, SKY_DRY, SKY_RAIN),
+    ]
+    # 不同日期的指纹不比
+    tomorrow = fingerprint(_w(target_date=date(2026, 10, 20), precipitation_prob=0.9))
+    assert diff_fingerprints(base, tomorrow, OPT) == []
+
+
+def test_baseline_store_round_trip_and_update_count(tmp_path):
+    path = str(tmp_path / "change_state.json")
+    store = BaselineStore(path)
+    store.record({LOC.id: _w(hourly_pop=(10, 20))})
+    store.mark_sent(LOC.id, fingerprint(_w(precipitation_prob=0.8)))
+
+    other = BaselineStore(path)  # 另一个进程
+    got = other.get(LOC.id)
+    assert got.fp == fingerprint(_w(precipitation_prob=0.8)) and got.updates == 1
+    assert not other.reload_if_changed()  # 文件没变不重读
+    # 同一天重发不清零补发计数；换一天清零
+    store.record({LOC.id: _w()})
+    assert BaselineStore(path).get(LOC.id).updates == 1
+    store.record({LOC.id: _w(target_date=date(2026, 10, 20))})
+    assert BaselineStore(path).get(LOC.id).updates == 0
+
+
+class _Provider:
+    def __init__(self, dto: WeatherDTO) -> None:
+        self.dto = dto
+        self.calls = 0
+
+    def get_forecast_for_location(self, loc: Location, query_city: str) -> WeatherDTO:
+        self.calls += 1
+        return self.dto
+
+
+def _watcher(tmp_path, hour: int, dto: WeatherDTO, baseline: Optional[WeatherDTO] = None):
+    clock = [datetime(2026, 10, 19, hour, tzinfo=ZoneInfo(TZ)).timestamp()]
+    store = BaselineStore(str(tmp_path / "change_state.json"))
+    if baseline is not None:
+        store.record({LOC.id: baseline})
+    sent: List[Tuple[str, List[Change]]] = []
+    provider = _Provider(dto)
+    w = ChangeWatcher(
+        provider, [LOC], lambda loc, d, changes: sent.append((loc.id, changes)), OPT, store, clock=lambda: clock[0]
+    )
+    return w, provider, clock, sent
+
+
+def test_notifies_once_per_change_and_caps_per_day(tmp_path):
+    w, provider, clock, sent = _watcher(tmp_path, 14, _w(precipitation_prob=0.8), baseline=_w())
+    assert w.poll_once() == 1
+    clock[0] += OPT.interval_sec
+    assert w.poll_once() == 0  # 基线已更新为 80%：不再重复通知
+    for p in (0.1, 0.9, 0.1):
+        provider.dto = _w(precipitation_prob=p)
+        clock[0] += OPT.interval_sec
+        w.poll_once()
+    assert len(sent) == OPT.max_updates_per_day
+    assert w.store.get(LOC.id).updates == OPT.max_updates_per_day
+
+
+def test_skips_outside_active_hours_and_before_morning_send(tmp_path):
+    w, provider, _, sent = _watcher(tmp_path, 23, _w(precipitation_prob=0.8), baseline=_w())
+    assert w.poll_once() == 0
+    w2, provider2, _, _ = _watcher(tmp_path / "fresh", 14, _w(precipitation_prob=0.8))
+    assert w2.poll_once() == 0
+    assert provider.calls == provider2.calls == 0 and not sent
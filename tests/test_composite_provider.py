@@ -0,0 +1,159 @@
+# tests/test_composite_provider.py
+"""两个 stub server 分别充当和风与 Open-Meteo，验证 failover / race / hedge / 熔断。"""
+from __future__ import annotations
+
+import time
+from typing import Iterator, Tuple
+
+import pytest
+
+from bench.stub_server import StubConfig, StubQWeatherServer
+from weather.composite_provider import CompositeOptions, CompositeProvider, ProvidersFailed
+from weather.http_client import QWeatherHttpClient
+from weather.models import Location
+from weather.openmeteo_provider import OpenMeteoProvider
+from weather.qweather_provider import QWeatherProvider
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.t = 1000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+@pytest.fixture
+def sources(tmp_path) -> Iterator[Tuple[StubQWeatherServer, StubQWeatherServer, QWeatherProvider, OpenMeteoProvider, Location]]:
+    with StubQWeatherServer(StubConfig()) as qs, StubQWeatherServer(StubConfig()) as om:
+        q = QWeatherProvider(client=QWeatherHttpClient(api_host=qs.url, api_key="test"), cache_file=str(tmp_path / "geo.json"))
+        o = OpenMeteoProvider(client=QWeatherHttpClient(api_host=om.url, api_key=""))
+        loc = q.lookup_location("广州市")  # 先解析好地点（之后和风可能被设成故障）
+        yield qs, om, q, o, loc
+
+
+def _settle(cp: CompositeProvider, timeout: float = 3.0) -> None:
+    """等被放弃的请求在后台跑完（它们的成败也计入健康度）。"""
+    end = time.monotonic() + timeout
+    while any(h.inflight for h in cp.health.values()) and time.monotonic() < end:
+        time.sleep(0.01)
+
+
+def _health(cp: CompositeProvider, name: str):
+    return cp.health[name]
+
+
+def test_failover_on_error(sources):
+    qs, om, q, o, loc = sources
+    qs.cfg.error_rate = 1.0
+    cp = CompositeProvider([q, o], CompositeOptions(deadline_sec=2.0))
+    try:
+        dto = cp.get_weather_for_location(loc, query_city="广州市")
+        assert dto.location_id == loc.id  # 结果按请求的 Location 归一
+        assert om.stats.requests > 0
+        assert _health(cp, "qweather").failures == 1
+        # 失败过的源排到后面：下一次直接走 Open-Meteo
+        before = qs.stats.requests
+        cp.get_weather_for_location(loc, query_city="广州市")
+        assert qs.stats.requests == before
+    finally:
+        cp.close()
+
+
+def test_failover_on_deadline(sources):
+    qs, om, q, o, loc = sources
+    qs.cfg.latency_ms = 500.0
+    cp = CompositeProvider([q, o], CompositeOptions(deadline_sec=0.2))
+    try:
+        t0 = time.perf_counter()
+        cp.get_weather_for_location(loc, query_city="广州市")
+        assert time.perf_counter() - t0 < 0.5  # 不等慢源返回
+        _settle(cp)
+        assert _health(cp, "qweather").failures == 1  # 超时的请求跑完后仍记为失败
+    finally:
+        cp.close()
+
+
+def test_all_sources_failed(sources):
+    qs, om, q, o, loc = sources
+    qs.cfg.error_rate = 1.0
+    om.cfg.error_rate = 1.0
+    cp = CompositeProvider([q, o], CompositeOptions(deadline_sec=2.0))
+    try:
+        with pytest.raises(ProvidersFailed):
+            cp.get_weather_for_location(loc, query_city="广州市")
+    finally:
+        cp.close()
+
+
+def test_race_fastest_wins(sources):
+    qs, om, q, o, loc = sources
+    qs.cfg.latency_ms = 300.0
+    cp = CompositeProvider([q, o], CompositeOptions(mode="race", deadline_sec=2.0))
+    try:
+        t0 = time.perf_counter()
+        cp.get_weather_for_location(loc, query_city="广州市")
+        assert time.perf_counter() - t0 < 0.3
+        assert _health(cp, "openmeteo").wins == 1
+        assert _health(cp, "qweather").wins == 0
+        _settle(cp)
+        assert qs.stats.requests > 0  # 两个源同时发出
+    finally:
+        cp.close()
+
+
+def test_hedge_skips_second_when_primary_is_fast(sources):
+    qs, om, q, o, loc = sources
+    cp = CompositeProvider([q, o], CompositeOptions(mode="race", deadline_sec=2.0, hedge_after_sec=1.0))
+    try:
+        cp.get_weather_for_location(loc, query_city="广州市")
+        assert om.stats.requests == 0
+        assert _health(cp, "qweather").wins == 1
+    finally:
+        cp.close()
+
+
+def test_hedge_fires_when_primary_is_slow(sources):
+    qs, om, q, o, loc = sources
+    qs.cfg.latency_ms = 400.0
+    cp = CompositeProvider([q, o], CompositeOptions(mode="race", deadline_sec=2.0, hedge_after_sec=0.1))
+    try:
+        t0 = time.perf_counter()
+        cp.get_weather_for_location(loc, query_city="广州市")
+        assert time.perf_counter() - t0 < 0.4
+        assert om.stats.requests > 0
+        assert _health(cp, "openmeteo").wins == 1
+    finally:
+        _settle(cp)
+        cp.close()
+
+
+def test_circuit_breaker_opens_and_probes_after_cooldown(sources):
+    qs, om, q, o, loc = sources
+    qs.cfg.error_rate = 1.0
+    clock = _Clock()
+    cp = CompositeProvider(
+        [q, o], CompositeOptions(mode="race", deadline_sec=2.0, max_failures=2, cooldown_sec=60.0), clock=clock
+    )
+    try:
+        for _ in range(2):
+            cp.get_weather_for_location(loc, query_city="广州市")
+            _settle(cp)
+        h = _health(cp, "qweather")
+        assert h.consecutive_failures == 2 and h.is_open(clock())
+
+        # 熔断期间不再请求和风
+        before = qs.stats.requests
+        cp.get_weather_for_location(loc, query_city="广州市")
+        _settle(cp)
+        assert qs.stats.requests == before
+
+        # 冷却结束：放一个请求试探；恢复后熔断关闭
+        clock.t += 61.0
+        qs.cfg.error_rate = 0.0
+        cp.get_weather_for_location(loc, query_city="广州市")
+        _settle(cp)
+        assert qs.stats.requests > before
+        assert h.consecutive_failures == 0 and not h.is_open(clock())
+    finally:
+        cp.close()
@@ -0,0 +1,102 @@
+# tests/test_confirm.py
+"""送达确认：假微信 + 虚拟时钟（等待不真睡）。"""
+from __future__ import annotations
+
+from bench.fake_wx import FakeWeChat
+from wechat.confirm import ConfirmOptions, DeliveryTracker, tracker_for
+from wechat.messenger import SendOptions, send_text
+
+OPT = ConfirmOptions(timeout_sec=3.0, first_wait_sec=0.15, backoff=2.0, max_wait_sec=1.0)
+
+
+class _VirtualClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, sec: float) -> None:
+        self.t += max(0.0, sec)
+
+
+def _setup(**wx_kw):
+    vc = _VirtualClock()
+    wx = FakeWeChat(clock=vc.now, **wx_kw)
+    return wx, DeliveryTracker(clock=vc.now, sleep=vc.sleep), vc
+
+
+def _send(wx, tracker, chat: str, text: str):
+    wx.ChatWith(chat)
+    tracker.mark(wx, chat)
+    wx.SendMsg(text)
+    return tracker.confirm(wx, chat, text, OPT)
+
+
+def test_confirms_after_echo_delay_with_backoff():
+    wx, tracker, _ = _setup(echo_delay_sec=0.4)
+    d = _send(wx, tracker, "张三", "早上好")
+    # 0.15 -> 0.3（累计 0.45）时出现
+    assert d.confirmed is True
+    assert d.checks == 2
+    assert abs(d.waited_sec - 0.45) < 1e-9
+
+
+def test_dropped_message_times_out_without_resend():
+    wx, tracker, _ = _setup(drop_every=1)
+    d = _send(wx, tracker, "张三", "早上好")
+    assert d.confirmed is False
+    assert d.waited_sec >= OPT.timeout_sec
+    assert len(wx.sent) == 1  # 未确认只报告，不重发
+
+
+def test_old_identical_message_does_not_confirm():
+    wx, tracker, _ = _setup(drop_every=2)
+    assert _send(wx, tracker, "张三", "早上好").confirmed is True
+    # 同样的文本第二次被丢：聊天记录里只有上一次那条，不能算确认
+    assert _send(wx, tracker, "张三", "早上好").confirmed is False
+
+
+def test_friend_echo_does_not_confirm():
+    wx, tracker, _ = _setup(drop_every=1)
+    wx.ChatWith("张三")
+    tracker.mark(wx, "张三")
+    wx.SendMsg("早上好")
+    wx.receive("张三", "早上好")  # 对方复读
+    assert tracker.confirm(wx, "张三", "早上好", OPT).confirmed is False
+
+
+def test_high_water_mark_skips_pre_send_reads():
+    wx, tracker, _ = _setup()
+    for i in range(5):
+        assert _send(wx, tracker, "张三", f"第{i}条").confirmed is True
+    # 第一次 mark 读一次，之后每条只在确认时读
+    assert tracker.reads == 1 + 5
+
+
+def test_truncated_history_window_still_confirms():
+    wx, tracker, _ = _setup(history_window=3)
+    for i in range(10):
+        wx.receive("张三", f"闲聊{i}")
+    for i in range(4):
+        assert _send(wx, tracker, "张三", f"第{i}条").confirmed is True
+
+
+def test_long_message_matches_on_prefix():
+    wx, tracker, _ = _setup()
+    text = "天气" * 100
+    assert _send(wx, tracker, "张三", text + "\r\n").confirmed is True
+
+
+def test_send_text_confirms_with_shared_tracker():
+    wx = FakeWeChat()
+    opt = SendOptions(
+        pre_delay_sec_min=0.0,
+        pre_delay_sec_max=0.0,
+        press_esc_before_send=False,
+        confirm=ConfirmOptions(first_wait_sec=0.0, timeout_sec=0.1),
+    )
+    d = send_text(wx, "张三", "早上好", opt)
+    assert d.confirmed is True
+    assert tracker_for(wx) is tracker_for(wx)
+    assert send_text(wx, "张三", "晚安", SendOptions(pre_delay_sec_min=0.0, pre_delay_sec_max=0.0)).confirmed is None
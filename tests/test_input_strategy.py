@@ -0,0 +1,100 @@
+# tests/test_input_strategy.py
+"""输入方式：假输入后端；粘贴按真实情况异步生效（微信处理时才读剪贴板）。"""
+from __future__ import annotations
+
+import random
+from typing import List
+
+import pytest
+
+import wechat.input_strategy as input_strategy
+from wechat.input_strategy import (
+    INPUT_BURST,
+    INPUT_PASTE,
+    INPUT_PASTE_CHUNKS,
+    FakeInputBackend,
+    InputOptions,
+    input_message,
+    measure_throughput,
+)
+
+MSG = "广州今天多云，18~26°C，降水概率 20%。Have a nice day! 🌤"
+
+
+class _AsyncPasteBackend(FakeInputBackend):
+    """
+    Ctrl+V 只是排进微信的消息队列：等到下一次真正的停顿（sleep > 0）才按当时的剪贴板内容粘贴；
+    一直没停顿的话，微信处理时剪贴板已经是恢复后的内容了。
+    """
+
+    _PENDING = object()
+
+    def paste(self) -> None:
+        self._op("paste")
+        self.typed.append(self._PENDING)  # type: ignore[arg-type]
+
+    def _flush(self) -> None:
+        self.typed = [self.clipboard or "" if t is self._PENDING else t for t in self.typed]
+
+    def sleep(self, sec: float) -> None:
+        super().sleep(sec)
+        if sec > 0:
+            self._flush()
+
+    def text(self) -> str:
+        self._flush()
+        return super().text()
+
+
+class _Wx:
+    def SendMsg(self, msg: str) -> None:  # pragma: no cover - 剪贴板方式不走这里
+        raise AssertionError("不应调用 SendMsg")
+
+
+@pytest.mark.parametrize("mode", [INPUT_PASTE, INPUT_PASTE_CHUNKS, INPUT_BURST])
+def test_modes_type_exact_text_and_restore_clipboard(mode):
+    fb = FakeInputBackend()
+    input_message(_Wx(), MSG, InputOptions(mode=mode, chunk_chars=7), backend=fb, rnd=random.Random(1))
+    assert fb.text() == MSG + "\n<SEND>"
+    assert fb.clipboard == "用户原剪贴板"
+
+
+@pytest.mark.parametrize("mode", [INPUT_PASTE, INPUT_PASTE_CHUNKS, INPUT_BURST])
+def test_settle_delay_keeps_async_paste_correct(mode):
+    fb = _AsyncPasteBackend()
+    input_message(_Wx(), MSG, InputOptions(mode=mode, chunk_chars=7), backend=fb, rnd=random.Random(1))
+    assert fb.text() == MSG + "\n<SEND>"
+
+
+def test_without_settle_delay_async_paste_goes_wrong():
+    # 对照：不等就改剪贴板 / 回车，粘进去的是后面的内容
+    fb = _AsyncPasteBackend()
+    opt = InputOptions(
+        mode=INPUT_PASTE_CHUNKS, chunk_chars=7, chunk_delay_min=0.0, chunk_delay_max=0.0, paste_settle_sec=0.0
+    )
+    input_message(_Wx(), MSG, opt, backend=fb, rnd=random.Random(1))
+    assert fb.text() != MSG + "\n<SEND>"
+
+
+def test_non_text_clipboard_warns_once(monkeypatch, capsys):
+    monkeypatch.setattr(input_strategy, "_warned_unrestorable", False)
+    restored: List[str] = []
+    for _ in range(2):
+        fb = FakeInputBackend(clipboard=None)  # 图片 / 文件：读不出文本
+        input_message(_Wx(), MSG, InputOptions(mode=INPUT_PASTE), backend=fb)
+        assert fb.text() == MSG + "\n<SEND>"
+        restored.append(fb.clipboard or "")
+    assert capsys.readouterr().out.count("[WARN]") == 1
+    assert restored == [MSG, MSG]  # 没有可恢复的内容，不去乱写剪贴板
+
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        input_message(_Wx(), MSG, InputOptions(mode="telepathy"), backend=FakeInputBackend())
+
+
+def test_measure_throughput_counts_settle_time():
+    fast, _ = measure_throughput(MSG, InputOptions(mode=INPUT_PASTE, paste_settle_sec=0.0))
+    settled, ops = measure_throughput(MSG, InputOptions(mode=INPUT_PASTE))
+    assert settled == pytest.approx(fast + 0.05)
+    assert ops["paste"] == 1
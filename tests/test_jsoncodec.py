@@ -0,0 +1,47 @@
+# tests/test_jsoncodec.py
+from __future__ import annotations
+
+import importlib
+
+import pytest
+
+from utils import jsoncodec
+
+DATA = {"城市": "广州", "temp": [18.5, 26], "ok": True, "none": None}
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def codec(request, monkeypatch):
+    """装了 orjson 时两个后端都测；WEATHER_SENDER_JSON=stdlib 强制标准库"""
+    if request.param == "stdlib":
+        monkeypatch.setenv("WEATHER_SENDER_JSON", "stdlib")
+    else:
+        monkeypatch.delenv("WEATHER_SENDER_JSON", raising=False)
+    mod = importlib.reload(jsoncodec)
+    if request.param == "stdlib":
+        assert mod.BACKEND == "stdlib"
+    yield mod
+    monkeypatch.delenv("WEATHER_SENDER_JSON", raising=False)
+    importlib.reload(jsoncodec)
+
+
+def test_round_trip_compact_and_unescaped(codec):
+    raw = codec.dumps(DATA)
+    assert isinstance(raw, bytes)
+    assert "广州".encode("utf-8") in raw and b": " not in raw and b"\n" not in raw
+    assert codec.loads(raw) == DATA
+    assert codec.loads(raw.decode("utf-8")) == DATA
+    assert codec.loads(memoryview(raw)) == DATA
+    assert codec.loads(codec.dumps(DATA, pretty=True)) == DATA
+
+
+def test_write_file_is_atomic(codec, tmp_path):
+    p = tmp_path / "sub" / "state.json"
+    n = codec.write_file(p, DATA)
+    assert n == p.stat().st_size
+    assert codec.read_file(p) == DATA
+    assert [x.name for x in p.parent.iterdir()] == ["state.json"]  # 没有留下临时文件
+
+
+def test_default_hook_for_unknown_types(codec):
+    assert codec.loads(codec.dumps({"s": {1, 2}}, default=sorted)) == {"s": [1, 2]}
@@ -0,0 +1,133 @@
+# tests/test_listener.py
+from __future__ import annotations
+
+import time
+from datetime import date
+from typing import Dict, List, Tuple
+
+import pytest
+
+from weather.models import Location
+from wechat.listener import FakeMessageSource, Query, QueryBot, parse_command
+
+_LOCS = {
+    "广州": Location(id="101280101", name="广州", lat=23.1, lon=113.3, adm1="广东省", adm2="广州"),
+    "北京": Location(id="101010100", name="北京", lat=39.9, lon=116.4, adm1="北京市", adm2="北京"),
+}
+
+
+class _Provider:
+    """只实现 QueryBot 用到的两个方法；“好热”之类模糊搜索会搜出一个不相干的地名。"""
+
+    def __init__(self) -> None:
+        self.weather_calls: List[Tuple[str, int]] = []
+
+    def lookup_location(self, city: str) -> Location:
+        name = city[:-1] if city.endswith("市") else city
+        if name in _LOCS:
+            return _LOCS[name]
+        if name == "好热":
+            return Location(id="999", name="热水镇", lat=0.0, lon=0.0, adm1="某省", adm2="某县")
+        raise RuntimeError(f"找不到城市：{city}")
+
+    def get_weather_for_location(self, loc: Location, *, query_city: str, day_offset: int = 0) -> Dict:
+        self.weather_calls.append((loc.id, day_offset))
+        return {"loc": loc.name, "day": day_offset}
+
+
+class _Builder:
+    def build(self, dto: Dict, *, day_label: str = "今天", framing: bool = True) -> str:
+        return f"{dto['loc']}{day_label}：晴"
+
+
+def _bot(default: str = "广州", today=lambda: date(2026, 7, 1)):
+    src = FakeMessageSource()
+    provider = _Provider()
+    replies: List[Tuple[str, str]] = []
+    clock = [0.0]
+    bot = QueryBot(
+        src,
+        provider,  # type: ignore[arg-type]
+        _Builder(),  # type: ignore[arg-type]
+        reply=lambda chat, text: replies.append((chat, text)),
+        default_city=lambda chat: default,
+        clock=lambda: clock[0],
+        today=today,
+    )
+    return bot, src, provider, replies
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("天气", Query(None, 0)),
+        ("明天", Query(None, 1)),
+        ("今天天气", Query(None, 0)),
+        ("明天天气怎么样", Query(None, 1)),
+        ("广州天气", Query("广州", 0, city_must_resolve=True)),
+        ("北京的天气如何？", Query("北京", 0, city_must_resolve=True)),
+        ("广州明天天气", Query("广州", 1)),
+        ("广州 后天", Query("广州", 2)),
+        ("广州", None),
+        ("天气不错", None),
+        ("后天呢", None),
+        ("哈哈哈", None),
+        ("", None),
+        ("今天真的好热啊我们去哪里玩比较好呢明天天气", None),
+    ],
+)
+def test_parse_command(text, expected):
+    assert parse_command(text) == expected
+
+
+def test_replies_to_queries_only():
+    bot, src, provider, replies = _bot()
+    src.push("张三", "天气")
+    src.push("张三", "好热的天气")  # “好热”搜出的是热水镇：不是查询
+    src.push("李四", "北京明天天气")
+    src.push("李四", "吃饭了吗")
+    src.push("王五", "火星天气")  # 查不到：不回复
+
+    assert bot.poll_once() == 2
+    assert replies == [("张三", "广州今天：晴"), ("李四", "北京明天：晴")]
+
+
+def test_unknown_city_with_day_word_gets_fallback_reply():
+    bot, src, _, replies = _bot()
+    src.push("张三", "火星明天天气")
+    assert bot.poll_once() == 1
+    assert replies[0][1].startswith("没查到")
+
+
+def test_reply_cache_is_keyed_by_date():
+    day = [date(2026, 7, 1)]
+    bot, src, provider, replies = _bot(today=lambda: day[0])
+    src.push("张三", "明天")
+    src.push("李四", "广州明天")
+    bot.poll_once()
+    assert provider.weather_calls == [("101280101", 1)]  # 同地点同一天复用
+
+    day[0] = date(2026, 7, 2)  # 过了零点，“明天”是另一天
+    src.push("张三", "明天")
+    bot.poll_once()
+    assert provider.weather_calls == [("101280101", 1), ("101280101", 1)]
+    assert len(replies) == 3
+
+
+def test_idle_polling_stays_responsive():
+    bot, src, _, replies = _bot()
+    polls: List[float] = []
+    poll = src.poll
+
+    def timed_poll():
+        polls.append(time.perf_counter())
+        if len(polls) >= 12:
+            bot.stop()
+        return poll()
+
+    src.poll = timed_poll  # type: ignore[method-assign]
+    bot.run_forever()
+    # 空闲退避封顶：任何时候来一条查询，最多等一个 poll_max_sec 就会被拉到
+    gaps = [b - a for a, b in zip(polls, polls[1:])]
+    assert max(gaps) < bot.opt.poll_max_sec + 0.2
+    assert bot.opt.poll_max_sec <= 0.5
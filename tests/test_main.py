@@ -0,0 +1,61 @@
+# tests/test_main.py
+"""main() 各阶段耗时：假微信 + 假数据源（与 bench/run.py 的 e2e 相同的注入方式）。"""
+from __future__ import annotations
+
+import time
+
+import main as app
+from bench.fake_wx import FakeWeChat
+from tests.test_pipeline import _Provider
+from wechat.messenger import SendOptions
+
+FAST = SendOptions(pre_delay_sec_min=0.0, pre_delay_sec_max=0.0, retries=0, press_esc_before_send=False)
+
+
+class _SlowProvider(_Provider):
+    def get_weather_for_location(self, loc, query_city, day_offset=0):
+        time.sleep(0.15)
+        return super().get_weather_for_location(loc, query_city, day_offset)
+
+
+def _config(tmp_path, cities):
+    lines = ["[wechat]", "wechat_path = fake.exe", ""]
+    for i, city in enumerate(cities):
+        lines += [f"[recipient:r{i}]", f"city = {city}", ""]
+    p = tmp_path / "config.ini"
+    p.write_text("\n".join(lines), encoding="utf-8")
+    return str(p)
+
+
+def _slow_login(wx):
+    def factory(job):
+        time.sleep(0.15)
+        return wx
+
+    return factory
+
+
+def test_wechat_login_overlaps_weather_fetch(tmp_path):
+    wx = FakeWeChat()
+    cfg = _config(tmp_path, ["广州", "广州", "北京"])
+    timings = app.main(cfg, wx_factory=_slow_login(wx), provider_factory=_SlowProvider, send_opt=FAST)
+
+    assert len(wx.sent) == 3
+    for stage in ("config", "wechat_ready", "weather_message", "fetch", "build", "send", "critical_path", "total"):
+        assert stage in timings, stage
+    # 两条路径并行：关键路径接近较慢的一条，而不是两者之和
+    assert timings["weather_message"] >= 0.15 and timings["wechat_ready"] >= 0.15
+    assert timings["critical_path"] < timings["wechat_ready"] + timings["weather_message"] - 0.1
+    assert timings["fetch"] >= 2 * 0.15  # 两个地点的取数时间合计
+    assert timings["build"] < timings["fetch"]
+
+
+def test_no_critical_path_when_nothing_is_sent(tmp_path):
+    wx = FakeWeChat()
+    cfg = _config(tmp_path, ["火星", "月球"])
+    provider = _Provider(fail={"火星", "月球"})
+    timings = app.main(cfg, wx_factory=lambda job: wx, provider_factory=lambda: provider, send_opt=FAST)
+    assert not wx.sent
+    assert "critical_path" not in timings
+    assert "weather_message" not in timings  # 没有消息就绪
+    assert "send" in timings and "total" in timings
@@ -0,0 +1,178 @@
+# tests/test_pipeline.py
+from __future__ import annotations
+
+import threading
+import time
+from datetime import date
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from jobs.config import RecipientConfig
+from jobs.pipeline import DtoCache, PipelineItem, PipelineOptions, PipelineStats, iter_pipeline
+from jobs.runner import RunPlan, stream_messages
+from weather.models import Location, WeatherDTO
+
+
+def _dto(city: str, loc_id: str = "") -> WeatherDTO:
+    return WeatherDTO(
+        query_city=city, location_id=loc_id or f"id-{city}", location_name=city, adm1=None, adm2=None, adm3=None,
+        target_date=date(2026, 10, 19), temp_min_c=18.0, temp_max_c=26.0, weather_desc="多云",
+        precipitation_prob=0.2, wind_desc="东风 2级", wind_speed_mps=None, aqi=40, aqi_desc="优",
+        uv_index=5.0, uv_desc="中等", clothing_advice=None,
+    )
+
+
+class _Provider:
+    def __init__(self, alias=None, fail=()) -> None:
+        self.alias = alias or {}
+        self.fail = set(fail)
+        self.weather_calls: List[str] = []
+        self.lock = threading.Lock()
+
+    def lookup_location(self, city: str) -> Location:
+        if city in self.fail:
+            raise RuntimeError(f"找不到城市：{city}")
+        name = self.alias.get(city, city)
+        return Location(id=f"id-{name}", name=name, lat=0.0, lon=0.0)
+
+    def get_weather_for_location(self, loc: Location, query_city: str, day_offset: int = 0) -> WeatherDTO:
+        with self.lock:
+            self.weather_calls.append(loc.id)
+        return _dto(query_city, loc.id)
+
+
+def test_expand_applies_backpressure_per_message():
+    produced: List[int] = []
+
+    def build(dto, it) -> Iterator[int]:
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    opt = PipelineOptions(fetch_workers=1, queue_size=4)
+    results = iter_pipeline([PipelineItem("f", "广州")], lambda c: _dto(c), build, opt, expand=True)
+    first = next(results)
+    time.sleep(0.1)  # 让生成线程跑到被队列挡住
+    # 一个城市展开成 1000 条，也只比队列容量多生成几条
+    assert first[1] == 0
+    assert len(produced) <= opt.queue_size + 3
+    assert [x for _, x in results] == list(range(1, 1000))
+
+
+def test_stream_messages_yields_each_recipient_and_dedups_locations():
+    recipients = [RecipientConfig(friend_name=f"r{i}", city=("广州" if i % 2 else "广州市")) for i in range(40)]
+    recipients.append(RecipientConfig(friend_name="x", city="火星"))
+    provider = _Provider(alias={"广州市": "广州"}, fail={"火星"})
+    report = RunPlan()
+    outs = list(stream_messages(recipients, provider, report=report))  # type: ignore[arg-type]
+
+    assert sorted(o.recipient.friend_name for o in outs) == sorted(f"r{i}" for i in range(40))
+    assert provider.weather_calls == ["id-广州"]  # 两个城市名解析到同一地点，只取一次
+    assert report.locations_fetched == 1
+    assert report.city_locations == {"广州": "id-广州", "广州市": "id-广州"}
+    assert [(r.friend_name, reason.split(":")[0]) for r, reason in report.failed] == [("x", "fetch")]
+
+
+def test_stats_time_fetch_and_build_but_not_backpressure():
+    def fetch(city: str) -> WeatherDTO:
+        time.sleep(0.05)
+        return _dto(city)
+
+    def build(dto, it) -> Iterator[int]:
+        for i in range(20):
+            time.sleep(0.001)
+            yield i
+
+    stats = PipelineStats()
+    opt = PipelineOptions(fetch_workers=1, queue_size=2)
+    results = iter_pipeline([PipelineItem("f", "广州")], fetch, build, opt, stats, expand=True)
+    next(results)
+    time.sleep(0.2)  # 消费端慢：生成线程被队列挡住的时间不算进 build
+    list(results)
+    assert 0.05 <= stats.fetch_sec < 0.15
+    assert 0.02 <= stats.build_sec < 0.15
+    assert stats.first_out_sec is not None and stats.first_out_sec >= 0.05
+
+
+def test_dto_cache_loads_each_key_once_under_concurrency():
+    cache = DtoCache(8)
+    calls: List[str] = []
+    gate = threading.Event()
+
+    def loader(key: str) -> WeatherDTO:
+        calls.append(key)
+        gate.wait(1.0)
+        return _dto(key)
+
+    results: List[Tuple[WeatherDTO, bool]] = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("广州", loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == ["广州"]
+    assert sorted(loaded for _, loaded in results) == [False] * 7 + [True]
+    assert len({id(dto) for dto, _ in results}) == 1
+
+
+def test_dto_cache_evicts_lru_and_does_not_cache_failures():
+    cache = DtoCache(2)
+    calls: List[str] = []
+
+    def loader(key: str) -> WeatherDTO:
+        calls.append(key)
+        if key == "火星":
+            raise RuntimeError("找不到城市")
+        return _dto(key)
+
+    for key in ("a", "b", "a", "c", "a", "b"):
+        cache.get_or_load(key, loader)
+    assert calls == ["a", "b", "c", "b"]  # c 挤掉了最久没用的 b
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("火星", loader)
+    assert calls.count("火星") == 2  # 失败不缓存，下次重试
+
+
+def test_slow_consumer_blocks_fetchers():
+    fetched: List[str] = []
+
+    def fetch(city: str) -> WeatherDTO:
+        fetched.append(city)
+        return _dto(city)
+
+    opt = PipelineOptions(fetch_workers=2, queue_size=2)
+    items = [PipelineItem(f"r{i}", f"城市{i}") for i in range(100)]
+    results = iter_pipeline(items, fetch, lambda dto, it: it.friend_name, opt)
+    time.sleep(0.1)
+    # 没人消费：各级队列都满了之后取数线程停下
+    assert len(fetched) <= 3 * opt.queue_size + opt.fetch_workers + 2
+    assert sorted(name for _, name in results) == sorted(f"r{i}" for i in range(100))
+    assert len(fetched) == 100
+
+
+def test_failures_are_reported_and_skipped():
+    failed: List[Tuple[str, str]] = []
+
+    def fetch(city: str) -> WeatherDTO:
+        if city == "火星":
+            raise RuntimeError("找不到城市")
+        return _dto(city)
+
+    def build(dto, it):
+        if it.friend_name == "坏模板":
+            raise ValueError("模板错误")
+        return it.friend_name
+
+    items = [PipelineItem("a", "广州"), PipelineItem("b", "火星"), PipelineItem("坏模板", "广州"), PipelineItem("c", "北京")]
+    stats = PipelineStats()
+    out = iter_pipeline(
+        items, fetch, build, PipelineOptions(fetch_workers=1), stats, lambda it, stage, e: failed.append((it.friend_name, stage))
+    )
+    assert sorted(name for _, name in out) == ["a", "c"]
+    assert sorted(failed) == [("b", "fetch"), ("坏模板", "build")]
+    assert stats.fetched == 2  # 广州只取一次
@@ -0,0 +1,119 @@
+# tests/test_replay.py
+"""录制 / 回放：假的“线上”请求函数，档案写到临时目录。"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import pytest
+import requests
+
+from weather.http_client import HttpResult, QWeatherHTTPError
+from weather.replay import RecordingTransport, ReplayTransport, read_index, request_key
+
+
+def _ts(day: str) -> float:
+    return datetime.fromisoformat(f"{day} 08:00").timestamp()
+
+
+class _Live:
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+        self.fail = False
+
+    def __call__(self, path: str, params: Dict[str, Any]) -> HttpResult:
+        self.calls.append(path)
+        if self.fail:
+            raise requests.ConnectionError(f"timeout https://api/{path}?key=SECRET&location=1")
+        body = f'{{"code":"200","path":"{path}","n":{len(self.calls)}}}'.encode()
+        return HttpResult(200, body, len(body) // 2)
+
+
+def _record(tmp_path, day: str, live: _Live, requests_: List[str]) -> RecordingTransport:
+    rec = RecordingTransport(tmp_path, clock=lambda: _ts(day))
+    for path in requests_:
+        rec.fetch(path, {"location": "101280101", "key": "SECRET"}, live)
+    return rec
+
+
+def _no_live(path: str, params: Dict[str, Any]) -> HttpResult:
+    raise AssertionError("回放不应联网")
+
+
+def test_request_key_ignores_api_key_and_param_order():
+    assert request_key("/v7/weather/3d", {"location": "1", "lang": "zh", "key": "a"}) == request_key(
+        "/v7/weather/3d", {"lang": "zh", "key": "b", "location": "1"}
+    )
+
+
+def test_round_trip_dedups_bodies_and_cycles(tmp_path):
+    live = _Live()
+    _record(tmp_path, "2026-10-19", live, ["/v7/weather/3d", "/v7/weather/3d", "/v7/air/now"])
+    index = list(read_index(tmp_path))
+    assert len(index) == 3 and "SECRET" not in (tmp_path / "index.jsonl").read_text(encoding="utf-8")
+
+    rp = ReplayTransport(tmp_path, speed=0)
+    params = {"location": "101280101", "key": "OTHER"}
+    got = [rp.fetch("/v7/weather/3d", params, _no_live).body for _ in range(3)]
+    assert got[0] != got[1] and got[2] == got[0]  # 同一天录了两次：轮流返回
+    assert rp.fetch("/v7/air/now", params, _no_live).wire_bytes == index[2].wire_bytes
+    with pytest.raises(QWeatherHTTPError):
+        rp.fetch("/v7/indices/1d", params, _no_live)
+    assert (rp.served, rp.misses) == (4, 1)
+    rp.close()
+
+
+def test_identical_bodies_stored_once(tmp_path):
+    rec = RecordingTransport(tmp_path)
+    body = b'{"code":"200"}'
+    for _ in range(5):
+        rec.fetch("/v7/weather/now", {"location": "1"}, lambda p, q: HttpResult(200, body, 10))
+    assert len({(e.offset, e.length) for e in read_index(tmp_path)}) == 1
+    # 续录时同样去重
+    RecordingTransport(tmp_path).fetch("/v7/weather/now", {"location": "2"}, lambda p, q: HttpResult(200, body, 10))
+    assert len({(e.offset, e.length) for e in read_index(tmp_path)}) == 1
+
+
+def test_errors_are_recorded_without_key_and_replayed(tmp_path):
+    live = _Live()
+    live.fail = True
+    with pytest.raises(requests.ConnectionError):
+        _record(tmp_path, "2026-10-19", live, ["/v7/weather/3d"])
+    assert "SECRET" not in (tmp_path / "index.jsonl").read_text(encoding="utf-8")
+    rp = ReplayTransport(tmp_path, speed=0)
+    with pytest.raises(requests.ConnectionError, match="回放"):
+        rp.fetch("/v7/weather/3d", {"location": "101280101"}, _no_live)
+
+
+def test_replays_latest_day_or_chosen_day(tmp_path):
+    live = _Live()
+    _record(tmp_path, "2026-10-18", live, ["/v7/weather/3d"])
+    _record(tmp_path, "2026-10-19", live, ["/v7/weather/3d"])
+    params = {"location": "101280101"}
+    latest = ReplayTransport(tmp_path, speed=0).fetch("/v7/weather/3d", params, _no_live).body
+    chosen = ReplayTransport(tmp_path, speed=0, day="2026-10-18").fetch("/v7/weather/3d", params, _no_live).body
+    assert b'"n":2' in latest and b'"n":1' in chosen
+    with pytest.raises(RuntimeError):
+        ReplayTransport(tmp_path, day="2026-01-01")
+
+
+def test_speed_scales_recorded_latency(tmp_path):
+    def slow(path: str, params: Dict[str, Any]) -> HttpResult:
+        time.sleep(0.02)
+        return HttpResult(200, b"{}", 2)
+
+    RecordingTransport(tmp_path).fetch("/v7/weather/3d", {"location": "101280101"}, slow)
+    slept: List[float] = []
+    rp = ReplayTransport(tmp_path, speed=10, sleep=slept.append)
+    rp.fetch("/v7/weather/3d", {"location": "101280101"}, _no_live)
+    recorded = next(read_index(tmp_path)).latency_ms
+    assert recorded >= 20
+    assert slept == [pytest.approx(recorded / 1000 / 10)]
+
+
+def test_truncated_index_line_is_skipped(tmp_path):
+    _record(tmp_path, "2026-10-19", _Live(), ["/v7/weather/3d"])
+    with (tmp_path / "index.jsonl").open("ab") as f:
+        f.write(b'{"k":"/v7/air/now","ts":1')  # 录到一半中断
+    assert [e.key for e in read_index(tmp_path)] == [request_key("/v7/weather/3d", {"location": "101280101"})]
@@ -0,0 +1,118 @@
+# tests/test_scheduler.py
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from jobs.scheduler import DEFAULT_TZ, LocalTimeDispatcher, ScheduleEntry, next_fire_ts, parse_send_time
+
+
+def _ts(s: str, tz: str = DEFAULT_TZ) -> float:
+    return datetime.fromisoformat(s).replace(tzinfo=ZoneInfo(tz)).timestamp()
+
+
+def test_failed_tz_lookup_falls_back_to_default(capsys):
+    def resolver(city: str) -> str:
+        if city == "火星":
+            raise RuntimeError("找不到城市：火星")
+        return "Europe/London"
+
+    d = LocalTimeDispatcher(tz_resolver=resolver)
+    now = _ts("2026-10-19 06:00")
+    d.add_many(
+        [
+            ScheduleEntry(key="a", city="火星", send_time=parse_send_time("07:00")),
+            ScheduleEntry(key="b", city="伦敦", send_time=parse_send_time("07:00")),
+        ],
+        now=now,
+    )
+    assert len(d) == 2
+    assert d.next_due() == _ts("2026-10-19 07:00")  # 火星按默认时区
+    assert "火星" in capsys.readouterr().out
+
+
+def _entry(key: str, hhmm: str, tz: str = DEFAULT_TZ) -> ScheduleEntry:
+    return ScheduleEntry(key=key, city=key, send_time=parse_send_time(hhmm), tz=tz)
+
+
+def test_parse_send_time_rejects_bad_format():
+    assert parse_send_time("7:30:15").second == 15
+    with pytest.raises(ValueError):
+        parse_send_time("0730")
+
+
+def test_next_fire_is_strictly_after_and_local():
+    t = parse_send_time("07:30")
+    assert next_fire_ts(t, DEFAULT_TZ, _ts("2026-10-19 06:00")) == _ts("2026-10-19 07:30")
+    assert next_fire_ts(t, DEFAULT_TZ, _ts("2026-10-19 07:30")) == _ts("2026-10-20 07:30")
+    # 纽约夏令时结束那天按当地 07:30 触发
+    ny = "America/New_York"
+    assert next_fire_ts(t, ny, _ts("2026-11-01 00:00", ny)) == _ts("2026-11-01 07:30", ny)
+
+
+def test_pops_in_due_order_and_reschedules_next_day():
+    d = LocalTimeDispatcher(coalesce_sec=0.0)
+    now = _ts("2026-10-19 06:00")
+    d.add_many([_entry("c", "09:00"), _entry("a", "07:00"), _entry("b", "08:00")], now=now)
+    keys = []
+    for hhmm in ("07:00", "08:00", "09:00"):
+        t = _ts(f"2026-10-19 {hhmm}")
+        assert d.pop_due(now=t - 1) is None  # 没到点不弹出
+        batch = d.pop_due(now=t)
+        keys += [e.key for e in batch.entries]
+    assert keys == ["a", "b", "c"]
+    assert d.next_due() == _ts("2026-10-20 07:00")
+    assert len(d) == 3
+
+
+def test_coalesces_entries_within_window():
+    d = LocalTimeDispatcher(coalesce_sec=60.0)
+    d.add_many(
+        [_entry("a", "07:00"), _entry("b", "07:00:30"), _entry("c", "07:01:00"), _entry("d", "07:02")],
+        now=_ts("2026-10-19 06:00"),
+    )
+    batch = d.pop_due(now=_ts("2026-10-19 07:00"))
+    assert batch.due_at == _ts("2026-10-19 07:00")
+    assert [e.key for e in batch.entries] == ["a", "b", "c"]  # d 在窗口外，留到下一批
+    assert d.next_due() == _ts("2026-10-19 07:02")
+
+
+def test_remove_and_readd_are_lazy():
+    d = LocalTimeDispatcher(coalesce_sec=0.0)
+    now = _ts("2026-10-19 06:00")
+    d.add_many([_entry("a", "07:00"), _entry("b", "08:00")], now=now)
+    d.remove("a")
+    assert len(d) == 1
+    assert d.next_due() == _ts("2026-10-19 08:00")  # 堆里 a 的旧记录被跳过
+    d.add(_entry("b", "07:30"), now=now)  # 改时间：旧的 08:00 记录作废
+    assert [e.key for e in d.pop_due(now=_ts("2026-10-19 07:30")).entries] == ["b"]
+    assert d.pop_due(now=_ts("2026-10-19 08:00")) is None
+
+
+def test_run_forever_dispatches_and_survives_handler_errors():
+    clock = [_ts("2026-10-19 06:59:59.9")]
+    d = LocalTimeDispatcher(coalesce_sec=0.0, max_sleep_sec=0.01, clock=lambda: clock[0])
+    d.add_many([_entry("a", "07:00"), _entry("b", "07:00:01")])
+    seen = []
+
+    def handler(batch):
+        seen.extend(e.key for e in batch.entries)
+        if len(seen) == 1:
+            raise RuntimeError("发送失败")
+        d.stop()
+
+    def tick():
+        # 虚拟时钟随真实等待前进
+        while not d._stopped:
+            clock[0] += 0.05
+            time.sleep(0.005)
+
+    t = threading.Thread(target=tick, daemon=True)
+    t.start()
+    d.run_forever(handler)
+    t.join(1.0)
+    assert seen == ["a", "b"]
@@ -0,0 +1,142 @@
+# tests/test_sender_pool.py
+"""多账号发送池：假微信 + 虚拟时钟（限速等待不真睡）。"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from bench.fake_wx import FakeWeChat
+from jobs.config import AccountConfig, RecipientConfig, load_job_config
+from jobs.runner import Outgoing
+from jobs.sender_pool import SenderPool
+from wechat.messenger import SendOptions, send_text
+
+FAST = SendOptions(pre_delay_sec_min=0.0, pre_delay_sec_max=0.0, retries=0, press_esc_before_send=False)
+
+
+class _VirtualClock:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, sec: float) -> None:
+        self.t += max(0.0, sec)
+
+
+def _outgoing(n: int, pinned_every: int = 0) -> List[Outgoing]:
+    out = []
+    for i in range(n):
+        accounts = ("a0",) if pinned_every and i % pinned_every == 0 else ()
+        out.append(Outgoing(recipient=RecipientConfig(friend_name=f"r{i}", city="广州", accounts=accounts), text=f"#{i}"))
+    return out
+
+
+def _pool(n_accounts: int, logout_after: Optional[Dict[str, int]] = None, rate: float = 60.0):
+    logout_after = logout_after or {}
+    vc = _VirtualClock()
+    handles: Dict[str, FakeWeChat] = {}
+
+    def factory(a: AccountConfig) -> Any:
+        handles[a.name] = FakeWeChat(logout_after=logout_after.get(a.name, 0))
+        return handles[a.name]
+
+    accs = [AccountConfig(name=f"a{i}", wechat_path="fake.exe", rate_per_min=rate, burst=3) for i in range(n_accounts)]
+    return SenderPool(accs, factory, clock=vc.now, sleep=vc.sleep), handles, vc
+
+
+def _deliver(wx: Any, out: Outgoing) -> None:
+    send_text(wx, out.recipient.friend_name, out.text, FAST)
+
+
+def _received(handles: Dict[str, FakeWeChat]) -> Dict[str, str]:
+    return {chat: name for name, wx in handles.items() for chat, _ in wx.sent}
+
+
+def test_assignment_is_stable_and_spread():
+    pool, handles, _ = _pool(3)
+    report = pool.run(_outgoing(90), _deliver)
+    assert sum(report.sent.values()) == 90 and not report.failed
+    assert all(n > 0 for n in report.sent.values())
+    first = _received(handles)
+
+    # 再跑一次：同一接收人仍由同一账号发送
+    pool2, handles2, _ = _pool(3)
+    pool2.run(_outgoing(90), _deliver)
+    assert _received(handles2) == first
+
+
+def test_more_accounts_send_faster():
+    elapsed = []
+    for n in (1, 3):
+        pool, _, _ = _pool(n, rate=20.0)
+        elapsed.append(pool.run(_outgoing(60), _deliver).elapsed_sec)
+    assert elapsed[1] < elapsed[0] / 2
+
+
+def test_logout_moves_pending_to_other_accounts():
+    pool, handles, _ = _pool(3, logout_after={"a0": 5})
+    report = pool.run(_outgoing(60), _deliver)
+    assert "a0" in report.down
+    assert report.moved > 0
+    assert not report.failed
+    got = _received(handles)
+    assert len(got) == 60  # 每个接收人恰好收到一次
+    assert sum(len(wx.sent) for wx in handles.values()) == 60
+
+
+def test_pinned_recipients_fail_when_their_account_is_down():
+    pool, handles, _ = _pool(2, logout_after={"a0": 3})
+    report = pool.run(_outgoing(40, pinned_every=4), _deliver)
+    got = _received(handles)
+    # 固定用 a0 的接收人：要么 a0 在掉线前发了，要么记为失败，绝不转给 a1
+    for i in range(0, 40, 4):
+        name = f"r{i}"
+        assert got.get(name) == "a0" or any(r.friend_name == name for r, _ in report.failed)
+    failed = {r.friend_name for r, _ in report.failed}
+    assert failed and all(int(n[1:]) % 4 == 0 for n in failed)
+    assert len(got) + len(failed) == 40
+
+
+def test_run_pulls_lazily():
+    pool, _, _ = _pool(2)
+    pulled: List[int] = []
+
+    def gen() -> Iterator[Outgoing]:
+        for i, o in enumerate(_outgoing(200)):
+            pulled.append(i)
+            yield o
+
+    sent_at_pull: List[int] = []
+
+    def deliver(wx: Any, out: Outgoing) -> None:
+        sent_at_pull.append(len(pulled))
+        _deliver(wx, out)
+
+    pool.run(gen(), deliver)
+    # 第一条发出时远没有取完上游（预取受 lookahead 限制）
+    assert sent_at_pull[0] <= pool.opt.lookahead
+    assert len(sent_at_pull) == 200
+
+
+def _write_accounts(tmp_path, *nicknames):
+    lines = ["[wechat]", "wechat_path = fake.exe", "", "[recipient:r0]", "city = 广州", ""]
+    for i, nick in enumerate(nicknames):
+        lines += [f"[account:a{i}]", "wechat_path = fake.exe"] + ([f"nickname = {nick}"] if nick else []) + [""]
+    p = tmp_path / "config.ini"
+    p.write_text("\n".join(lines), encoding="utf-8")
+    return str(p)
+
+
+def test_multiple_accounts_need_distinct_nicknames(tmp_path):
+    # 多开时只能按登录昵称找到各账号的窗口
+    with pytest.raises(RuntimeError, match="nickname"):
+        load_job_config(_write_accounts(tmp_path, "小号A", None))
+    with pytest.raises(RuntimeError, match="nickname"):
+        load_job_config(_write_accounts(tmp_path, "小号A", "小号A"))
+    job = load_job_config(_write_accounts(tmp_path, "小号A", "小号B"))
+    assert [a.nickname for a in job.accounts] == ["小号A", "小号B"]
+    # 单账号不要求昵称
+    assert load_job_config(_write_accounts(tmp_path, None)).accounts[0].nickname is None
@@ -0,0 +1,86 @@
+# tests/test_snapshot.py
+"""启动快照：编译后读回、源文件改过即过期、按记录的源文件重建、坏文件回退。"""
+from __future__ import annotations
+
+import os
+
+from utils import jsoncodec
+from utils.snapshot import GEO, Snapshot, build_snapshot, rebuild
+
+GEO_CACHE = {
+    "广州": {"id": "101280101", "name": "广州", "lat": 23.1, "lon": 113.3},
+    "北京": {"id": "101010100", "name": "北京", "lat": 39.9, "lon": 116.4},
+    "Zürich": {"id": "2657896", "name": "Zürich", "lat": 47.4, "lon": 8.5},
+}
+TEMPLATES = {"greetings": ["早上好"], "openings": [], "notices": ["祝顺利"], "tails": ["-天气"]}
+
+
+def _sources(tmp_path):
+    geo, tpl = tmp_path / "geo.json", tmp_path / "templates.json"
+    jsoncodec.write_file(geo, GEO_CACHE)
+    jsoncodec.write_file(tpl, TEMPLATES)
+    return geo, tpl
+
+
+def _touch(path, bump_ns: int = 10**9) -> None:
+    # 显式改 mtime：同一时钟粒度内的两次写入 mtime 可能相同
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump_ns))
+
+
+def test_round_trip(tmp_path):
+    geo, tpl = _sources(tmp_path)
+    snap_path = tmp_path / "startup.snap"
+    stats = build_snapshot(snap_path, geo_file=geo, template_files=[tpl, tmp_path / "missing.json"])
+    assert stats[GEO]["entries"] == 3
+
+    snap = Snapshot.open(snap_path)
+    try:
+        section = snap.geo()
+        for key, value in GEO_CACHE.items():
+            assert section.get(key) == value
+        assert section.get("上海") is None
+        assert dict(section.items()) == GEO_CACHE
+        assert snap.templates(tpl) == TEMPLATES
+        assert snap.templates(tmp_path / "missing.json") is None  # 不存在的模板不进快照
+    finally:
+        snap.close()
+
+
+def test_stale_sections_fall_back_and_rebuild_refreshes(tmp_path):
+    geo, tpl = _sources(tmp_path)
+    snap_path = tmp_path / "startup.snap"
+    build_snapshot(snap_path, geo_file=geo, template_files=[tpl])
+
+    jsoncodec.write_file(geo, dict(GEO_CACHE, 上海={"id": "101020100", "name": "上海"}))
+    _touch(geo)
+    snap = Snapshot.open(snap_path)
+    assert snap.geo() is None  # geo 过期：调用方回退读 JSON
+    assert snap.templates(tpl) == TEMPLATES  # 其他分区不受影响
+    snap.close()
+
+    assert rebuild(snap_path)  # 按快照里记录的源文件重建
+    snap = Snapshot.open(snap_path)
+    assert snap.geo().get("上海") == {"id": "101020100", "name": "上海"}
+    assert snap.templates(tpl) == TEMPLATES
+    snap.close()
+
+
+def test_missing_or_corrupt_snapshot_returns_none(tmp_path):
+    snap_path = tmp_path / "startup.snap"
+    assert Snapshot.open(snap_path) is None
+    assert not rebuild(snap_path)  # 没有快照时不创建
+    snap_path.write_bytes(b"WSSNAP\x00\x01garbage")
+    assert Snapshot.open(snap_path) is None
+    snap_path.write_bytes(b"xx")
+    assert Snapshot.open(snap_path) is None
+
+
+def test_other_python_version_is_ignored(tmp_path):
+    geo, _ = _sources(tmp_path)
+    snap_path = tmp_path / "startup.snap"
+    build_snapshot(snap_path, geo_file=geo)
+    raw = bytearray(snap_path.read_bytes())
+    raw[12:16] = b"\x00\x00\x0d\x0a"  # 文件头里的字节码 magic
+    snap_path.write_bytes(bytes(raw))
+    assert Snapshot.open(snap_path) is None
@@ -0,0 +1,134 @@
+# tests/test_warning_watcher.py
+"""预警监控：假数据源 + 虚拟时钟；状态文件写到临时目录。"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from jobs.warning_watcher import KIND_ESCALATED, KIND_NEW, WarningWatcher, WatchOptions
+from weather.models import Location, WeatherWarning
+
+LOC = Location(id="101280101", name="广州", lat=23.1, lon=113.3)
+
+
+def _warning(wid: str, color: str = "Yellow", related: Optional[str] = None, status: str = "active") -> WeatherWarning:
+    return WeatherWarning(
+        id=wid, location_id=LOC.id, title=f"暴雨{color}预警", type_name="暴雨", severity="",
+        severity_color=color, status=status, text="", related=related,
+    )
+
+
+class _Provider:
+    def __init__(self) -> None:
+        self.warnings: Dict[str, List[WeatherWarning]] = {}
+        self.forecast: List[Dict[str, str]] = [{"textDay": "多云", "textNight": "晴"}]
+        self.calls = 0
+
+    def get_warnings(self, location_id: str) -> List[WeatherWarning]:
+        self.calls += 1
+        return self.warnings.get(location_id, [])
+
+    def get_daily_forecast(self, location_id: str) -> List[Dict[str, str]]:
+        return self.forecast
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.t = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _watcher(tmp_path, locations=(LOC,), **opt_kw):
+    provider, clock = _Provider(), _Clock()
+    events: List[Tuple[str, str]] = []
+
+    def notify(loc: Location, w: WeatherWarning, kind: str) -> None:
+        events.append((w.id, kind))
+
+    opt = WatchOptions(state_file=str(tmp_path / "warning_state.json"), **opt_kw)
+    return WarningWatcher(provider, list(locations), notify, opt, clock=clock), provider, clock, events
+
+
+def _poll_due(w: WarningWatcher, clock: _Clock) -> int:
+    clock.t += w.next_poll_in()
+    return w.poll_once()
+
+
+def _failing_once(notify):
+    state = {"failed": False}
+
+    def wrapped(loc, w, kind):
+        if not state["failed"]:
+            state["failed"] = True
+            raise RuntimeError("微信掉线")
+        notify(loc, w, kind)
+
+    return wrapped
+
+
+def test_notifies_new_and_escalated_only(tmp_path):
+    w, provider, clock, events = _watcher(tmp_path)
+    provider.warnings[LOC.id] = [_warning("w1", "Yellow")]
+    _poll_due(w, clock)
+    _poll_due(w, clock)  # 没变化：不重复通知
+    provider.warnings[LOC.id] = [_warning("w2", "Orange", related="w1")]  # 升级
+    _poll_due(w, clock)
+    provider.warnings[LOC.id] = [_warning("w3", "Orange", related="w2")]  # 只是更新原文
+    _poll_due(w, clock)
+    provider.warnings[LOC.id] = [_warning("w3", "Orange", status="cancel")]
+    _poll_due(w, clock)
+    assert events == [("w1", KIND_NEW), ("w2", KIND_ESCALATED)]
+
+
+def test_interval_follows_state(tmp_path):
+    w, provider, clock, _ = _watcher(tmp_path)
+    _poll_due(w, clock)
+    assert w.next_poll_in() == w.opt.calm_interval_sec
+    provider.warnings[LOC.id] = [_warning("w1")]
+    _poll_due(w, clock)
+    assert w.next_poll_in() == w.opt.active_interval_sec
+
+
+def test_failed_notify_is_retried(tmp_path):
+    w, provider, clock, events = _watcher(tmp_path)
+    w.notify = _failing_once(w.notify)
+    provider.warnings[LOC.id] = [_warning("w1")]
+    assert _poll_due(w, clock) == 0
+    assert _poll_due(w, clock) == 1
+    assert events == [("w1", KIND_NEW)]
+
+
+def test_failed_escalation_is_retried_as_escalation(tmp_path):
+    w, provider, clock, events = _watcher(tmp_path)
+    provider.warnings[LOC.id] = [_warning("w1", "Yellow")]
+    _poll_due(w, clock)
+    w.notify = _failing_once(w.notify)
+    provider.warnings[LOC.id] = [_warning("w2", "Red", related="w1")]
+    _poll_due(w, clock)
+    _poll_due(w, clock)
+    assert events == [("w1", KIND_NEW), ("w2", KIND_ESCALATED)]
+
+
+def test_state_survives_restart(tmp_path):
+    w, provider, clock, events = _watcher(tmp_path)
+    provider.warnings[LOC.id] = [_warning("w1")]
+    _poll_due(w, clock)
+
+    w2, provider2, clock2, events2 = _watcher(tmp_path)
+    provider2.warnings[LOC.id] = [_warning("w1")]
+    _poll_due(w2, clock2)
+    assert events == [("w1", KIND_NEW)] and events2 == []
+
+
+def test_budget_caps_requests(tmp_path):
+    locs = [Location(id=f"L{i}", name=f"城市{i}", lat=0.0, lon=0.0) for i in range(100)]
+    w, provider, clock, _ = _watcher(tmp_path, locations=locs, request_budget_per_hour=60, forecast_refresh_sec=1e9)
+    start = clock.t
+    while clock.t - start < 3 * 3600:
+        clock.t += max(1.0, w.next_poll_in())
+        w.poll_once()
+    # 100 个地点每 30 分钟一次需要 200 次/小时，预算只有 60：按预算拉长间隔
+    hours = (clock.t - start) / 3600
+    assert provider.calls <= 60 * hours + w.bucket.capacity + 1
+    assert provider.calls >= 0.8 * 60 * hours
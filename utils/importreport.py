@@ -0,0 +1,58 @@
+# utils/importreport.py
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+# 进程内尽早导入本模块，作为启动计时起点
+_T0 = time.perf_counter()
+
+# 发送链路才需要的重依赖（Windows UI 自动化栈）
+GUI_MODULES = (
+    "wxauto",
+    "uiautomation",
+    "pywinauto",
+    "pyautogui",
+    "psutil",
+    "win32api",
+    "win32clipboard",
+    "comtypes",
+)
+
+_lazy: List[Tuple[str, float]] = []
+
+
+@contextmanager
+def timed_import(label: str) -> Iterator[None]:
+    """包住延迟导入语句，记录其耗时（供 --import-report 输出）。"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _lazy.append((label, time.perf_counter() - t0))
+
+
+def gui_stack_loaded() -> List[str]:
+    return [m for m in GUI_MODULES if m in sys.modules]
+
+
+def report() -> Dict[str, Any]:
+    return {
+        "since_start_ms": round((time.perf_counter() - _T0) * 1000, 1),
+        "modules_loaded": len(sys.modules),
+        "gui_modules_loaded": gui_stack_loaded(),
+        "lazy_imports_ms": {k: round(v * 1000, 1) for k, v in _lazy},
+    }
+
+
+def print_report() -> None:
+    r = report()
+    print(
+        f"[IMPORT] 启动至今 {r['since_start_ms']}ms，已加载模块 {r['modules_loaded']} 个，"
+        f"GUI 依赖：{', '.join(r['gui_modules_loaded']) or '未加载'}"
+    )
+    for k, v in r["lazy_imports_ms"].items():
+        print(f"[IMPORT] 延迟导入 {k}: {v}ms")
+    print("[IMPORT] 逐模块明细可用：python -X importtime main.py <命令> 2> importtime.log")
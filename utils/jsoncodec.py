@@ -0,0 +1,59 @@
+# utils/jsoncodec.py
+"""
+JSON 编解码：装了 orjson 就用 orjson（解析 bytes 不必先解码成 str，快数倍），否则用标准库。
+
+- loads(bytes | str)
+- dumps(obj) -> bytes，紧凑格式（无缩进、无多余空格、中文不转义）
+- read_file / write_file：缓存文件读写，写入先写临时文件再替换，避免写一半被读到
+
+环境变量 WEATHER_SENDER_JSON=stdlib 可强制用标准库（对比/排障）。
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+BACKEND = "stdlib"
+_orjson: Any = None
+if os.environ.get("WEATHER_SENDER_JSON", "").strip().lower() != "stdlib":
+    try:
+        import orjson as _orjson  # type: ignore
+
+        BACKEND = "orjson"
+    except ImportError:
+        _orjson = None
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def dumps(obj: Any, *, pretty: bool = False, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(obj, default=default, option=_orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, default=default)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=default)
+    return text.encode("utf-8")
+
+
+def read_file(path: Union[str, Path]) -> Any:
+    return loads(Path(path).read_bytes())
+
+
+def write_file(path: Union[str, Path], obj: Any, *, pretty: bool = False) -> int:
+    """原子写入，返回字节数"""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    data = dumps(obj, pretty=pretty)
+    tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, p)
+    return len(data)
@@ -0,0 +1,201 @@
+# utils/metrics.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import jsoncodec
+from .runtime import app_dir
+
+# 直方图桶（秒）：覆盖从本地计算到 UI 等待登录
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+_LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _NoopSpan:
+    """关闭时返回的共享空对象：不计时、不分配。"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def label(self, **labels: Any) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """
+    labels：低基数维度（进直方图与 JSON）
+    attrs：任意附加信息（只进 JSON，例如 bytes、路径）
+    """
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, Any]) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels: Dict[str, str] = {k: str(v) for k, v in labels.items()}
+        self.attrs: Dict[str, Any] = {}
+        self.start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.labels.setdefault("outcome", "error")
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"[:300]
+        self.metrics.record(self.name, duration, self.labels, self.attrs)
+
+    def label(self, **labels: Any) -> None:
+        self.labels.update({k: str(v) for k, v in labels.items()})
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n: int) -> None:
+        self.counts = [0] * n
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    def __init__(
+        self,
+        enabled: bool = False,
+        out_dir: Optional[Path] = None,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+        flush_every: int = 5000,
+    ) -> None:
+        self.enabled = enabled
+        self.out_dir = out_dir or (app_dir() / "metrics")
+        self.buckets = buckets
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._hist: Dict[_LabelKey, _Histogram] = {}
+        self._counters: Dict[_LabelKey, float] = {}
+
+    # ---------- collect ----------
+    def span(self, name: str, **labels: Any):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, labels)
+
+    def record(self, name: str, duration_sec: float, labels: Dict[str, str], attrs: Dict[str, Any]) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        line = {"ts": round(time.time(), 3), "span": name, "sec": round(duration_sec, 6), **labels}
+        if attrs:
+            line["attrs"] = attrs
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = _Histogram(len(self.buckets))
+            for i, b in enumerate(self.buckets):
+                if duration_sec <= b:
+                    h.counts[i] += 1
+            h.sum += duration_sec
+            h.count += 1
+            self._pending.append(line)
+            need_flush = len(self._pending) >= self.flush_every
+        if need_flush:
+            self.flush()
+
+    def add(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """计数器（如 HTTP 响应字节数）"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    # ---------- export ----------
+    def prometheus_text(self) -> str:
+        def fmt_labels(items: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            parts = [f'{k}="{_escape(v)}"' for k, v in items + extra]
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines: List[str] = [
+            "# HELP weather_sender_span_seconds Duration of instrumented stages.",
+            "# TYPE weather_sender_span_seconds histogram",
+        ]
+        with self._lock:
+            for (name, labels), h in sorted(self._hist.items()):
+                items = (("span", name),) + labels
+                for b, c in zip(self.buckets, h.counts):
+                    lines.append(f"weather_sender_span_seconds_bucket{fmt_labels(items, (('le', repr(b)),))} {c}")
+                lines.append(f"weather_sender_span_seconds_bucket{fmt_labels(items, (('le', '+Inf'),))} {h.count}")
+                lines.append(f"weather_sender_span_seconds_sum{fmt_labels(items)} {h.sum:.6f}")
+                lines.append(f"weather_sender_span_seconds_count{fmt_labels(items)} {h.count}")
+
+            seen = set()
+            for (name, labels), v in sorted(self._counters.items()):
+                metric = f"weather_sender_{name}_total"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} counter")
+                    seen.add(metric)
+                lines.append(f"{metric}{fmt_labels(labels)} {v:g}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """追加 spans.jsonl，并整体重写 metrics.prom（便于 node_exporter textfile 采集）。"""
+        if not self.enabled:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, []
+        try:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            if pending:
+                with (self.out_dir / "spans.jsonl").open("ab") as f:
+                    f.write(b"".join(jsoncodec.dumps(it, default=str) + b"\n" for it in pending))
+            tmp = self.out_dir / "metrics.prom.tmp"
+            tmp.write_text(self.prometheus_text(), encoding="utf-8")
+            os.replace(tmp, self.out_dir / "metrics.prom")
+        except Exception as e:
+            # 指标写失败不影响主流程
+            print(f"[WARN] 写入指标失败：{e}")
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_metrics = Metrics(enabled=os.environ.get("WEATHER_SENDER_METRICS", "").strip() in ("1", "true", "yes"))
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def configure_metrics(enabled: bool, out_dir: Optional[str] = None) -> Metrics:
+    global _metrics
+    _metrics = Metrics(enabled=enabled, out_dir=Path(out_dir) if out_dir else None)
+    return _metrics
+
+
+def span(name: str, **labels: Any):
+    """
+    用法：
+        with span("geo.lookup") as s:
+            s.label(cache="hit")
+    关闭时返回共享空对象，开销仅一次属性判断。
+    """
+    return _metrics.span(name, **labels)
@@ -0,0 +1,315 @@
+# utils/profiling.py
+"""
+按需性能剖析（默认关闭）：早上批量发送变慢、常驻进程内存上涨时留证据
+
+- CPU：后台线程按 interval_sec 采样所有线程的调用栈（sys._current_frames，墙钟时间，含等待），
+  输出 folded stacks（cpu.folded，可直接喂 speedscope / flamegraph.pl）与热点函数
+- 内存：tracemalloc 在每个阶段（main 的 _timed / 常驻批次）前后各取一次快照，输出增长最多的分配位置；
+  快照是进程级的，后台流水线（取天气/生成文案）的分配会计入同时进行的阶段
+- 开销有上限：采样耗时超过 max_overhead 时自动把采样间隔翻倍；不同栈数量超过 max_stacks 后归入 [other]；
+  常驻进程按 every_sec 只剖析 window_sec 一段，tracemalloc 只在窗口内开启
+- 产物：app_dir()/profiles/<时间>-<标签>/{cpu.folded,summary.json}，只保留最近 keep 份
+
+用法：
+    session = ProfileSession(ProfileOptions(), label="send").start()
+    with profile_stage("send"):
+        ...
+    session.stop()      # 写出产物，返回目录
+"""
+from __future__ import annotations
+
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+from . import jsoncodec
+from .runtime import app_dir
+
+_THREAD_PREFIX = "profiler"
+_OTHER = "[other]"
+
+
+@dataclass(frozen=True)
+class ProfileOptions:
+    interval_sec: float = 0.01      # 采样间隔（自适应时只增不减）
+    max_overhead: float = 0.02      # 采样线程耗时 / 墙钟时间 上限
+    max_depth: int = 64             # 每个栈最多保留的帧数（从栈顶算）
+    max_stacks: int = 5000          # 不同栈的数量上限
+    memory: bool = True             # 是否开启 tracemalloc
+    memory_frames: int = 1          # tracemalloc 每次分配记录的帧数（按行号汇总只需 1 帧；越多开销越大）
+    top_n: int = 15
+    out_dir: Optional[Path] = None  # 默认 app_dir()/profiles
+    keep: int = 20                  # 最多保留多少份产物
+
+    def __post_init__(self) -> None:
+        # 间隔为 0 时采样线程会空转占满一个核
+        if not self.interval_sec > 0:
+            raise ValueError(f"采样间隔必须大于 0，实际为 {self.interval_sec}")
+
+
+def _where(code: Any) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _short_path(filename: str) -> str:
+    p = Path(filename)
+    try:
+        return p.resolve().relative_to(app_dir()).as_posix()
+    except (ValueError, OSError):
+        # 标准库 / 第三方：保留最后两级
+        return "/".join(p.parts[-2:])
+
+
+class StackSampler:
+    """后台线程定时抓取所有线程的调用栈，按 folded 格式计数"""
+
+    def __init__(self, opt: ProfileOptions) -> None:
+        self.opt = opt
+        self.interval_sec = opt.interval_sec
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.busy_sec = 0.0
+        self.wall_sec = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._codes: Dict[Any, str] = {}
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._loop, name=f"{_THREAD_PREFIX}-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        t_start = time.perf_counter()
+        while not self._stop.wait(self.interval_sec):
+            t0 = time.perf_counter()
+            self.sample()
+            self.busy_sec += time.perf_counter() - t0
+            self.wall_sec = time.perf_counter() - t_start
+            if self.samples % 10 == 0 and self.busy_sec > self.opt.max_overhead * self.wall_sec:
+                self.interval_sec = min(1.0, self.interval_sec * 2)
+        self.wall_sec = time.perf_counter() - t_start
+
+    def sample(self) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            tname = names.get(ident, str(ident))
+            if tname.startswith(_THREAD_PREFIX):
+                continue
+            parts: List[str] = []
+            f = frame
+            while f is not None and len(parts) < self.opt.max_depth:
+                code = f.f_code
+                label = self._codes.get(code)
+                if label is None:
+                    label = self._codes[code] = _where(code)
+                parts.append(label)
+                f = f.f_back
+            parts.append(f"thread:{tname}")
+            key = ";".join(reversed(parts))
+            if key not in self.stacks and len(self.stacks) >= self.opt.max_stacks:
+                key = f"thread:{tname};{_OTHER}"
+            self.stacks[key] += 1
+        self.samples += 1
+
+    def folded(self) -> str:
+        return "".join(f"{k} {v}\n" for k, v in self.stacks.most_common())
+
+    def top(self, n: int) -> Dict[str, List[Dict[str, Any]]]:
+        """self：栈顶（正在执行）；total：出现在栈上（含调用的函数）"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for key, c in self.stacks.items():
+            frames = key.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += c
+            for fr in set(frames):
+                total[fr] += c
+        n_all = sum(self.stacks.values()) or 1
+
+        def rows(cnt: Counter) -> List[Dict[str, Any]]:
+            return [{"where": k, "samples": v, "pct": round(100.0 * v / n_all, 1)} for k, v in cnt.most_common(n)]
+
+        return {"self": rows(own), "total": rows(total)}
+
+
+class ProfileSession:
+    """一次剖析：CPU 采样 + 各阶段的分配差异；stop() 写出产物"""
+
+    def __init__(self, opt: Optional[ProfileOptions] = None, label: str = "run") -> None:
+        self.opt = opt or ProfileOptions()
+        self.label = label
+        self.sampler = StackSampler(self.opt)
+        self.stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._own_tracemalloc = False
+        self._started_at = ""
+
+    def start(self) -> "ProfileSession":
+        self._started_at = datetime.now().isoformat(timespec="seconds")
+        if self.opt.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.opt.memory_frames)
+            self._own_tracemalloc = True
+        _activate(self)
+        self.sampler.start()
+        return self
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            row: Dict[str, Any] = {"stage": name, "sec": round(time.perf_counter() - t0, 4)}
+            if before is not None and tracemalloc.is_tracing():
+                after = tracemalloc.take_snapshot()
+                row["traced_kb"] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+                row["top_alloc"] = _top_diff(after.compare_to(before, "lineno"), self.opt.top_n)
+            with self._lock:
+                self.stages.append(row)
+
+    def stop(self) -> Optional[Path]:
+        """停止采样并写出产物；返回产物目录（写失败时 None）"""
+        _deactivate(self)
+        self.sampler.stop()
+        memory: Dict[str, Any] = {}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            memory = {
+                "traced_kb": round(current / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+                "tracemalloc_overhead_kb": round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+            }
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+        s = self.sampler
+        summary = {
+            "label": self.label,
+            "started_at": self._started_at,
+            "wall_sec": round(s.wall_sec, 3),
+            "cpu": {
+                "samples": s.samples,
+                "interval_ms": round(self.opt.interval_sec * 1000, 2),
+                "final_interval_ms": round(s.interval_sec * 1000, 2),
+                "overhead_pct": round(100.0 * s.busy_sec / s.wall_sec, 2) if s.wall_sec else 0.0,
+                "distinct_stacks": len(s.stacks),
+                "top": s.top(self.opt.top_n),
+            },
+            "memory": memory,
+            "stages": self.stages,
+        }
+        root = self.opt.out_dir or (app_dir() / "profiles")
+        stem = f"{datetime.now():%Y%m%d-%H%M%S}-{self.label}"
+        out = root / stem
+        try:
+            i = 1
+            while out.exists():
+                i += 1
+                out = root / f"{stem}-{i}"
+            out.mkdir(parents=True)
+            (out / "cpu.folded").write_text(s.folded(), encoding="utf-8")
+            (out / "summary.json").write_bytes(jsoncodec.dumps(summary, default=str))
+            _prune(root, self.opt.keep)
+        except Exception as e:
+            # 剖析失败不影响主流程
+            print(f"[WARN] 写入剖析结果失败：{e}")
+            return None
+        print(
+            f"[INFO] 剖析结果：{out}（采样 {s.samples} 次，开销 {summary['cpu']['overhead_pct']}%"
+            + (f"，内存峰值 {memory['peak_kb']:.0f}KB" if memory else "")
+            + "）"
+        )
+        return out
+
+
+def _top_diff(diffs: List[tracemalloc.StatisticDiff], n: int) -> List[Dict[str, Any]]:
+    # 在汇总后的行上剔除剖析自身（filter_traces 要逐条 fnmatch，分配多时比取快照还慢）
+    skip = (tracemalloc.__file__, __file__)
+    rows: List[Dict[str, Any]] = []
+    for d in diffs:
+        fr = d.traceback[0]
+        if fr.filename in skip:
+            continue
+        rows.append({"where": f"{_short_path(fr.filename)}:{fr.lineno}", "size_diff_kb": round(d.size_diff / 1024, 1), "count_diff": d.count_diff})
+        if len(rows) >= n:
+            break
+    return rows
+
+
+def _prune(root: Path, keep: int) -> None:
+    dirs = sorted((p for p in root.iterdir() if p.is_dir()), key=lambda p: p.name)
+    for p in dirs[: max(0, len(dirs) - keep)]:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+class ScheduledProfiler:
+    """常驻进程：每 every_sec 剖析一段 window_sec（第一段在启动 every_sec 后开始，之后每段开始相隔 every_sec）"""
+
+    def __init__(self, every_sec: float, window_sec: float, opt: Optional[ProfileOptions] = None, label: str = "scheduled") -> None:
+        if window_sec <= 0 or every_sec < window_sec:
+            raise ValueError("profile every 必须不小于 window，且 window > 0")
+        self.every_sec = every_sec
+        self.window_sec = window_sec
+        self.opt = opt or ProfileOptions()
+        self.label = label
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ScheduledProfiler":
+        self._thread = threading.Thread(target=self._loop, name=f"{_THREAD_PREFIX}-schedule", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        delay = self.every_sec
+        while not self._stop.wait(delay):
+            session = ProfileSession(self.opt, self.label).start()
+            # 提前停止时也把这一段写出来
+            self._stop.wait(self.window_sec)
+            session.stop()
+            delay = self.every_sec - self.window_sec
+
+
+# ---------- 进程内当前会话（供阶段钩子使用） ----------
+_active: Optional[ProfileSession] = None
+_NULL = nullcontext()
+
+
+def _activate(session: ProfileSession) -> None:
+    global _active
+    _active = session
+
+
+def _deactivate(session: ProfileSession) -> None:
+    global _active
+    if _active is session:
+        _active = None
+
+
+def profile_stage(name: str) -> ContextManager[None]:
+    """没有进行中的剖析时返回共享空上下文，开销仅一次判断"""
+    session = _active
+    if session is None:
+        return _NULL
+    return session.stage(name)
@@ -0,0 +1,31 @@
+# utils/ratelimit.py
+from __future__ import annotations
+
+from typing import Callable
+
+
+class TokenBucket:
+    """按小时预算的令牌桶（预警监控、变化监控共用）：per_hour 次/小时，最多攒 5 分钟的额度"""
+
+    def __init__(self, per_hour: int, clock: Callable[[], float]) -> None:
+        self.rate = max(1, per_hour) / 3600.0
+        self.capacity = max(1.0, per_hour / 12.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.at = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.at) * self.rate)
+        self.at = now
+
+    def take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_sec(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import sys
 from pathlib import Path
+from typing import Union
 
 
 def app_dir() -> Path:
@@ -16,3 +17,12 @@ def app_dir() -> Path:
         return Path(sys.executable).resolve().parent
     # 开发态：以 main.py 所在目录为准更稳
     return Path(__file__).resolve().parents[1]
+
+
+def app_path(path: Union[str, Path]) -> Path:
+    """
+    相对路径按 app_dir() 解析，绝对路径原样返回：
+    缓存/状态文件（.cache/...）不随启动目录变化，计划任务、双击 exe、命令行各处启动都读写同一份
+    """
+    p = Path(path)
+    return p if p.is_absolute() else app_dir() / p
@@ -0,0 +1,264 @@
+# utils/snapshot.py
+"""
+启动快照：把冷启动要读的缓存/模板预编译成一个二进制文件，启动时 mmap，用到哪条读哪条。
+
+- geo：城市 -> Location 的缓存按 key 排序建索引，查询时在 mmap 上二分查找，只解码命中的那一条；
+  启动开销与缓存条数无关（原来要整体解析 JSON）
+- templates:<路径>：templates.json 的内容
+- 每个分区记录源文件的 mtime/大小，源文件改过即视为过期，回退读源文件（不会读到旧数据）
+- 值用 marshal 编码（比 JSON 解码快），文件头记录 Python 字节码版本，换解释器自动失效
+
+不放密钥：环境变量/secrets.json 读起来本来就快，不另存一份明文。
+
+文件结构（小端）：
+    b"WSSNAP\\0\\1" | u32 版本 | 4s Python magic | u32 头长度 | 头（JSON：各分区 name/source/mtime_ns/size/off/len，off 相对数据区）| 分区数据...
+geo 分区：u32 条数 | 条数 × (u32 key_off, u32 key_len, u32 val_off, u32 val_len) | key 与 value 区
+"""
+from __future__ import annotations
+
+import importlib.util
+import marshal
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from utils import jsoncodec
+from utils.runtime import app_path
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT = ".cache/startup.snap"
+
+_MAGIC = b"WSSNAP\x00\x01"
+_HEAD = struct.Struct("<8sI4sI")
+_U32 = struct.Struct("<I")
+_ENTRY = struct.Struct("<IIII")
+
+GEO = "geo"
+TEMPLATES_PREFIX = "templates:"
+
+
+def _source_stamp(path: Union[str, Path]) -> Tuple[int, int]:
+    """(mtime_ns, size)；文件不存在为 (-1, -1)"""
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return -1, -1
+
+
+def _source_id(path: Union[str, Path]) -> str:
+    return str(Path(path).resolve())
+
+
+class GeoSection:
+    """mmap 上的有序 key 索引；get() 二分查找"""
+
+    def __init__(self, mm: mmap.mmap, off: int, length: int) -> None:
+        self._mm = mm
+        self._base = off
+        (self.count,) = _U32.unpack_from(mm, off)
+        self._index = off + _U32.size
+
+    def _entry(self, i: int) -> Tuple[int, int, int, int]:
+        return _ENTRY.unpack_from(self._mm, self._index + i * _ENTRY.size)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        k = key.encode("utf-8")
+        lo, hi = 0, self.count
+        mm, base = self._mm, self._base
+        while lo < hi:
+            mid = (lo + hi) // 2
+            ko, kl, vo, vl = self._entry(mid)
+            cur = mm[base + ko:base + ko + kl]
+            if cur < k:
+                lo = mid + 1
+            elif cur > k:
+                hi = mid
+            else:
+                return marshal.loads(mm[base + vo:base + vo + vl])
+        return None
+
+    def items(self) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        mm, base = self._mm, self._base
+        for i in range(self.count):
+            ko, kl, vo, vl = self._entry(i)
+            yield mm[base + ko:base + ko + kl].decode("utf-8"), marshal.loads(mm[base + vo:base + vo + vl])
+
+
+def _pack_geo(cache: Dict[str, Dict[str, Any]]) -> bytes:
+    keys = sorted((k.encode("utf-8"), v) for k, v in cache.items())
+    n = len(keys)
+    data_off = _U32.size + n * _ENTRY.size
+    index = bytearray()
+    data = bytearray()
+    for k, v in keys:
+        val = marshal.dumps(v)
+        ko = data_off + len(data)
+        data += k
+        vo = data_off + len(data)
+        data += val
+        index += _ENTRY.pack(ko, len(k), vo, len(val))
+    return _U32.pack(n) + bytes(index) + bytes(data)
+
+
+class Snapshot:
+    def __init__(self, path: Path, mm: mmap.mmap, sections: Dict[str, Dict[str, Any]]) -> None:
+        self.path = path
+        self._mm = mm
+        self._sections = sections
+        self._fresh: Dict[str, bool] = {}
+        self._geo: Optional[GeoSection] = None
+
+    @staticmethod
+    def open(path: Union[str, Path]) -> Optional["Snapshot"]:
+        """读文件头；文件不存在/版本不符/损坏时返回 None（调用方回退到源文件）"""
+        p = app_path(path)
+        try:
+            with p.open("rb") as f:
+                if os.fstat(f.fileno()).st_size < _HEAD.size:
+                    return None
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, pymagic, head_len = _HEAD.unpack_from(mm, 0)
+            if magic != _MAGIC or version != SNAPSHOT_VERSION or pymagic != importlib.util.MAGIC_NUMBER:
+                mm.close()
+                return None
+            header = jsoncodec.loads(mm[_HEAD.size:_HEAD.size + head_len])
+            data = _HEAD.size + head_len
+            return Snapshot(p, mm, {s["name"]: dict(s, off=s["off"] + data) for s in header["sections"]})
+        except Exception:
+            return None
+
+    def names(self) -> List[str]:
+        return list(self._sections)
+
+    def sources(self) -> Dict[str, str]:
+        return {name: s["source"] for name, s in self._sections.items()}
+
+    def is_fresh(self, name: str) -> bool:
+        """源文件 mtime/大小与建快照时一致（每个分区只 stat 一次）"""
+        fresh = self._fresh.get(name)
+        if fresh is None:
+            s = self._sections.get(name)
+            fresh = s is not None and _source_stamp(s["source"]) == (s["mtime_ns"], s["size"])
+            self._fresh[name] = fresh
+        return fresh
+
+    def geo(self) -> Optional[GeoSection]:
+        if self._geo is None and self.is_fresh(GEO):
+            s = self._sections[GEO]
+            self._geo = GeoSection(self._mm, s["off"], s["len"])
+        return self._geo
+
+    def templates(self, path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        name = TEMPLATES_PREFIX + _source_id(path)
+        if not self.is_fresh(name):
+            return None
+        s = self._sections[name]
+        return marshal.loads(self._mm[s["off"]:s["off"] + s["len"]])
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+
+
+def build_snapshot(
+    path: Union[str, Path],
+    geo_file: Optional[Union[str, Path]] = None,
+    template_files: Iterable[Union[str, Path]] = (),
+) -> Dict[str, Any]:
+    """从源文件编译快照（原子替换）；返回各分区条数/字节数"""
+    blobs: List[Tuple[Dict[str, Any], bytes]] = []
+    stats: Dict[str, Any] = {}
+
+    if geo_file is not None:
+        geo_file = app_path(geo_file)
+        # 先取 stamp 再读：读的过程中源文件被改，下次启动会判为过期而不是读到不一致的数据
+        stamp = _source_stamp(geo_file)
+        cache: Dict[str, Dict[str, Any]] = {}
+        if stamp[0] >= 0:
+            try:
+                cache = jsoncodec.read_file(geo_file)
+            except Exception:
+                cache = {}
+        blob = _pack_geo({k: v for k, v in cache.items() if isinstance(v, dict)})
+        blobs.append(({"name": GEO, "source": _source_id(geo_file), "mtime_ns": stamp[0], "size": stamp[1]}, blob))
+        stats[GEO] = {"entries": len(cache), "bytes": len(blob)}
+
+    for tp in dict.fromkeys(_source_id(t) for t in template_files):
+        stamp = _source_stamp(tp)
+        if stamp[0] < 0:
+            # 不存在的模板文件不进快照：启动时照常走“未找到模板，用默认模板”
+            continue
+        try:
+            data = jsoncodec.read_file(tp)
+        except Exception:
+            continue
+        blob = marshal.dumps(data)
+        name = TEMPLATES_PREFIX + tp
+        blobs.append(({"name": name, "source": tp, "mtime_ns": stamp[0], "size": stamp[1]}, blob))
+        stats[name] = {"bytes": len(blob)}
+
+    # off 相对数据区起点（紧跟在头后面），头长度不影响偏移
+    sections = []
+    off = 0
+    for meta, blob in blobs:
+        sections.append(dict(meta, off=off, len=len(blob)))
+        off += len(blob)
+    head = jsoncodec.dumps({"sections": sections})
+
+    p = app_path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    _close_default(p)
+    tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(_HEAD.pack(_MAGIC, SNAPSHOT_VERSION, importlib.util.MAGIC_NUMBER, len(head)))
+        f.write(head)
+        for _, blob in blobs:
+            f.write(blob)
+    os.replace(tmp, p)
+    stats["bytes"] = p.stat().st_size
+    return stats
+
+
+def rebuild(path: Union[str, Path], geo_file: Optional[Union[str, Path]] = None) -> bool:
+    """按已有快照记录的源文件重建（geo 缓存写盘后调用）；快照不存在时不创建"""
+    snap = Snapshot.open(path)
+    if snap is None:
+        return False
+    sources = snap.sources()
+    snap.close()
+    templates = [src for name, src in sources.items() if name.startswith(TEMPLATES_PREFIX)]
+    try:
+        build_snapshot(path, geo_file=geo_file or sources.get(GEO), template_files=templates)
+        return True
+    except OSError as e:
+        # Windows 上别的进程正映射着旧文件时替换会失败；旧快照已按 mtime 判为过期，不影响正确性
+        print(f"[WARN] 更新启动快照失败：{e}")
+        return False
+
+
+# ---------- 进程内共享（按路径，各打开一次） ----------
+_lock = threading.Lock()
+_opened: Dict[str, Optional[Snapshot]] = {}
+
+
+def get_snapshot(path: Union[str, Path] = DEFAULT_SNAPSHOT) -> Optional[Snapshot]:
+    key = str(app_path(path).resolve())
+    with _lock:
+        if key not in _opened:
+            _opened[key] = Snapshot.open(key)
+        return _opened[key]
+
+
+def _close_default(path: Path) -> None:
+    # 重建前关掉本进程的映射（Windows 下映射中的文件不能被替换）
+    key = str(path.resolve())
+    with _lock:
+        snap = _opened.pop(key, None)
+    if snap is not None:
+        snap.close()
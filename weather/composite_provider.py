@@ -0,0 +1,285 @@
+# weather/composite_provider.py
+"""
+多数据源组合：竞速 / 故障转移 + 健康度
+
+- failover：按健康度排序逐个尝试，单个源超过 deadline_sec 或出错就换下一个
+- race：同时（或 hedge_after_sec 之后）向排名前两位的源请求，先成功的返回；都失败再按 failover 试剩下的
+- 健康度：每个源记录成功率与耗时的指数滑动平均；连续失败 max_failures 次熔断 cooldown_sec，
+  期间不再主动请求（所有源都熔断时仍会尝试，总比没消息好）；冷却结束后先放一个请求试探
+- 超时的请求在后台线程里继续跑完，结果丢弃，但耗时/成败照样计入健康度
+- 结果统一经 normalize_dto：地点信息以请求的 Location 为准，数值口径一致
+- 城市检索、预警等只有部分源支持的操作，跳过抛 ProviderUnsupported 的源（不计入健康度）
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from .models import Location, WeatherDTO, WeatherWarning
+from .provider import ProviderUnsupported, WeatherProvider, normalize_dto
+from utils.metrics import get_metrics
+
+T = TypeVar("T")
+
+MODE_FAILOVER = "failover"
+MODE_RACE = "race"
+MODES = (MODE_FAILOVER, MODE_RACE)
+
+
+class ProvidersFailed(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class CompositeOptions:
+    mode: str = MODE_FAILOVER
+    deadline_sec: float = 4.0       # 单个源超过这个时间视为失败（failover 换下一个；race 放弃等待）
+    hedge_after_sec: float = 0.0    # race：第二个源晚多久再发（0 = 同时发）
+    max_failures: int = 3           # 连续失败多少次熔断
+    max_inflight: int = 4           # 单个源未返回的请求超过这个数视为繁忙（慢源不再占满线程池）
+    cooldown_sec: float = 60.0
+    alpha: float = 0.2              # 滑动平均权重
+
+
+@dataclass
+class ProviderHealth:
+    name: str
+    ok_rate: float = 1.0                  # 成功率滑动平均
+    latency_sec: Optional[float] = None   # 成功请求耗时滑动平均
+    consecutive_failures: int = 0
+    open_until: float = 0.0               # 熔断到期时间
+    calls: int = 0
+    failures: int = 0
+    wins: int = 0                         # 竞速中胜出次数
+    inflight: int = 0
+    last_error: str = ""
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+    def score(self) -> float:
+        """越大越好：成功率 / 耗时；还没有耗时数据时按 1s 计"""
+        return self.ok_rate / max(0.01, self.latency_sec if self.latency_sec is not None else 1.0)
+
+
+@dataclass
+class _Outcome:
+    provider: WeatherProvider
+    value: Any = None
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+
+
+class CompositeProvider:
+    """
+    CompositeProvider([QWeatherProvider(), OpenMeteoProvider()], CompositeOptions(mode="race"))
+    第一个源是主源：城市检索（及 geo 缓存）通常只有它支持。
+    """
+
+    name: ClassVar[str] = "composite"
+
+    def __init__(
+        self,
+        providers: Sequence[WeatherProvider],
+        opt: Optional[CompositeOptions] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not providers:
+            raise ValueError("至少需要一个天气数据源")
+        self.providers = list(providers)
+        self.opt = opt or CompositeOptions()
+        if self.opt.mode not in MODES:
+            raise ValueError(f"未知的组合模式：{self.opt.mode}（可选 {', '.join(MODES)}）")
+        self.clock = clock
+        self.health: Dict[str, ProviderHealth] = {p.name: ProviderHealth(p.name) for p in self.providers}
+        self._lock = threading.Lock()
+        # 超时的请求仍占着线程，留足余量
+        self._pool = ThreadPoolExecutor(max_workers=8 * len(self.providers), thread_name_prefix="provider")
+
+    # ---------- WeatherProvider ----------
+    def lookup_location(self, city: str) -> Location:
+        return self._failover("geo", lambda p: p.lookup_location(city), self._ranked(keep_order=True))
+
+    def get_today_weather(self, city: str) -> WeatherDTO:
+        return self.get_weather_for_location(self.lookup_location(city), query_city=city)
+
+    def get_weather_for_location(self, loc: Location, query_city: str, day_offset: int = 0) -> WeatherDTO:
+        return self._weather(
+            "weather", lambda p: normalize_dto(p.get_weather_for_location(loc, query_city, day_offset=day_offset), loc, query_city)
+        )
+
+    def get_forecast_for_location(self, loc: Location, query_city: str) -> WeatherDTO:
+        return self._weather("forecast", lambda p: normalize_dto(p.get_forecast_for_location(loc, query_city), loc, query_city))
+
+    def get_warnings(self, location_id: str) -> List[WeatherWarning]:
+        return self._failover("warning", lambda p: p.get_warnings(location_id), self._ranked(keep_order=True))
+
+    def get_daily_forecast(self, location_id: str) -> List[Dict[str, Any]]:
+        return self._failover("daily", lambda p: p.get_daily_forecast(location_id), self._ranked(keep_order=True))
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+    def _weather(self, op: str, fetch: Callable[[WeatherProvider], WeatherDTO]) -> WeatherDTO:
+        if self.opt.mode == MODE_RACE:
+            return self._race(op, fetch)
+        return self._failover(op, fetch, self._ranked())
+
+    # ---------- health ----------
+    def _unavailable(self, p: WeatherProvider, now: float) -> bool:
+        h = self.health[p.name]
+        return h.is_open(now) or h.inflight >= self.opt.max_inflight
+
+    def _ranked(self, keep_order: bool = False) -> List[WeatherProvider]:
+        """
+        可用（未熔断、不繁忙）的在前。weather：按健康分排序（同分保持配置顺序）；
+        geo / 预警等：保持配置顺序，主源优先（地点 id 体系以主源为准）。
+        """
+        now = self.clock()
+        idx = {id(p): i for i, p in enumerate(self.providers)}
+        with self._lock:
+            if keep_order:
+                key = lambda p: (self._unavailable(p, now), idx[id(p)])  # noqa: E731
+            else:
+                key = lambda p: (self._unavailable(p, now), -round(self.health[p.name].score(), 3), idx[id(p)])  # noqa: E731
+            return sorted(self.providers, key=key)
+
+    def _record(self, o: _Outcome, op: str) -> None:
+        with self._lock:
+            self.health[o.provider.name].inflight -= 1
+        if isinstance(o.error, ProviderUnsupported):
+            return
+        a = self.opt.alpha
+        ok = o.error is None and o.elapsed <= self.opt.deadline_sec
+        with self._lock:
+            h = self.health[o.provider.name]
+            h.calls += 1
+            h.ok_rate = (1 - a) * h.ok_rate + a * (1.0 if ok else 0.0)
+            if ok:
+                h.latency_sec = o.elapsed if h.latency_sec is None else (1 - a) * h.latency_sec + a * o.elapsed
+                h.consecutive_failures = 0
+                h.open_until = 0.0
+            else:
+                h.failures += 1
+                h.consecutive_failures += 1
+                h.last_error = f"{type(o.error).__name__}: {o.error}" if o.error else f"超过 {self.opt.deadline_sec:g}s"
+                if h.consecutive_failures >= self.opt.max_failures:
+                    if not h.is_open(self.clock()):
+                        print(f"[WARN] 天气源 {h.name} 连续失败 {h.consecutive_failures} 次，暂停 {self.opt.cooldown_sec:g}s：{h.last_error}")
+                    h.open_until = self.clock() + self.opt.cooldown_sec
+        get_metrics().add("provider_calls", 1, provider=o.provider.name, op=op, outcome="ok" if ok else "error")
+
+    # ---------- execution ----------
+    def _submit(self, p: WeatherProvider, fn: Callable[[WeatherProvider], T], op: str) -> "Future[_Outcome]":
+        def run() -> _Outcome:
+            t0 = time.perf_counter()
+            try:
+                o = _Outcome(p, value=fn(p))
+            except Exception as e:  # 结果交给调用方判断
+                o = _Outcome(p, error=e)
+            o.elapsed = time.perf_counter() - t0
+            self._record(o, op)
+            return o
+
+        with self._lock:
+            self.health[p.name].inflight += 1
+        return self._pool.submit(run)
+
+    def _failover(self, op: str, fn: Callable[[WeatherProvider], T], ranked: List[WeatherProvider]) -> T:
+        errors: List[Tuple[str, str]] = []
+        for p in ranked:
+            fut = self._submit(p, fn, op)
+            done, _ = wait([fut], timeout=self.opt.deadline_sec)
+            if not done:
+                errors.append((p.name, f"超过 {self.opt.deadline_sec:g}s"))
+                continue
+            o = fut.result()
+            if o.error is None:
+                return o.value
+            if not isinstance(o.error, ProviderUnsupported):
+                errors.append((p.name, str(o.error)))
+        raise self._failed(op, errors)
+
+    def _race(self, op: str, fn: Callable[[WeatherProvider], T]) -> T:
+        ranked = self._ranked()
+        racers, rest = ranked[:2], ranked[2:]
+        if len(racers) > 1:
+            with self._lock:
+                second_down = self._unavailable(racers[1], self.clock())
+            if second_down:
+                # 熔断/繁忙的源不参与竞速，只在前面的都失败后兜底
+                racers, rest = racers[:1], ranked[1:]
+        t_end = time.perf_counter() + self.opt.deadline_sec
+        errors: List[Tuple[str, str]] = []
+        pending: Dict["Future[_Outcome]", WeatherProvider] = {self._submit(racers[0], fn, op): racers[0]}
+
+        if len(racers) > 1:
+            if self.opt.hedge_after_sec > 0:
+                # 对冲：主源 hedge_after_sec 内没成功再发第二个
+                done, _ = wait(list(pending), timeout=self.opt.hedge_after_sec, return_when=FIRST_COMPLETED)
+                o = self._settle(done, pending, errors)
+                if o is not None:
+                    return self._win(o)
+            pending[self._submit(racers[1], fn, op)] = racers[1]
+
+        while pending:
+            remaining = t_end - time.perf_counter()
+            done, _ = wait(list(pending), timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            o = self._settle(done, pending, errors)
+            if o is not None:
+                return self._win(o)
+        errors.extend((p.name, f"超过 {self.opt.deadline_sec:g}s") for p in pending.values())
+
+        if rest:
+            try:
+                return self._failover(op, fn, rest)
+            except ProvidersFailed as e:
+                errors.append(("failover", str(e)))
+        raise self._failed(op, errors)
+
+    @staticmethod
+    def _settle(
+        done: Set["Future[_Outcome]"], pending: Dict["Future[_Outcome]", WeatherProvider], errors: List[Tuple[str, str]]
+    ) -> Optional[_Outcome]:
+        winner = None
+        for f in done:
+            pending.pop(f, None)
+            o = f.result()
+            if o.error is None:
+                winner = winner or o
+            elif not isinstance(o.error, ProviderUnsupported):
+                errors.append((o.provider.name, str(o.error)))
+        return winner
+
+    def _win(self, o: _Outcome) -> Any:
+        with self._lock:
+            self.health[o.provider.name].wins += 1
+        return o.value
+
+    def _failed(self, op: str, errors: List[Tuple[str, str]]) -> ProvidersFailed:
+        detail = "；".join(f"{n}: {e}" for n, e in errors) or "没有支持该操作的数据源"
+        return ProvidersFailed(f"所有天气源均失败（{op}）：{detail}")
+
+    # ---------- report ----------
+    def health_report(self) -> List[Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            return [
+                {
+                    "provider": h.name,
+                    "ok_rate": round(h.ok_rate, 3),
+                    "latency_ms": None if h.latency_sec is None else round(h.latency_sec * 1000, 1),
+                    "calls": h.calls,
+                    "failures": h.failures,
+                    "wins": h.wins,
+                    "open": h.is_open(now),
+                    "inflight": h.inflight,
+                    "last_error": h.last_error,
+                }
+                for h in self.health.values()
+            ]
@@ -1,37 +1,110 @@
 # weather/geo_cache.py
 from __future__ import annotations
 
-import json
+import atexit
+import threading
+import time
 from dataclasses import asdict
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from utils import jsoncodec, snapshot
+from utils.runtime import app_path
+
 from .models import Location
 
 
 class GeoCache:
-    def __init__(self, cache_file: str = ".cache/qweather_geocode_cache.json") -> None:
-        self.path = Path(cache_file)
+    """
+    城市 -> Location 缓存（JSON 文件为准）
+
+    - 同目录有新鲜的启动快照（startup.snap，见 utils/snapshot.py）时不解析 JSON，按 key 从 mmap 里查；
+      第一次写入时才整体加载 JSON
+    - 写入合并落盘：距上次保存不足 save_interval_sec 只标记，退出时（atexit）补写，
+      冷启动批量解析 N 个城市不再整体重写 N 次；写过缓存的进程退出时顺带更新快照
+    """
+
+    def __init__(
+        self,
+        cache_file: str = ".cache/qweather_geocode_cache.json",
+        keep_raw: bool = False,
+        snapshot_path: Optional[str] = None,
+        save_interval_sec: float = 2.0,
+    ) -> None:
+        # 相对路径按程序目录解析（与启动时的工作目录无关）
+        self.path = app_path(cache_file)
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self._cache: Dict[str, Dict[str, Any]] = self._load()
+        # 原始 geo 结果只用于排查，默认不落盘（缓存文件小一半以上）
+        self.keep_raw = keep_raw
+        self.save_interval_sec = save_interval_sec
+        self.snapshot_path = app_path(snapshot_path) if snapshot_path else self.path.parent / Path(snapshot.DEFAULT_SNAPSHOT).name
+        # 流水线里多个 fetch 线程会同时写缓存
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved = False
+        self._last_save = 0.0
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None
+        self._snap_geo: Optional[snapshot.GeoSection] = None
+        snap = snapshot.get_snapshot(self.snapshot_path)
+        geo = snap.geo() if snap is not None else None
+        if geo is not None and snap.sources().get(snapshot.GEO) == str(self.path.resolve()):
+            self._snap_geo = geo
+        else:
+            self._cache = self._load()
+        atexit.register(self.flush)
 
     def _load(self) -> Dict[str, Dict[str, Any]]:
         if not self.path.exists():
             return {}
         try:
-            return json.loads(self.path.read_text(encoding="utf-8"))
+            # 兼容旧的 indent=2 格式
+            return jsoncodec.read_file(self.path)
         except Exception:
             return {}
 
+    def _loaded(self) -> Dict[str, Dict[str, Any]]:
+        # 调用方持有 _lock
+        if self._cache is None:
+            self._cache = self._load()
+            self._snap_geo = None
+        return self._cache
+
     def save(self) -> None:
         try:
-            self.path.write_text(json.dumps(self._cache, ensure_ascii=False, indent=2), encoding="utf-8")
+            with self._lock:
+                # 紧凑格式 + 原子替换
+                jsoncodec.write_file(self.path, self._loaded())
+                self._dirty = False
+                self._saved = True
+                self._last_save = time.monotonic()
         except Exception:
             # 缓存失败不影响主流程
             pass
 
+    def flush(self) -> None:
+        """补写未落盘的条目；本进程写过缓存且存在启动快照时一并更新快照"""
+        if not self.path.parent.exists():
+            # 临时目录（测试/基准）已删除：不再重建
+            return
+        if self._dirty:
+            self.save()
+        if self._saved:
+            self._saved = False
+            snapshot.rebuild(self.snapshot_path, geo_file=self.path)
+
     def get(self, key: str) -> Optional[Location]:
-        it = self._cache.get(key)
+        with self._lock:
+            cache, geo = self._cache, self._snap_geo
+        it: Optional[Dict[str, Any]] = None
+        if cache is not None:
+            it = cache.get(key)
+        elif geo is not None:
+            try:
+                it = geo.get(key)
+            except Exception:
+                # 快照被本进程重建/关闭：回退到 JSON
+                with self._lock:
+                    it = self._loaded().get(key)
         if not it:
             return None
         try:
@@ -49,8 +122,13 @@ class GeoCache:
             return None
 
     def set(self, key: str, loc: Location, raw: Optional[Dict[str, Any]] = None) -> None:
-        payload = asdict(loc)
-        if raw is not None:
+        # None 字段不存，get() 里缺省即 None
+        payload = {k: v for k, v in asdict(loc).items() if v is not None}
+        if raw is not None and self.keep_raw:
             payload["raw"] = raw
-        self._cache[key] = payload
-        self.save()
+        with self._lock:
+            self._loaded()[key] = payload
+            self._dirty = True
+            due = time.monotonic() - self._last_save >= self.save_interval_sec
+        if due:
+            self.save()
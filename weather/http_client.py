@@ -2,37 +2,95 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Protocol
 
 import requests
 
+from utils import jsoncodec
+from utils.metrics import get_metrics
+
+_CHUNK = 64 * 1024
+
 
 class QWeatherHTTPError(RuntimeError):
     pass
 
 
+@dataclass(frozen=True)
+class HttpResult:
+    status: int
+    body: bytes        # 解压后的响应体
+    wire_bytes: int    # 实际传输字节数
+
+
+class Transport(Protocol):
+    """
+    可替换的取数层（录制 / 回放，见 weather/replay.py）。
+    params 不含 key；live(path, params) 走真实网络。
+    """
+
+    def fetch(self, path: str, params: Dict[str, Any], live: Callable[[str, Dict[str, Any]], HttpResult]) -> HttpResult:
+        ...
+
+
 @dataclass
 class QWeatherHttpClient:
     api_host: str
     api_key: str
     timeout_sec: int = 15
     user_agent: str = "weather_sender/1.0"
+    transport: Optional[Transport] = None
 
     def __post_init__(self) -> None:
         self.session = requests.Session()
-        self.session.headers.update({"User-Agent": self.user_agent})
+        # 和风接口支持 gzip（JSON 通常压到 1/4~1/5）；明确声明，不依赖 requests 默认头
+        self.session.headers.update({"User-Agent": self.user_agent, "Accept-Encoding": "gzip"})
 
     def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         url = f"{self.api_host}{path}"
         p = dict(params or {})
-        # API KEY 模式：统一加 key
-        p["key"] = self.api_key
-
-        resp = self.session.get(url, params=p, timeout=self.timeout_sec)
-        if resp.status_code != 200:
-            raise QWeatherHTTPError(f"HTTP {resp.status_code} {url}: {resp.text[:300]}")
-        data = resp.json()
-        code = str(data.get("code", ""))
-        if code and code != "200":
-            raise QWeatherHTTPError(f"QWeather code={code} {url}: {data}")
+
+        metrics = get_metrics()
+        with metrics.span("qweather.http", path=path) as sp:
+            if self.transport is not None:
+                res = self.transport.fetch(path, p, self._fetch_live)
+            else:
+                res = self._fetch_live(path, p)
+            body = res.body
+            sp.label(status=res.status)
+            sp.set(bytes=len(body), wire_bytes=res.wire_bytes)
+            metrics.add("qweather_response_bytes", len(body), path=path)
+            metrics.add("qweather_wire_bytes", res.wire_bytes, path=path)
+            if res.status != 200:
+                raise QWeatherHTTPError(f"HTTP {res.status} {url}: {body[:300].decode('utf-8', 'replace')}")
+            with metrics.span("qweather.decode", path=path):
+                data = jsoncodec.loads(body)
+            code = str(data.get("code", ""))
+            if code and code != "200":
+                sp.label(code=code)
+                raise QWeatherHTTPError(f"QWeather code={code} {url}: {data}")
         return data
+
+    def _fetch_live(self, path: str, params: Dict[str, Any]) -> HttpResult:
+        # API KEY 模式：统一加 key（只在真正发请求时加，录制档案里不会出现 key）；无 key 的数据源（Open-Meteo）不加
+        p = dict(params)
+        if self.api_key:
+            p["key"] = self.api_key
+        # stream：边收边解压到 bytes，直接交给 JSON 解码（不经 resp.text 的编码探测/str 转换）
+        with self.session.get(f"{self.api_host}{path}", params=p, timeout=self.timeout_sec, stream=True) as resp:
+            body = b"".join(resp.iter_content(_CHUNK))
+            return HttpResult(resp.status_code, body, _wire_bytes(resp, len(body)))
+
+
+def _wire_bytes(resp: requests.Response, decoded: int) -> int:
+    """实际网络传输的字节数（压缩后）；拿不到时退回解压后大小"""
+    try:
+        n = int(resp.raw.tell())
+        if n > 0:
+            return n
+    except Exception:
+        pass
+    try:
+        return int(resp.headers.get("Content-Length") or decoded)
+    except ValueError:
+        return decoded
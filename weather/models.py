@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date
-from typing import Optional
+from typing import Optional, Tuple
 
 
 @dataclass(frozen=True)
@@ -57,3 +57,22 @@ class WeatherDTO:
 
     # 穿衣建议（来自 indices/1d type=3）
     clothing_advice: Optional[str]
+
+    # 目标日按当地小时（0~23）的降水概率（%），预报里没有的小时为 -1；空表示数据源不提供
+    # （盘中变化监控用它比较同一时段，避免“剩余小时的最大值”随时间变小造成误报）
+    hourly_pop: Tuple[int, ...] = ()
+
+
+@dataclass(frozen=True)
+class WeatherWarning:
+    # 来自 /v7/warning/now
+    id: str
+    location_id: str
+    title: str
+    type_name: str              # 如“大风”“暴雨”
+    severity: str               # Minor / Moderate / Severe / Extreme ...
+    severity_color: str         # Blue / Yellow / Orange / Red ...
+    status: str                 # active / update / cancel
+    text: str
+    pub_time: Optional[str] = None
+    related: Optional[str] = None  # 升级/更新时指向的旧预警 id
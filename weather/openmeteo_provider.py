@@ -0,0 +1,146 @@
+# weather/openmeteo_provider.py
+"""
+Open-Meteo 数据源（免费、无需 Key），作为和风的备用源
+
+- 按 Location 的经纬度取 /v1/forecast（current + daily，3 天），一次请求出 DTO
+- 结果换算成和风口径：WMO 天气代码 -> 中文描述，风向角度 -> 八方位，风速 -> 蒲福风级（“东北风 3级”）
+- 不提供城市检索 / 灾害预警 / 空气质量 / 穿衣指数：lookup_location 与 get_warnings 抛 ProviderUnsupported，
+  地点由组合源经和风（或 geo 缓存）解析后传入
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, ClassVar, Dict, List, Optional
+
+from .http_client import QWeatherHttpClient
+from .models import Location, WeatherDTO, WeatherWarning
+from .provider import ProviderUnsupported
+from .qweather_provider import _safe_float, _uv_desc_cn
+from .replay import get_transport, is_offline
+from utils.metrics import span
+
+DEFAULT_HOST = "https://api.open-meteo.com"
+
+_DAILY = "weather_code,temperature_2m_max,temperature_2m_min,precipitation_probability_max,uv_index_max,wind_speed_10m_max,wind_direction_10m_dominant"
+_CURRENT = "weather_code,wind_speed_10m,wind_direction_10m"
+
+# WMO 4677 天气代码（Open-Meteo 文档列出的子集）
+_WMO_TEXT: Dict[int, str] = {
+    0: "晴", 1: "晴间多云", 2: "多云", 3: "阴",
+    45: "雾", 48: "雾凇",
+    51: "毛毛雨", 53: "毛毛雨", 55: "毛毛雨", 56: "冻毛毛雨", 57: "冻毛毛雨",
+    61: "小雨", 63: "中雨", 65: "大雨", 66: "冻雨", 67: "冻雨",
+    71: "小雪", 73: "中雪", 75: "大雪", 77: "雪粒",
+    80: "阵雨", 81: "阵雨", 82: "强阵雨", 85: "阵雪", 86: "阵雪",
+    95: "雷阵雨", 96: "雷阵雨伴有冰雹", 99: "雷阵雨伴有冰雹",
+}
+_DIRS = ("北风", "东北风", "东风", "东南风", "南风", "西南风", "西风", "西北风")
+# 蒲福风级下限（m/s），1 级起
+_BEAUFORT = (0.3, 1.6, 3.4, 5.5, 8.0, 10.8, 13.9, 17.2, 20.8, 24.5, 28.5, 32.7)
+
+
+def wmo_text(code: Any) -> Optional[str]:
+    c = _safe_float(code)
+    return None if c is None else _WMO_TEXT.get(int(c))
+
+
+def wind_desc(deg: Any, speed_mps: Any) -> Optional[str]:
+    d, v = _safe_float(deg), _safe_float(speed_mps)
+    parts = []
+    if d is not None:
+        parts.append(_DIRS[int((d % 360 + 22.5) // 45) % 8])
+    if v is not None:
+        parts.append(f"{sum(1 for b in _BEAUFORT if v >= b)}级")
+    return " ".join(parts) or None
+
+
+@dataclass
+class OpenMeteoProvider:
+    name: ClassVar[str] = "openmeteo"
+
+    api_host: str = DEFAULT_HOST
+    # 可注入：测试/压测时指向本地 stub server
+    client: Optional[QWeatherHttpClient] = None
+
+    def __post_init__(self) -> None:
+        if self.client is None:
+            transport = get_transport()
+            host = "replay://" if is_offline(transport) else self.api_host
+            # 复用同一个 HTTP 客户端（gzip / 指标 / 录制回放）；api_key 为空时不带 key 参数
+            self.client = QWeatherHttpClient(api_host=host, api_key="", transport=transport)
+
+    # ---------- public ----------
+    def lookup_location(self, city: str) -> Location:
+        raise ProviderUnsupported("Open-Meteo 不提供城市检索")
+
+    def get_today_weather(self, city: str) -> WeatherDTO:
+        raise ProviderUnsupported("Open-Meteo 不提供城市检索，需先解析 Location")
+
+    def get_weather_for_location(self, loc: Location, query_city: str, day_offset: int = 0) -> WeatherDTO:
+        data = self.client.get_json(
+            "/v1/forecast",
+            {
+                "latitude": f"{loc.lat:.4f}",
+                "longitude": f"{loc.lon:.4f}",
+                "daily": _DAILY,
+                "current": _CURRENT,
+                "timezone": loc.tz or "auto",
+                "forecast_days": 3,
+                "wind_speed_unit": "ms",
+            },
+        )
+        with span("dto.build", provider=self.name):
+            return self._build_dto(data, loc, query_city, day_offset)
+
+    def get_forecast_for_location(self, loc: Location, query_city: str) -> WeatherDTO:
+        # 本来就是一次请求出全部字段
+        return self.get_weather_for_location(loc, query_city)
+
+    def get_warnings(self, location_id: str) -> List[WeatherWarning]:
+        raise ProviderUnsupported("Open-Meteo 不提供灾害预警")
+
+    def get_daily_forecast(self, location_id: str) -> List[Dict[str, Any]]:
+        raise ProviderUnsupported("Open-Meteo 需要经纬度，不支持按 location_id 查询")
+
+    # ---------- dto build ----------
+    def _build_dto(self, data: Dict[str, Any], loc: Location, query_city: str, day_offset: int) -> WeatherDTO:
+        daily = data.get("daily") or {}
+        current = data.get("current") or {}
+
+        def day(key: str) -> Any:
+            xs = daily.get(key) or []
+            return xs[day_offset] if len(xs) > day_offset else None
+
+        fx = str(day("time") or "").strip()
+        target_date = date.fromisoformat(fx) if fx else datetime.now().date() + timedelta(days=day_offset)
+
+        pop = _safe_float(day("precipitation_probability_max"))
+        if day_offset == 0 and current:
+            wind = wind_desc(current.get("wind_direction_10m"), current.get("wind_speed_10m"))
+            speed = _safe_float(current.get("wind_speed_10m"))
+        else:
+            wind = wind_desc(day("wind_direction_10m_dominant"), day("wind_speed_10m_max"))
+            speed = None
+        uv = _safe_float(day("uv_index_max"))
+
+        return WeatherDTO(
+            query_city=query_city,
+            location_id=loc.id,
+            location_name=loc.name,
+            adm1=loc.adm1,
+            adm2=loc.adm2,
+            adm3=loc.adm3,
+            target_date=target_date,
+            temp_min_c=_safe_float(day("temperature_2m_min")),
+            temp_max_c=_safe_float(day("temperature_2m_max")),
+            weather_desc=wmo_text(day("weather_code")),
+            precipitation_prob=None if pop is None else max(0.0, min(1.0, pop / 100.0)),
+            wind_desc=wind,
+            wind_speed_mps=speed,
+            aqi=None,
+            aqi_desc=None,
+            uv_index=uv,
+            uv_desc=_uv_desc_cn(uv),
+            clothing_advice=None,
+        )
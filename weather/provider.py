@@ -0,0 +1,75 @@
+# weather/provider.py
+"""
+天气数据源接口
+
+QWeatherProvider（和风）、OpenMeteoProvider、CompositeProvider（多源竞速/故障转移）都实现它，
+下游（runner / 监听机器人 / 预警监控）只依赖这个接口和 WeatherDTO。
+"""
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Any, Dict, List, Protocol
+
+from .models import Location, WeatherDTO, WeatherWarning
+
+
+class ProviderUnsupported(RuntimeError):
+    """该数据源不支持这个操作（如 Open-Meteo 没有城市检索/灾害预警）；组合源会跳过它，不计入健康度"""
+
+
+class WeatherProvider(Protocol):
+    name: str
+
+    def lookup_location(self, city: str) -> Location:
+        """城市名 -> Location（应走缓存）"""
+        ...
+
+    def get_today_weather(self, city: str) -> WeatherDTO:
+        ...
+
+    def get_weather_for_location(self, loc: Location, query_city: str, day_offset: int = 0) -> WeatherDTO:
+        """day_offset：0=今天，1=明天，2=后天"""
+        ...
+
+    def get_forecast_for_location(self, loc: Location, query_city: str) -> WeatherDTO:
+        """今天的预报字段（温度 / 天气 / 降水概率，来自 3d + 24h），不取实况/空气/指数；盘中变化监控用"""
+        ...
+
+    def get_warnings(self, location_id: str) -> List[WeatherWarning]:
+        ...
+
+    def get_daily_forecast(self, location_id: str) -> List[Dict[str, Any]]:
+        """逐日预报（和风 3d 的 daily 结构：fxDate / textDay / textNight / tempMax / tempMin ...）"""
+        ...
+
+
+def normalize_dto(dto: WeatherDTO, loc: Location, query_city: str) -> WeatherDTO:
+    """
+    不同数据源的结果统一口径：地点信息以请求的 Location 为准（缓存/分组按 location_id），
+    概率夹到 0~1，温度上下限顺序纠正，数值保留一位小数。
+    """
+    tmin, tmax = dto.temp_min_c, dto.temp_max_c
+    if tmin is not None and tmax is not None and tmin > tmax:
+        tmin, tmax = tmax, tmin
+    pop = dto.precipitation_prob
+    if pop is not None:
+        pop = max(0.0, min(1.0, float(pop)))
+    return replace(
+        dto,
+        query_city=query_city,
+        location_id=loc.id,
+        location_name=loc.name,
+        adm1=loc.adm1,
+        adm2=loc.adm2,
+        adm3=loc.adm3,
+        temp_min_c=_round1(tmin),
+        temp_max_c=_round1(tmax),
+        precipitation_prob=pop,
+        wind_speed_mps=_round1(dto.wind_speed_mps),
+        uv_index=_round1(dto.uv_index),
+        weather_desc=(dto.weather_desc or "").strip() or None,
+    )
+
+
+def _round1(v: Any) -> Any:
+    return None if v is None else round(float(v), 1)
@@ -2,13 +2,15 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import date, datetime
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 from .geo_cache import GeoCache
 from .http_client import QWeatherHttpClient, QWeatherHTTPError
-from .models import Location, WeatherDTO
+from .models import Location, WeatherDTO, WeatherWarning
+from .replay import get_transport, is_offline
 from .secrets import QWeatherSecretsLoader
+from utils.metrics import span
 
 
 def _parse_iso_dt(s: str) -> datetime:
@@ -148,30 +150,95 @@ def _today_pop_pct(hourly: List[Dict[str, Any]], strategy: str = "max") -> int:
     return max(pops)
 
 
+def _date_pop_pct(hourly: List[Dict[str, Any]], target: date, strategy: str = "max") -> Optional[int]:
+    """指定日期的小时 POP 汇总；24h 预报覆盖不到该日时返回 None。"""
+    pops: List[int] = []
+    for h in hourly:
+        try:
+            if _parse_iso_dt(h["fxTime"]).date() != target:
+                continue
+        except Exception:
+            continue
+        p = _safe_int(h.get("pop"))
+        if p is not None:
+            pops.append(p)
+    if not pops:
+        return None
+    if (strategy or "max").lower().strip() == "avg":
+        return int(round(sum(pops) / len(pops)))
+    return max(pops)
+
+
+def _hourly_pop(hourly: List[Dict[str, Any]], target: date) -> Tuple[int, ...]:
+    """指定日期按当地小时的 POP（24 个，缺的为 -1）；24h 预报覆盖不到该日时返回空"""
+    out = [-1] * 24
+    found = False
+    for h in hourly:
+        try:
+            dt = _parse_iso_dt(h["fxTime"])
+        except Exception:
+            continue
+        p = _safe_int(h.get("pop"))
+        if dt.date() != target or p is None:
+            continue
+        out[dt.hour] = p
+        found = True
+    return tuple(out) if found else ()
+
+
 @dataclass
 class QWeatherProvider:
     """
-    第二部分核心：城市 -> Location(缓存) -> 组合接口 -> WeatherDTO
+    第二部分核心：城市 -> Location(缓存) -> 组合接口 -> WeatherDTO（实现 weather.provider.WeatherProvider）
 
     重要：Host 与 Key 强绑定，因此所有接口默认走同一个 api_host。
     """
+    name: ClassVar[str] = "qweather"
+
     city_range: str = "cn"
     pop_strategy: str = "max"
     indices_types: Optional[Dict[str, str]] = None  # {"clothing":"3","uv":"5"} 等
     cache_file: str = ".cache/qweather_geocode_cache.json"
+    # 可注入：测试/压测时指向本地 stub server
+    client: Optional[QWeatherHttpClient] = None
 
     def __post_init__(self) -> None:
-        secrets = QWeatherSecretsLoader.load()
-        self.client = QWeatherHttpClient(api_host=secrets.api_host, api_key=secrets.api_key)
+        if self.client is None:
+            transport = get_transport()
+            if is_offline(transport):
+                # 回放：不联网，也不需要密钥
+                self.client = QWeatherHttpClient(api_host="replay://", api_key="", transport=transport)
+            else:
+                secrets = QWeatherSecretsLoader.load()
+                self.client = QWeatherHttpClient(api_host=secrets.api_host, api_key=secrets.api_key, transport=transport)
         self.geo_cache = GeoCache(self.cache_file)
 
     # ---------- public ----------
     def get_today_weather(self, city: str) -> WeatherDTO:
         loc = self._city_lookup(city)
+        return self.get_weather_for_location(loc, query_city=city)
 
-        now = self._get("/v7/weather/now", {"location": loc.id})
+    def get_weather_for_location(self, loc: Location, query_city: str, day_offset: int = 0) -> WeatherDTO:
+        """
+        已解析地点 -> WeatherDTO（多个城市名解析到同一地点时只需请求一次）
+        day_offset：0=今天，1=明天，2=后天（非今天时只用 3d/24h，不请求实况/空气/指数）
+        """
         daily3d = self._get("/v7/weather/3d", {"location": loc.id})
         hourly24h = self._get("/v7/weather/24h", {"location": loc.id})
+        if day_offset > 0:
+            with span("dto.build"):
+                return self._build_dto(
+                    query_city=query_city,
+                    loc=loc,
+                    now={},
+                    daily3d=daily3d,
+                    hourly24h=hourly24h,
+                    air=None,
+                    indices=None,
+                    day_offset=day_offset,
+                )
+
+        now = self._get("/v7/weather/now", {"location": loc.id})
 
         # 空气质量（可能账号未开通；出错则置空）
         air = None
@@ -190,15 +257,60 @@ class QWeatherProvider:
             except QWeatherHTTPError:
                 indices = None
 
-        return self._build_dto(
-            query_city=city,
-            loc=loc,
-            now=now,
-            daily3d=daily3d,
-            hourly24h=hourly24h,
-            air=air,
-            indices=indices,
-        )
+        with span("dto.build"):
+            return self._build_dto(
+                query_city=query_city,
+                loc=loc,
+                now=now,
+                daily3d=daily3d,
+                hourly24h=hourly24h,
+                air=air,
+                indices=indices,
+            )
+
+    def get_forecast_for_location(self, loc: Location, query_city: str) -> WeatherDTO:
+        """只请求 3d + 24h（比完整 DTO 少 3 个接口）；风取 3d 的白天风向风力"""
+        daily3d = self._get("/v7/weather/3d", {"location": loc.id})
+        hourly24h = self._get("/v7/weather/24h", {"location": loc.id})
+        with span("dto.build"):
+            return self._build_dto(
+                query_city=query_city,
+                loc=loc,
+                now={},
+                daily3d=daily3d,
+                hourly24h=hourly24h,
+                air=None,
+                indices=None,
+            )
+
+    def get_warnings(self, location_id: str) -> List[WeatherWarning]:
+        """当前生效的灾害预警（/v7/warning/now）"""
+        data = self._get("/v7/warning/now", {"location": location_id})
+        out: List[WeatherWarning] = []
+        for it in (data.get("warning") or []):
+            out.append(
+                WeatherWarning(
+                    id=str(it.get("id", "")),
+                    location_id=location_id,
+                    title=str(it.get("title", "")).strip(),
+                    type_name=str(it.get("typeName", "")).strip(),
+                    severity=str(it.get("severity", "")).strip(),
+                    severity_color=str(it.get("severityColor", "")).strip(),
+                    status=str(it.get("status", "")).strip().lower(),
+                    text=str(it.get("text", "")).strip(),
+                    pub_time=it.get("pubTime"),
+                    related=str(it["related"]) if it.get("related") else None,
+                )
+            )
+        return out
+
+    def get_daily_forecast(self, location_id: str) -> List[Dict[str, Any]]:
+        """3 天逐日预报原始数据（textDay / textNight / tempMax ...）"""
+        return self._get("/v7/weather/3d", {"location": location_id}).get("daily") or []
+
+    def lookup_location(self, city: str) -> Location:
+        """城市名 -> Location（走缓存）；调度器用它取 tz。"""
+        return self._city_lookup(city)
 
     # ---------- endpoints ----------
     def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -206,10 +318,14 @@ class QWeatherProvider:
 
     def _city_lookup(self, city_name: str) -> Location:
         key = city_name.strip()
-        cached = self.geo_cache.get(key)
-        if cached:
-            return cached
-
+        with span("geo.lookup") as sp:
+            cached = self.geo_cache.get(key)
+            sp.label(cache="hit" if cached else "miss")
+            if cached:
+                return cached
+            return self._city_lookup_remote(key, city_name)
+
+    def _city_lookup_remote(self, key: str, city_name: str) -> Location:
         # 推荐：/geo/v2/city/lookup
         data = self._get(
             "/geo/v2/city/lookup",
@@ -244,13 +360,16 @@ class QWeatherProvider:
         hourly24h: Dict[str, Any],
         air: Optional[Dict[str, Any]],
         indices: Optional[Dict[str, Any]],
+        day_offset: int = 0,
     ) -> WeatherDTO:
-        # 3d 的第一天作为“今天”
+        # 3d 的第一天作为“今天”，day_offset 选后续日期
         daily_list = daily3d.get("daily") or []
-        today = daily_list[0] if daily_list else {}
+        today = daily_list[day_offset] if len(daily_list) > day_offset else {}
 
         fx_date_str = str(today.get("fxDate", "")).strip()
-        target_date = date.fromisoformat(fx_date_str) if fx_date_str else datetime.now().date()
+        target_date = (
+            date.fromisoformat(fx_date_str) if fx_date_str else datetime.now().date() + timedelta(days=day_offset)
+        )
 
         temp_min = _safe_float(today.get("tempMin"))
         temp_max = _safe_float(today.get("tempMax"))
@@ -264,7 +383,10 @@ class QWeatherProvider:
 
         # POP：取“今天”的小时最大值
         hourly_list = hourly24h.get("hourly") or []
-        pop_pct = _today_pop_pct(hourly_list, strategy=self.pop_strategy)
+        if day_offset == 0:
+            pop_pct = _today_pop_pct(hourly_list, strategy=self.pop_strategy)
+        else:
+            pop_pct = _date_pop_pct(hourly_list, target_date, strategy=self.pop_strategy)
         precipitation_prob = None
         if pop_pct is not None:
             precipitation_prob = max(0.0, min(1.0, float(pop_pct) / 100.0))
@@ -329,4 +451,5 @@ class QWeatherProvider:
             uv_index=uv_index,
             uv_desc=uv_desc,
             clothing_advice=clothing_advice,
+            hourly_pop=_hourly_pop(hourly_list, target_date),
         )
@@ -0,0 +1,281 @@
+# weather/replay.py
+"""
+和风接口录制 / 回放
+
+录制：真实请求照常发出，同时把响应存进档案；回放：不联网、不耗配额，从档案取响应，
+可按原始延迟或加速（speed=10 即 1/10 延迟，speed=0 不等待）返回。
+
+档案是一个目录：
+- bodies.bin：响应体 zlib 压缩后依次追加；内容相同的响应（按摘要）只存一份
+- index.jsonl：每个请求一行 {k, ts, ms, st, w, d, off, n}（或网络异常时 {k, ts, ms, err}）
+  k = 路径 + 排序后的参数（不含 key），ts = 录制时间，ms = 原始耗时，w = 传输字节
+先写 body 再写索引行，录到一半中断也不会出现指向不存在数据的索引。
+
+同一请求录了多次（多天 / 多轮）时：默认回放最近一天录到的，day="2026-10-19" 回放指定那天；
+同一天有多条按录制顺序轮流返回。
+
+启用方式：命令行 --record DIR / --replay DIR [--replay-speed 10] [--replay-day 日期]，
+或环境变量 WEATHER_SENDER_HTTP=record:DIR / replay:DIR（WEATHER_SENDER_REPLAY_SPEED / _DAY 同理）。
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+import requests
+
+from utils import jsoncodec
+
+from .http_client import HttpResult, QWeatherHTTPError, Transport
+
+_INDEX = "index.jsonl"
+_BODIES = "bodies.bin"
+
+LiveFetch = Callable[[str, Dict[str, Any]], HttpResult]
+
+# requests 的异常信息里带完整 URL（含 key），写档案前抹掉
+_KEY_IN_URL = re.compile(r"([?&]key=)[^&\s'\")]+")
+
+
+def request_key(path: str, params: Dict[str, Any]) -> str:
+    q = sorted((str(k), str(v)) for k, v in params.items() if k != "key")
+    return f"{path}?{urlencode(q)}" if q else path
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def _day_of(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    key: str
+    ts: float
+    latency_ms: float
+    status: int = 0
+    wire_bytes: int = 0
+    digest: str = ""
+    offset: int = 0
+    length: int = 0
+    error: str = ""   # 录制时的网络异常（回放时原样抛出）
+
+    @staticmethod
+    def from_row(row: Dict[str, Any]) -> "ArchiveEntry":
+        return ArchiveEntry(
+            key=row["k"],
+            ts=float(row["ts"]),
+            latency_ms=float(row.get("ms", 0.0)),
+            status=int(row.get("st", 0)),
+            wire_bytes=int(row.get("w", 0)),
+            digest=row.get("d", ""),
+            offset=int(row.get("off", 0)),
+            length=int(row.get("n", 0)),
+            error=row.get("err", ""),
+        )
+
+    def to_row(self) -> Dict[str, Any]:
+        row: Dict[str, Any] = {"k": self.key, "ts": round(self.ts, 3), "ms": round(self.latency_ms, 2)}
+        if self.error:
+            row["err"] = self.error
+        else:
+            row.update(st=self.status, w=self.wire_bytes, d=self.digest, off=self.offset, n=self.length)
+        return row
+
+
+def read_index(archive_dir: Union[str, Path]) -> Iterator[ArchiveEntry]:
+    p = Path(archive_dir) / _INDEX
+    if not p.exists():
+        return
+    with p.open("rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield ArchiveEntry.from_row(jsoncodec.loads(line))
+            except Exception:
+                # 录制中断留下的半行
+                continue
+
+
+class RecordingTransport:
+    """照常请求，同时把响应追加进档案（多线程安全）"""
+
+    def __init__(self, archive_dir: Union[str, Path], clock: Callable[[], float] = time.time) -> None:
+        self.dir = Path(archive_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.clock = clock
+        self._lock = threading.Lock()
+        # 已有内容的摘要 -> (offset, length)，续录时同样去重
+        self._blobs: Dict[str, Tuple[int, int]] = {
+            e.digest: (e.offset, e.length) for e in read_index(self.dir) if e.digest
+        }
+        self.recorded = 0
+
+    def fetch(self, path: str, params: Dict[str, Any], live: LiveFetch) -> HttpResult:
+        key = request_key(path, params)
+        ts = self.clock()
+        t0 = time.perf_counter()
+        try:
+            res = live(path, params)
+        except requests.RequestException as e:
+            self._append(ArchiveEntry(key=key, ts=ts, latency_ms=(time.perf_counter() - t0) * 1000,
+                                      error=_KEY_IN_URL.sub(r"\1***", f"{type(e).__name__}: {e}")), None)
+            raise
+        ms = (time.perf_counter() - t0) * 1000
+        self._append(ArchiveEntry(key=key, ts=ts, latency_ms=ms, status=res.status, wire_bytes=res.wire_bytes),
+                     res.body)
+        return res
+
+    def _append(self, entry: ArchiveEntry, body: Optional[bytes]) -> None:
+        try:
+            with self._lock:
+                if body is not None:
+                    d = _digest(body)
+                    blob = self._blobs.get(d)
+                    if blob is None:
+                        packed = zlib.compress(body, 6)
+                        with (self.dir / _BODIES).open("ab") as f:
+                            off = f.seek(0, os.SEEK_END)
+                            f.write(packed)
+                        blob = self._blobs[d] = (off, len(packed))
+                    entry = ArchiveEntry(key=entry.key, ts=entry.ts, latency_ms=entry.latency_ms, status=entry.status,
+                                         wire_bytes=entry.wire_bytes, digest=d, offset=blob[0], length=blob[1])
+                with (self.dir / _INDEX).open("ab") as f:
+                    f.write(jsoncodec.dumps(entry.to_row()) + b"\n")
+                self.recorded += 1
+        except Exception as e:
+            # 录制失败不影响主流程
+            print(f"[WARN] 写入回放档案失败：{e}")
+
+
+class ReplayTransport:
+    """
+    从档案返回响应，不联网。
+    speed：1=原始延迟，10=十倍速，0=不等待。
+    day：只回放该天（YYYY-MM-DD，本地时间）录到的；None 取每个请求最近一天的。
+    """
+
+    def __init__(
+        self,
+        archive_dir: Union[str, Path],
+        speed: float = 1.0,
+        day: Optional[str] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.dir = Path(archive_dir)
+        self.speed = speed
+        self.day = day
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[ArchiveEntry]] = self._select(read_index(self.dir), day)
+        if not self._entries:
+            raise RuntimeError(f"回放档案为空或没有 {day or ''} 的记录：{self.dir}")
+        self._cursor: Dict[str, int] = {}
+        self._mm: Optional[mmap.mmap] = None
+        bodies = self.dir / _BODIES
+        if bodies.exists() and bodies.stat().st_size > 0:
+            with bodies.open("rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.served = 0
+        self.misses = 0
+
+    @staticmethod
+    def _select(entries: Iterator[ArchiveEntry], day: Optional[str]) -> Dict[str, List[ArchiveEntry]]:
+        by_key: Dict[str, Dict[str, List[ArchiveEntry]]] = {}
+        for e in entries:
+            by_key.setdefault(e.key, {}).setdefault(_day_of(e.ts), []).append(e)
+        out: Dict[str, List[ArchiveEntry]] = {}
+        for key, days in by_key.items():
+            d = day if day is not None else max(days)
+            if d in days:
+                out[key] = days[d]
+        return out
+
+    def keys(self) -> List[str]:
+        return list(self._entries)
+
+    def fetch(self, path: str, params: Dict[str, Any], live: LiveFetch) -> HttpResult:
+        key = request_key(path, params)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise QWeatherHTTPError(f"回放档案中没有该请求：{key}")
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = (i + 1) % len(entries)
+            self.served += 1
+        e = entries[i]
+        if self.speed > 0 and e.latency_ms > 0:
+            self.sleep(e.latency_ms / 1000.0 / self.speed)
+        if e.error:
+            raise requests.ConnectionError(f"[回放] {e.error}")
+        return HttpResult(e.status, self._body(e), e.wire_bytes)
+
+    def _body(self, e: ArchiveEntry) -> bytes:
+        if self._mm is None or e.offset + e.length > len(self._mm):
+            raise QWeatherHTTPError(f"回放档案数据不完整：{e.key}")
+        return zlib.decompress(self._mm[e.offset:e.offset + e.length])
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+# ---------- 进程级开关（命令行 / 环境变量） ----------
+_transport: Optional[Transport] = None
+_configured = False
+
+
+def configure_transport(
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    speed: float = 1.0,
+    day: Optional[str] = None,
+) -> Optional[Transport]:
+    global _transport, _configured
+    if record and replay:
+        raise RuntimeError("--record 与 --replay 不能同时使用")
+    if replay:
+        _transport = ReplayTransport(replay, speed=speed, day=day)
+        print(f"[INFO] 回放模式：{replay}（{len(_transport.keys())} 个请求，speed={speed:g}）")
+    elif record:
+        _transport = RecordingTransport(record)
+        print(f"[INFO] 录制模式：{record}")
+    else:
+        _transport = None
+    _configured = True
+    return _transport
+
+
+def get_transport() -> Optional[Transport]:
+    """首次调用时读环境变量 WEATHER_SENDER_HTTP=record:DIR / replay:DIR"""
+    if not _configured:
+        mode, _, target = os.environ.get("WEATHER_SENDER_HTTP", "").strip().partition(":")
+        speed = float(os.environ.get("WEATHER_SENDER_REPLAY_SPEED", "") or 1.0)
+        day = os.environ.get("WEATHER_SENDER_REPLAY_DAY", "").strip() or None
+        if mode == "record" and target:
+            configure_transport(record=target)
+        elif mode == "replay" and target:
+            configure_transport(replay=target, speed=speed, day=day)
+        else:
+            configure_transport()
+    return _transport
+
+
+def is_offline(transport: Optional[Transport]) -> bool:
+    return isinstance(transport, ReplayTransport)
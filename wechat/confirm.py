@@ -0,0 +1,133 @@
+# wechat/confirm.py
+"""
+发送后确认：检查会话最新消息里是否出现刚发的文本。
+
+- 每个会话记一个“高水位”（最后一条已看过消息的指纹），确认时只比对其后的新消息，
+  不必每次把整段聊天记录和发送文本逐条比较
+- 已有高水位的会话发送前不再额外读一次记录
+- 有界等待：首次等待后按倍数退避，超过 timeout 判为未确认（不重发，避免重复消息）
+"""
+from __future__ import annotations
+
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 自己发的消息在 wxauto 里的发送者 / 类型标记（3.9：["Self", 内容]；新版：msg.type == "self"）
+_SELF_MARKERS = ("self", "Self")
+
+
+@dataclass(frozen=True)
+class ConfirmOptions:
+    timeout_sec: float = 3.0
+    first_wait_sec: float = 0.15
+    backoff: float = 2.0
+    max_wait_sec: float = 1.0
+    # 只比对前 N 个字符（长消息在列表里可能被截断/折行）
+    match_chars: int = 64
+
+
+@dataclass(frozen=True)
+class Delivery:
+    confirmed: Optional[bool]   # None：未做确认
+    waited_sec: float = 0.0
+    checks: int = 0
+
+
+def _parts(m: Any) -> Tuple[str, str]:
+    """(发送者/类型, 内容)；兼容 [sender, content] 列表与消息对象"""
+    if isinstance(m, (list, tuple)):
+        return (str(m[0]) if m else "", str(m[1]) if len(m) > 1 else "")
+    who = getattr(m, "type", None) or getattr(m, "sender", "")
+    return str(who), str(getattr(m, "content", "") or "")
+
+
+def _norm(text: str, n: int) -> str:
+    s = text.replace("\r\n", "\n").replace("\r", "\n").strip()
+    return s[:n] if n > 0 else s
+
+
+class DeliveryTracker:
+    """每个 wx 实例一个；按会话保存高水位。"""
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.clock = clock
+        self.sleep = sleep
+        # 会话 -> (消息条数, 最后一条指纹)
+        self._hwm: Dict[str, Tuple[int, Tuple[str, str]]] = {}
+        self.reads = 0
+
+    def _read(self, wx: Any) -> List[Any]:
+        self.reads += 1
+        return list(wx.GetAllMessage() or [])
+
+    def _new_since(self, chat: str, msgs: Sequence[Any]) -> Sequence[Any]:
+        mark = self._hwm.get(chat)
+        if mark is None:
+            return msgs
+        count, fp = mark
+        # 常见情况：列表只在尾部追加，直接从原位置切
+        if 0 < count <= len(msgs) and _parts(msgs[count - 1]) == fp:
+            return msgs[count:]
+        # 列表被截断/重载：从尾部往前找上次最后一条
+        for i in range(len(msgs) - 1, -1, -1):
+            if _parts(msgs[i]) == fp:
+                return msgs[i + 1:]
+        return msgs
+
+    def _advance(self, chat: str, msgs: Sequence[Any]) -> None:
+        if msgs:
+            self._hwm[chat] = (len(msgs), _parts(msgs[-1]))
+
+    def mark(self, wx: Any, chat: str) -> None:
+        """发送前调用（已切到该会话）。已有高水位的会话不读记录。"""
+        if chat not in self._hwm:
+            self._advance(chat, self._read(wx))
+            if chat not in self._hwm:
+                # 空会话：记一个空高水位，之后所有消息都算新的
+                self._hwm[chat] = (0, ("", ""))
+
+    def confirm(self, wx: Any, chat: str, text: str, opt: ConfirmOptions) -> Delivery:
+        want = _norm(text, opt.match_chars)
+        t0 = self.clock()
+        wait = opt.first_wait_sec
+        checks = 0
+        while True:
+            self.sleep(wait)
+            msgs = self._read(wx)
+            checks += 1
+            new = self._new_since(chat, msgs)
+            self._advance(chat, msgs)
+            for m in new:
+                who, content = _parts(m)
+                if who in _SELF_MARKERS and _norm(content, opt.match_chars) == want:
+                    return Delivery(confirmed=True, waited_sec=self.clock() - t0, checks=checks)
+            elapsed = self.clock() - t0
+            if elapsed >= opt.timeout_sec:
+                return Delivery(confirmed=False, waited_sec=elapsed, checks=checks)
+            wait = min(opt.max_wait_sec, wait * opt.backoff, opt.timeout_sec - elapsed)
+
+
+# id(wx) -> (wx 的弱引用, tracker)；按 id 而不按 wx 本身做键：wx 不一定可哈希（如 eq 的 dataclass）
+_trackers: Dict[int, Tuple[Callable[[], Any], DeliveryTracker]] = {}
+
+
+def tracker_for(wx: Any) -> DeliveryTracker:
+    key = id(wx)
+    got = _trackers.get(key)
+    if got is not None and got[0]() is wx:
+        return got[1]
+    t = DeliveryTracker()
+    try:
+        # wx 被回收时顺带清掉，id 复用也不会拿到别人的高水位
+        ref: Callable[[], Any] = weakref.ref(wx, lambda _, k=key: _trackers.pop(k, None))
+    except TypeError:
+        # 不支持弱引用的对象：强引用保存（句柄数量很少）
+        ref = lambda: wx
+    _trackers[key] = (ref, t)
+    return t
@@ -0,0 +1,270 @@
+# wechat/input_strategy.py
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+# 可选输入方式
+INPUT_SENDMSG = "sendmsg"            # wxauto wx.SendMsg（默认，最快）
+INPUT_PASTE = "paste"                # 剪贴板一次性粘贴整条消息
+INPUT_PASTE_CHUNKS = "paste_chunks"  # 剪贴板按固定长度分段粘贴，段间停顿
+INPUT_BURST = "burst"                # 类人输入：随机长度一阵一阵地输入
+INPUT_MODES = (INPUT_SENDMSG, INPUT_PASTE, INPUT_PASTE_CHUNKS, INPUT_BURST)
+
+
+@dataclass(frozen=True)
+class InputOptions:
+    mode: str = INPUT_SENDMSG
+
+    # paste_chunks：每段字符数 / 段间停顿
+    chunk_chars: int = 40
+    chunk_delay_min: float = 0.15
+    chunk_delay_max: float = 0.4
+
+    # burst：每阵字符数 / 阵间停顿 / ASCII 逐字延迟
+    burst_chars_min: int = 4
+    burst_chars_max: int = 16
+    burst_pause_min: float = 0.2
+    burst_pause_max: float = 0.8
+    per_char_delay_min: float = 0.01
+    per_char_delay_max: float = 0.03
+
+    # Ctrl+V 是异步的：微信处理粘贴时才去读剪贴板。每次粘贴后等一下再改剪贴板 / 回车，
+    # 否则可能粘进下一段或恢复后的内容、或在粘贴完成前就发送
+    paste_settle_sec: float = 0.05
+
+    # 粘贴后恢复用户原来的剪贴板内容（只能恢复文本）
+    restore_clipboard: bool = True
+
+
+class InputBackend(Protocol):
+    """键盘/剪贴板操作的最小接口；真实实现走 pyautogui + win32clipboard。"""
+
+    def get_clipboard(self) -> Optional[str]:
+        """剪贴板文本；空剪贴板返回 ""，不是文本（图片 / 文件）或读取失败返回 None"""
+        ...
+
+    def set_clipboard(self, text: str) -> None: ...
+
+    def paste(self) -> None: ...
+
+    def typewrite(self, text: str, interval: float) -> None: ...
+
+    def press(self, key: str) -> None: ...
+
+    def sleep(self, sec: float) -> None: ...
+
+
+class GuiInputBackend:
+    """Windows 实现：依赖在首次使用时才导入。"""
+
+    def __init__(self) -> None:
+        import pyautogui
+        import win32clipboard
+        import win32con
+
+        self._gui = pyautogui
+        self._cb = win32clipboard
+        self._fmt = win32con.CF_UNICODETEXT
+
+    def get_clipboard(self) -> Optional[str]:
+        try:
+            self._cb.OpenClipboard()
+            try:
+                if self._cb.IsClipboardFormatAvailable(self._fmt):
+                    return self._cb.GetClipboardData(self._fmt)
+                return "" if self._cb.CountClipboardFormats() == 0 else None
+            finally:
+                self._cb.CloseClipboard()
+        except Exception:
+            return None
+
+    def set_clipboard(self, text: str) -> None:
+        self._cb.OpenClipboard()
+        try:
+            self._cb.EmptyClipboard()
+            self._cb.SetClipboardData(self._fmt, text)
+        finally:
+            self._cb.CloseClipboard()
+
+    def paste(self) -> None:
+        self._gui.hotkey("ctrl", "v")
+
+    def typewrite(self, text: str, interval: float) -> None:
+        self._gui.typewrite(text, interval=interval)
+
+    def press(self, key: str) -> None:
+        self._gui.press(key)
+
+    def sleep(self, sec: float) -> None:
+        time.sleep(sec)
+
+
+@dataclass
+class FakeInputBackend:
+    """
+    记录操作、不真正输入；sleep 只累加虚拟时间。
+    用于在 Linux 上测量各输入方式的吞吐（字符 / 虚拟秒）。
+    """
+
+    clipboard: Optional[str] = "用户原剪贴板"
+    typed: List[str] = field(default_factory=list)
+    ops: Dict[str, int] = field(default_factory=dict)
+    virtual_sec: float = 0.0
+    # 每次操作的模拟耗时（按 UI 自动化的典型量级）
+    op_cost_sec: float = 0.02
+
+    def _op(self, name: str, cost: float = 0.0) -> None:
+        self.ops[name] = self.ops.get(name, 0) + 1
+        self.virtual_sec += self.op_cost_sec + cost
+
+    def get_clipboard(self) -> Optional[str]:
+        self._op("get_clipboard")
+        return self.clipboard
+
+    def set_clipboard(self, text: str) -> None:
+        self._op("set_clipboard")
+        self.clipboard = text
+
+    def paste(self) -> None:
+        self._op("paste")
+        self.typed.append(self.clipboard or "")
+
+    def typewrite(self, text: str, interval: float) -> None:
+        self._op("typewrite", interval * len(text))
+        self.typed.append(text)
+
+    def press(self, key: str) -> None:
+        self._op("press")
+        if key == "enter":
+            self.typed.append("\n<SEND>")
+
+    def sleep(self, sec: float) -> None:
+        self.virtual_sec += sec
+
+    def text(self) -> str:
+        return "".join(self.typed)
+
+
+def _split_fixed(msg: str, n: int) -> List[str]:
+    n = max(1, n)
+    return [msg[i:i + n] for i in range(0, len(msg), n)]
+
+
+def _split_bursts(msg: str, lo: int, hi: int, rnd: random.Random) -> List[str]:
+    out: List[str] = []
+    i = 0
+    lo, hi = max(1, lo), max(1, lo, hi)
+    while i < len(msg):
+        n = rnd.randint(lo, hi)
+        out.append(msg[i:i + n])
+        i += n
+    return out
+
+
+def _typeable(s: str) -> bool:
+    # pyautogui.typewrite 只能输入 ASCII 可见字符；换行会直接触发微信发送
+    return all(32 <= ord(c) < 127 for c in s)
+
+
+_warned_unrestorable = False
+
+
+class _ClipboardGuard:
+    def __init__(self, backend: InputBackend, restore: bool) -> None:
+        self.backend = backend
+        self.restore = restore
+        self.saved: Optional[str] = None
+
+    def __enter__(self) -> "_ClipboardGuard":
+        global _warned_unrestorable
+        if self.restore:
+            self.saved = self.backend.get_clipboard()
+            if self.saved is None and not _warned_unrestorable:
+                # 图片 / 文件等非文本内容没法存下来：粘贴会覆盖掉，只提示一次
+                _warned_unrestorable = True
+                print("[WARN] 剪贴板里不是文本（图片 / 文件等），粘贴发送后无法恢复")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.restore and self.saved is not None:
+            try:
+                self.backend.set_clipboard(self.saved)
+            except Exception:
+                pass
+
+
+def _paste(backend: InputBackend, text: str, settle_sec: float) -> None:
+    backend.set_clipboard(text)
+    backend.paste()
+    if settle_sec > 0:
+        backend.sleep(settle_sec)
+
+
+def _paste_pieces(backend: InputBackend, pieces: List[str], pause: Callable[[], float], settle_sec: float) -> None:
+    for i, piece in enumerate(pieces):
+        _paste(backend, piece, settle_sec)
+        if i < len(pieces) - 1:
+            backend.sleep(pause())
+
+
+def input_message(
+    wx,
+    message: str,
+    opt: InputOptions,
+    backend: Optional[InputBackend] = None,
+    rnd: Optional[random.Random] = None,
+) -> None:
+    """
+    按 opt.mode 把消息输入到当前会话并发送。
+    调用前需已 wx.ChatWith(...) 切到目标会话。
+    """
+    mode = (opt.mode or INPUT_SENDMSG).strip().lower()
+    if mode not in INPUT_MODES:
+        raise ValueError(f"未知输入方式：{opt.mode}（可选 {', '.join(INPUT_MODES)}）")
+
+    if mode == INPUT_SENDMSG:
+        wx.SendMsg(message)
+        return
+
+    backend = backend or GuiInputBackend()
+    rnd = rnd or random.Random()
+
+    with _ClipboardGuard(backend, opt.restore_clipboard):
+        if mode == INPUT_PASTE:
+            _paste_pieces(backend, [message], lambda: 0.0, opt.paste_settle_sec)
+        elif mode == INPUT_PASTE_CHUNKS:
+            _paste_pieces(
+                backend,
+                _split_fixed(message, opt.chunk_chars),
+                lambda: rnd.uniform(opt.chunk_delay_min, opt.chunk_delay_max),
+                opt.paste_settle_sec,
+            )
+        else:
+            bursts = _split_bursts(message, opt.burst_chars_min, opt.burst_chars_max, rnd)
+            for i, piece in enumerate(bursts):
+                if _typeable(piece):
+                    backend.typewrite(piece, rnd.uniform(opt.per_char_delay_min, opt.per_char_delay_max))
+                else:
+                    _paste(backend, piece, opt.paste_settle_sec)
+                if i < len(bursts) - 1:
+                    backend.sleep(rnd.uniform(opt.burst_pause_min, opt.burst_pause_max))
+
+        backend.press("enter")
+
+
+def measure_throughput(message: str, opt: InputOptions, seed: int = 0) -> Tuple[float, Dict[str, int]]:
+    """用 FakeInputBackend 估算一条消息的输入耗时（虚拟秒）及操作次数。"""
+    fb = FakeInputBackend()
+
+    class _FakeWx:
+        def SendMsg(self, msg: str) -> None:
+            fb.typewrite(msg, 0.0)
+            fb.press("enter")
+
+    input_message(_FakeWx(), message, opt, backend=fb, rnd=random.Random(seed))
+    if fb.text() != message + "\n<SEND>":
+        raise RuntimeError("输入内容与原文不一致")
+    return fb.virtual_sec, dict(fb.ops)
@@ -5,11 +5,15 @@ import configparser
 import subprocess
 import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 import psutil
 import pyautogui
+import win32gui
 from wxauto import WeChat
+from wxauto import uiautomation as uia
+
+_MAIN_WND_CLASS = "WeChatMainWndForPC"
 
 
 @dataclass(frozen=True)
@@ -32,16 +36,83 @@ def _is_wechat_process_running() -> bool:
     return False
 
 
+class _AccountWeChat(WeChat):
+    """
+    绑定到指定主窗口（句柄）的 WeChat。
+
+    wxauto 的 WeChat() 不区分账号：总是找第一个 WeChatMainWndForPC 窗口，listen 还是类属性（所有实例共享）。
+    多开时按句柄找窗口、每个实例一份监听表，其余逻辑沿用 WeChat。
+    """
+
+    def __init__(self, hwnd: int) -> None:
+        self._hwnd = hwnd
+        self._uia = uia.WindowControl(
+            searchDepth=1, ClassName=_MAIN_WND_CLASS, Compare=lambda c, _depth: c.NativeWindowHandle == hwnd
+        )
+        self.listen: Dict[str, Any] = {}
+        self.SessionItemList: List[Any] = []
+        super().__init__()
+
+    @property
+    def UiaAPI(self) -> Any:
+        return self._uia
+
+    @UiaAPI.setter
+    def UiaAPI(self, _control: Any) -> None:
+        # WeChat.__init__ 会赋值“第一个主窗口”，忽略，始终用句柄匹配的窗口
+        pass
+
+    def _show(self) -> None:
+        self.HWND = self._hwnd
+        win32gui.ShowWindow(self.HWND, 1)
+        win32gui.SetWindowPos(self.HWND, -1, 0, 0, 0, 0, 3)
+        win32gui.SetWindowPos(self.HWND, -2, 0, 0, 0, 0, 3)
+        self._uia.SwitchToThisWindow()
+
+
+def _main_windows() -> List[int]:
+    """所有已登录账号的主窗口句柄（登录窗口是另一个类名，不在其中）"""
+    hwnds: List[int] = []
+
+    def collect(hwnd: int, _: Any) -> bool:
+        if win32gui.GetClassName(hwnd) == _MAIN_WND_CLASS:
+            hwnds.append(hwnd)
+        return True
+
+    win32gui.EnumWindows(collect, None)
+    return hwnds
+
+
+def _has_wechat_window(nickname: str) -> bool:
+    # 多开时各账号进程都叫 WeChat.exe，只能按昵称找窗口判断该账号是否已在运行
+    try:
+        _new_wechat(nickname)
+        return True
+    except Exception:
+        return False
+
+
 def _launch_wechat(exe_path: str, opt: WeChatReadyOptions) -> None:
     # 微信未运行才启动
     subprocess.Popen([exe_path], shell=False)
     time.sleep(opt.launch_wait_sec)
 
 
-def _try_get_wechat_if_logged_in(opt: WeChatReadyOptions) -> Optional[WeChat]:
+def _new_wechat(nickname: Optional[str]) -> WeChat:
+    """不指定昵称：第一个主窗口（单账号）；指定时逐个主窗口比对登录昵称，绑定到对应账号的窗口。"""
+    if not nickname:
+        return WeChat()
+    for hwnd in _main_windows():
+        wx = _AccountWeChat(hwnd)
+        if wx.nickname == nickname:
+            return wx
+    raise RuntimeError(f"未找到昵称为 {nickname} 的已登录微信窗口")
+
+
+def _try_get_wechat_if_logged_in(opt: WeChatReadyOptions, nickname: Optional[str] = None) -> Optional[WeChat]:
     """
     尝试判断微信是否已登录：
-    - 能成功构造 WeChat()
+    - 能成功构造 WeChat()（指定 nickname 时绑定该账号窗口）
     - 且能获取到会话列表（GetSessionList 不为空）
     为避免启动瞬间或 UI 未就绪导致误判，做连续确认。
     """
@@ -50,7 +121,7 @@ def _try_get_wechat_if_logged_in(opt: WeChatReadyOptions) -> Optional[WeChat]:
 
     for _ in range(opt.logged_in_confirm_times):
         try:
-            wx = WeChat()
+            wx = _new_wechat(nickname)
             sessions = wx.GetSessionList()
             if sessions:
                 ok += 1
@@ -66,7 +137,7 @@ def _try_get_wechat_if_logged_in(opt: WeChatReadyOptions) -> Optional[WeChat]:
     return None
 
 
-def _wait_for_login(opt: WeChatReadyOptions) -> WeChat:
+def _wait_for_login(opt: WeChatReadyOptions, nickname: Optional[str] = None) -> WeChat:
     """
     未登录时进入等待：
     - 每隔 press_enter_interval_sec 按一次 Enter（触发登录）
@@ -78,7 +149,7 @@ def _wait_for_login(opt: WeChatReadyOptions) -> WeChat:
     print("[INFO] 等待微信登录...（将自动尝试按 Enter 触发登录）")
     while time.time() - start < opt.login_timeout_sec:
         # 先尝试检测是否已登录
-        wx = _try_get_wechat_if_logged_in(opt)
+        wx = _try_get_wechat_if_logged_in(opt, nickname)
         if wx:
             print("[INFO] 微信已登录（检测通过）。")
             return wx
@@ -95,35 +166,48 @@ def _wait_for_login(opt: WeChatReadyOptions) -> WeChat:
     raise RuntimeError("等待超时：微信未登录或窗口不可用。请确认微信可正常登录。")
 
 
-def ensure_wechat_ready(config_path: str = "config.ini", opt: Optional[WeChatReadyOptions] = None) -> WeChat:
+def ensure_wechat_ready(
+    config_path: str = "config.ini",
+    opt: Optional[WeChatReadyOptions] = None,
+    wechat_path: Optional[str] = None,
+    section: str = "wechat",
+    nickname: Optional[str] = None,
+) -> WeChat:
     """
     入口函数：确保返回一个“可用且已登录”的 wxauto.WeChat 实例
     
     - 如果已登录：直接返回（跳过启动与按 Enter）
     - 如果未运行：启动
     - 如果运行但未登录：等待并自动按 Enter
+
+    多账号：section 指定读哪一节的 wechat_path（如 "account:备用号"），nickname 绑定该账号窗口。
     """
     opt = opt or WeChatReadyOptions()
 
-    cfg = configparser.ConfigParser()
-    cfg.read(config_path, encoding="utf-8")
-
-    exe_path = cfg.get("wechat", "wechat_path", fallback="").strip()
+    # 已由 JobConfig 解析过时直接传入 wechat_path，避免重复读 config.ini
+    exe_path = (wechat_path or "").strip()
+    if not exe_path:
+        cfg = configparser.ConfigParser()
+        cfg.read(config_path, encoding="utf-8")
+        exe_path = cfg.get(section, "wechat_path", fallback="").strip()
+        if not nickname:
+            nickname = cfg.get(section, "nickname", fallback="").strip() or None
     if not exe_path:
-        raise RuntimeError("config.ini 缺少 [wechat] wechat_path 配置。")
+        raise RuntimeError(f"config.ini 缺少 [{section}] wechat_path 配置。")
 
     # 1) 若已登录，直接返回（关键：跳过登录步骤）
-    wx = _try_get_wechat_if_logged_in(opt)
+    wx = _try_get_wechat_if_logged_in(opt, nickname)
     if wx:
-        print("[INFO] 检测到微信已登录，跳过登录步骤。")
+        print(f"[INFO] 检测到微信已登录{f'（{nickname}）' if nickname else ''}，跳过登录步骤。")
         return wx
 
-    # 2) 未登录：若进程未运行则启动
-    if not _is_wechat_process_running():
-        print("[INFO] 微信未运行，正在启动微信...")
+    # 2) 未登录：若未运行则启动。指定昵称时按该账号的窗口判断（其它账号的进程也叫 WeChat.exe）
+    running = _has_wechat_window(nickname) if nickname else _is_wechat_process_running()
+    if not running:
+        print(f"[INFO] 微信未运行{f'（{nickname}）' if nickname else ''}，正在启动微信...")
         _launch_wechat(exe_path, opt)
     else:
-        print("[INFO] 微信进程已运行，但未检测到登录态，进入登录等待...")
+        print(f"[INFO] 微信已运行{f'（{nickname}）' if nickname else ''}，但未检测到登录态，进入登录等待...")
 
     # 3) 等待登录并返回
-    return _wait_for_login(opt)
+    return _wait_for_login(opt, nickname)
@@ -0,0 +1,238 @@
+# wechat/listener.py
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from message.builder import MessageBuilder
+from weather.models import Location
+from weather.provider import WeatherProvider
+
+DAY_WORDS = {"今天": 0, "今日": 0, "明天": 1, "明日": 1, "后天": 2}
+
+_KW_RE = re.compile(r"的?天气(怎么样|如何)?$")
+_CITY_RE = re.compile(r"[一-龥A-Za-z·]{2,12}")  # 最长地名如“克孜勒苏柯尔克孜自治州”
+_PLACE_SUFFIXES = ("自治州", "地区", "省", "市", "区", "县")
+
+
+@dataclass(frozen=True)
+class IncomingMessage:
+    chat: str          # 会话名（好友备注/群名）
+    sender: str
+    content: str
+
+
+@dataclass(frozen=True)
+class Query:
+    city: Optional[str]  # None：用该会话的默认城市
+    day_offset: int
+    # 只有“xx天气”没有日期词：xx 必须能解析成地点才回复（“好热的天气”不是查询）
+    city_must_resolve: bool = False
+
+
+def parse_command(text: str) -> Optional[Query]:
+    """
+    识别简单查询：“明天”“天气”“今天天气”“广州天气”“广州明天天气”
+    从句尾依次剥掉“天气”关键词和日期词，剩下的是城市；
+    必须含日期词或“天气”，且只有“天气”时城市要能解析（见 QueryBot.answer），避免对普通聊天做出回应。
+    """
+    s = (text or "").strip().replace(" ", "").rstrip("？?！!。.")
+    if not s or len(s) > 24:
+        return None
+    m = _KW_RE.search(s)
+    kw = m is not None
+    if m is not None:
+        s = s[: m.start()]
+    day = next((w for w in DAY_WORDS if s.endswith(w)), None)
+    if day is not None:
+        s = s[: -len(day)]
+    if not day and not kw:
+        return None
+    city = s or None
+    if city is not None and not _CITY_RE.fullmatch(city):
+        return None
+    return Query(city=city, day_offset=DAY_WORDS[day or "今天"], city_must_resolve=city is not None and day is None)
+
+
+def _matches(city: str, loc: Location) -> bool:
+    # 和风地理查询是模糊匹配，“好热”也可能搜出某个地名：要求名字对得上
+    name = city
+    for suf in _PLACE_SUFFIXES:
+        if len(name) > len(suf) + 1 and name.endswith(suf):
+            name = name[: -len(suf)]
+            break
+    return any(name in (n or "") for n in (loc.name, loc.adm2, loc.adm1))
+
+
+class MessageSource(Protocol):
+    def poll(self) -> List[IncomingMessage]:
+        """只返回上次 poll 之后的新消息。"""
+        ...
+
+
+class WxautoMessageSource:
+    """
+    基于 wxauto 监听列表：AddListenChat 之后，GetListenMessage 只返回各会话的新增消息，
+    不需要反复读取整段聊天记录。
+    """
+
+    def __init__(self, wx: Any, chats: Iterable[str]) -> None:
+        self.wx = wx
+        for who in chats:
+            wx.AddListenChat(who=who)
+
+    def poll(self) -> List[IncomingMessage]:
+        out: List[IncomingMessage] = []
+        got = self.wx.GetListenMessage() or {}
+        for chat, msgs in got.items():
+            chat_name = getattr(chat, "who", None) or str(chat)
+            for m in msgs or []:
+                # 只处理对方发来的消息（自己发的 / 系统 / 时间分割线忽略）
+                if getattr(m, "type", "friend") != "friend":
+                    continue
+                out.append(
+                    IncomingMessage(
+                        chat=chat_name,
+                        sender=str(getattr(m, "sender", "") or ""),
+                        content=str(getattr(m, "content", "") or ""),
+                    )
+                )
+        return out
+
+
+class MergedMessageSource:
+    """多个账号各自监听一部分会话时合并成一个来源（会话名在各账号间不重复）。"""
+
+    def __init__(self, sources: Iterable[MessageSource]) -> None:
+        self.sources = list(sources)
+
+    def poll(self) -> List[IncomingMessage]:
+        out: List[IncomingMessage] = []
+        for s in self.sources:
+            out.extend(s.poll())
+        return out
+
+
+class FakeMessageSource:
+    """测试用：push() 注入消息，poll() 取走。"""
+
+    def __init__(self) -> None:
+        self._q: Deque[IncomingMessage] = deque()
+        self._lock = threading.Lock()
+
+    def push(self, chat: str, content: str, sender: str = "friend") -> None:
+        with self._lock:
+            self._q.append(IncomingMessage(chat=chat, sender=sender, content=content))
+
+    def poll(self) -> List[IncomingMessage]:
+        with self._lock:
+            out = list(self._q)
+            self._q.clear()
+        return out
+
+
+@dataclass(frozen=True)
+class BotOptions:
+    # 有消息后按最小间隔轮询，空闲时指数退避到最大间隔（限制空闲 CPU）；
+    # 最大间隔就是空闲后第一条查询的最坏等待，不能太长
+    poll_min_sec: float = 0.1
+    poll_max_sec: float = 0.5
+    # 回复缓存有效期（同地点同一天的回复复用）
+    cache_ttl_sec: float = 1800.0
+    cache_max_entries: int = 512
+
+
+class QueryBot:
+    def __init__(
+        self,
+        source: MessageSource,
+        provider: WeatherProvider,
+        builder: MessageBuilder,
+        reply: Callable[[str, str], None],
+        default_city: Callable[[str], Optional[str]],
+        opt: Optional[BotOptions] = None,
+        clock: Callable[[], float] = time.monotonic,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self.source = source
+        self.provider = provider
+        self.builder = builder
+        self.reply = reply
+        self.default_city = default_city
+        self.opt = opt or BotOptions()
+        self.clock = clock
+        self.today = today
+        # (location_id, day_offset, 当天日期) -> (过期时间, 文本)；带日期：跨零点后“明天”指的是另一天
+        self._cache: Dict[Tuple[str, int, date], Tuple[float, str]] = {}
+        self._stop = threading.Event()
+
+    # ---------- answer ----------
+    def answer(self, q: Query, chat: str) -> Optional[str]:
+        city = q.city or self.default_city(chat)
+        if not city:
+            return None
+        if q.city_must_resolve:
+            try:
+                loc = self.provider.lookup_location(city)
+            except Exception:
+                return None
+            if not _matches(city, loc):
+                return None
+        else:
+            loc = self.provider.lookup_location(city)  # geo 走磁盘缓存
+        key = (loc.id, q.day_offset, self.today())
+        now = self.clock()
+        hit = self._cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+
+        dto = self.provider.get_weather_for_location(loc, query_city=city, day_offset=q.day_offset)
+        label = next(k for k, v in DAY_WORDS.items() if v == q.day_offset)
+        text = self.builder.build(dto, day_label=label, framing=False)
+
+        if len(self._cache) >= self.opt.cache_max_entries:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            if len(self._cache) >= self.opt.cache_max_entries:
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (now + self.opt.cache_ttl_sec, text)
+        return text
+
+    def handle(self, msg: IncomingMessage) -> bool:
+        q = parse_command(msg.content)
+        if q is None:
+            return False
+        try:
+            text = self.answer(q, msg.chat)
+        except Exception as e:
+            print(f"[WARN] 查询失败（{msg.chat}: {msg.content}）：{e}")
+            text = "没查到这个地方的天气，换个说法试试～"
+        if text:
+            self.reply(msg.chat, text)
+            return True
+        return False
+
+    # ---------- loop ----------
+    def poll_once(self) -> int:
+        handled = 0
+        for msg in self.source.poll():
+            handled += self.handle(msg)
+        return handled
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_forever(self) -> None:
+        interval = self.opt.poll_min_sec
+        while not self._stop.is_set():
+            try:
+                got = self.poll_once()
+            except Exception as e:
+                print(f"[WARN] 拉取消息失败：{e}")
+                got = 0
+            interval = self.opt.poll_min_sec if got else min(self.opt.poll_max_sec, interval * 2)
+            self._stop.wait(interval)
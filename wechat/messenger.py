@@ -6,7 +6,10 @@ import time
 from dataclasses import dataclass
 from typing import Optional
 
-import pyautogui
+from utils.metrics import span
+
+from .confirm import ConfirmOptions, Delivery, DeliveryTracker, tracker_for
+from .input_strategy import INPUT_BURST, INPUT_SENDMSG, InputBackend, InputOptions, input_message
 
 
 @dataclass(frozen=True)
@@ -16,10 +19,14 @@ class SendOptions:
     pre_delay_sec_max: float = 1.6
 
     # 输入节奏：发送前轻微扰动（可选）
+    # 兼容旧开关：type_like_human=True 等价于 input=InputOptions(mode="burst")
     type_like_human: bool = False
     per_char_delay_min: float = 0.01
     per_char_delay_max: float = 0.03
 
+    # 输入方式（sendmsg / paste / paste_chunks / burst），见 wechat/input_strategy.py
+    input: Optional[InputOptions] = None
+
     # 失败重试
     retries: int = 2
     retry_backoff_sec: float = 1.5
@@ -27,57 +34,112 @@ class SendOptions:
     # 发送前额外按一下 ESC，避免焦点在弹窗/搜索框
     press_esc_before_send: bool = True
 
+    # 发送后确认文本出现在会话里（None 不确认），见 wechat/confirm.py
+    confirm: Optional[ConfirmOptions] = None
+
 
 def _sleep_jitter(a: float, b: float) -> None:
     time.sleep(random.uniform(a, b))
 
 
-def _type_human(msg: str, per_char_min: float, per_char_max: float) -> None:
-    # 用 pyautogui 模拟输入（比一次性粘贴更像人，但更慢）
-    for ch in msg:
-        pyautogui.typewrite(ch)
-        time.sleep(random.uniform(per_char_min, per_char_max))
-
-
-def send_text(wx, friend_name: str, message: str, opt: Optional[SendOptions] = None) -> None:
+def resolve_input_options(opt: SendOptions) -> InputOptions:
+    if opt.input is not None:
+        return opt.input
+    if opt.type_like_human:
+        return InputOptions(
+            mode=INPUT_BURST,
+            per_char_delay_min=opt.per_char_delay_min,
+            per_char_delay_max=opt.per_char_delay_max,
+        )
+    return InputOptions(mode=INPUT_SENDMSG)
+
+
+def send_text(
+    wx,
+    friend_name: str,
+    message: str,
+    opt: Optional[SendOptions] = None,
+    backend: Optional[InputBackend] = None,
+    tracker: Optional[DeliveryTracker] = None,
+) -> Delivery:
     """
     wx: wxauto.WeChat 实例（由 launcher.ensure_wechat_ready() 返回）
     friend_name: 唯一备注名/会话名（强烈建议唯一）
     message: 要发送的文本
+    backend: 键盘/剪贴板后端（默认 pyautogui + win32clipboard；测试可传 FakeInputBackend）
+    tracker: 送达确认的高水位记录（默认每个 wx 一个）
+
+    返回 Delivery：opt.confirm 为 None 时 confirmed=None；未确认不会重发（避免重复消息）
     """
     opt = opt or SendOptions()
+    input_opt = resolve_input_options(opt)
+    if opt.confirm is not None and tracker is None:
+        tracker = tracker_for(wx)
 
     last_err: Optional[Exception] = None
     for attempt in range(opt.retries + 1):
         try:
-            # 1) 切到会话
-            wx.ChatWith(friend_name)
-
-            # 2) 轻微抖动
-            _sleep_jitter(opt.pre_delay_sec_min, opt.pre_delay_sec_max)
-
-            # 3) 确保焦点尽量在输入框
-            # wxauto 的 SendMsg 通常会聚焦输入框，但偶发弹窗/焦点丢失
-            if opt.press_esc_before_send:
-                # pyautogui.press("esc")
-                time.sleep(0.2)
-
-            # 4) 发送
-            if opt.type_like_human:
-                # 先用 Ctrl+L 清空输入框不一定可靠，这里直接使用 pyautogui 输入 + Enter
-                _type_human(message, opt.per_char_delay_min, opt.per_char_delay_max)
-                pyautogui.press("enter")
+            with span("wechat.send_attempt", mode=input_opt.mode, attempt=attempt) as sp:
+                sp.set(friend=friend_name, chars=len(message))
+
+                # 1) 切到会话
+                wx.ChatWith(friend_name)
+                if tracker is not None:
+                    tracker.mark(wx, friend_name)
+
+                # 2) 轻微抖动
+                _sleep_jitter(opt.pre_delay_sec_min, opt.pre_delay_sec_max)
+
+                # 3) 确保焦点尽量在输入框
+                # wxauto 的 SendMsg 通常会聚焦输入框，但偶发弹窗/焦点丢失
+                if opt.press_esc_before_send:
+                    # pyautogui.press("esc")
+                    time.sleep(0.2)
+
+                # 4) 发送：sendmsg 走 wxauto（最快、稳定）；其余走剪贴板/键盘
+                input_message(wx, message, input_opt, backend=backend)
+            break
+        except Exception as e:
+            last_err = e
+            if attempt < opt.retries:
+                time.sleep(opt.retry_backoff_sec * (attempt + 1))
             else:
-                # wxauto 直接发送（最快、稳定）
-                wx.SendMsg(message)
+                raise RuntimeError(f"发送失败：{e}") from e
 
+    if opt.confirm is None or tracker is None:
+        return Delivery(confirmed=None)
+    with span("wechat.confirm") as sp:
+        try:
+            d = tracker.confirm(wx, friend_name, message, opt.confirm)
+        except Exception as e:
+            print(f"[WARN] 送达确认失败（{friend_name}）：{e}")
+            d = Delivery(confirmed=None)
+        sp.set(confirmed=d.confirmed, checks=d.checks)
+    return d
+
+
+def send_file(wx, friend_name: str, path: str, opt: Optional[SendOptions] = None) -> None:
+    """
+    发送文件/图片（天气卡片）：wxauto SendFiles 走剪贴板粘贴文件，图片在聊天里直接显示。
+    重试策略与 send_text 一致。
+    """
+    opt = opt or SendOptions()
+
+    last_err: Optional[Exception] = None
+    for attempt in range(opt.retries + 1):
+        try:
+            with span("wechat.send_file", attempt=attempt) as sp:
+                sp.set(friend=friend_name)
+                wx.ChatWith(friend_name)
+                _sleep_jitter(opt.pre_delay_sec_min, opt.pre_delay_sec_max)
+                wx.SendFiles(filepath=path)
             return
         except Exception as e:
             last_err = e
             if attempt < opt.retries:
                 time.sleep(opt.retry_backoff_sec * (attempt + 1))
             else:
-                raise RuntimeError(f"发送失败：{e}") from e
+                raise RuntimeError(f"发送图片失败：{e}") from e
 
     if last_err:
-        raise RuntimeError(f"发送失败：{last_err}") from last_err
+        raise RuntimeError(f"发送图片失败：{last_err}") from last_err
@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import time
-import psutil
 
 
 def close_wechat_soft() -> None:
@@ -20,6 +19,8 @@ def kill_wechat_hard() -> None:
     强制杀进程（不推荐）：可能更像异常行为，且会中断微信的正常状态。
     仅在你明确需要“每次运行都退出”时使用。
     """
+    import psutil
+
     for proc in psutil.process_iter(["pid", "name"]):
         try:
             if (proc.info.get("name") or "").lower() == "wechat.exe":